@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the peak Python memory allocated while invoking a function with a large binary payload,
+for the payload types accepted by invoke_function. The requests are sent to a local server which
+discards the body, so only the memory of the client is measured.
+
+The "bytes copy" case is what a bytearray, mmap or chunked payload had to be turned into before
+it could be passed to invoke_function.
+
+    $ python benchmark/payload_bench.py --size 6 --rounds 5
+"""
+
+import argparse
+import io
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fc2
+from fc2 import util
+
+_CHUNK = 64 * 1024
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        if self.headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                self._discard(size + 2)
+                if size == 0:
+                    break
+        else:
+            self._discard(int(self.headers['content-length']))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def _discard(self, size):
+        while size > 0:
+            size -= len(self.rfile.read(min(size, _CHUNK)))
+
+    def log_message(self, *args):
+        pass
+
+
+def _chunks(data):
+    view = memoryview(data)
+    for i in range(0, len(view), _CHUNK):
+        yield view[i:i + _CHUNK]
+
+
+def bench(client, make_payload, rounds):
+    """ :return: (peak allocated bytes, seconds per invocation) """
+    peak = 0
+    elapsed = 0
+    for _ in range(rounds):
+        tracemalloc.start()
+        start = time.perf_counter()
+        payload = make_payload()
+        client.invoke_function('service', 'function', payload=payload)
+        elapsed += time.perf_counter() - start
+        if isinstance(payload, io.IOBase):
+            payload.close()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak, elapsed / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=float, default=6, help='payload size in MB')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _SinkHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = fc2.Client(endpoint='http://127.0.0.1:{0}'.format(server.server_port),
+                        accessKeyID='id', accessKeySecret='secret')
+
+    size = int(args.size * 1024 * 1024)
+    data = bytearray(os.urandom(size))
+    with tempfile.NamedTemporaryFile() as f:
+        f.write(data)
+        f.flush()
+        mapped = mmap.mmap(f.fileno(), 0)
+        cases = [
+            ('bytes copy', lambda: bytes(data)),
+            ('bytearray', lambda: data),
+            ('memoryview', lambda: memoryview(data)),
+            ('mmap', lambda: mapped),
+            ('file', lambda: open(f.name, 'rb')),
+            ('sized iterator', lambda: util.SizedIterator(_chunks(data), size)),
+            ('chunked iterator', lambda: _chunks(data)),
+        ]
+        print('payload of {0:.1f} MB, peak memory allocated during the invocation:'.format(size / 1048576.0))
+        for name, make_payload in cases:
+            peak, per_call = bench(client, make_payload, args.rounds)
+            print('{0:18} {1:10.1f} KB {2:8.1f} ms'.format(name, peak / 1024.0, per_call * 1000))
+        mapped.close()
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the CPU time the SDK spends per request outside of the network: building and signing
+the headers, logging and wrapping the response. The transport (fc2.client.requestWithTry) is
+replaced by an in-memory response, so only the client code is measured.
+
+With --baseline, the same invoke_function call is timed on the fc2 package of another git
+revision as well, e.g. the one before the logging became lazy, each tree in its own process.
+--revision measures a git revision in place of the working tree.
+
+    $ python benchmark/request_overhead_bench.py --requests 50000
+    $ python benchmark/request_overhead_bench.py --baseline <revision>
+    $ python benchmark/request_overhead_bench.py --baseline <revision> --debug   # with debug logging enabled
+    $ python benchmark/request_overhead_bench.py --baseline <revision>^ --revision <revision>
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class _Response(object):
+    status_code = 200
+    headers = {'Content-Type': 'application/octet-stream', 'X-Fc-Request-Id': 'rid',
+               'X-Fc-Invocation-Duration': '1', 'X-Fc-Max-Memory-Usage': '20'}
+    content = b'ok'
+
+
+def bench_client(requests, debug):
+    """ Time invoke_function on the fc2 package found first on sys.path. """
+    import fc2
+    from fc2 import client as fc_client
+
+    # the baseline logs through the root logger, to which nothing is written here.
+    root = logging.getLogger()
+    root.addHandler(logging.NullHandler())
+    root.setLevel(logging.DEBUG if debug else logging.WARNING)
+    fc_client.requestWithTry = lambda method, url, **kwargs: _Response()
+
+    client = fc2.Client(endpoint='http://127.0.0.1:9000', accessKeyID='id', accessKeySecret='secret',
+                        securityToken='token')
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.invoke_function('service', 'function', payload=b'hello', headers={'x-fc-trace-id': 'trace'})
+    return (time.perf_counter() - start) / requests
+
+
+def _run_tree(tree, args):
+    """ Run bench_client on the fc2 package of a tree in a new process, return its time per request. """
+    command = [sys.executable, os.path.abspath(__file__), '--worker', tree, '--requests', str(args.requests)]
+    if args.debug:
+        command.append('--debug')
+    return float(subprocess.check_output(command))
+
+
+def _export(revision, directory):
+    """ Extract the fc2 package of a git revision into directory. """
+    archive = subprocess.Popen(['git', '-C', _ROOT, 'archive', revision, 'fc2'], stdout=subprocess.PIPE)
+    subprocess.check_call(['tar', '-x', '-C', directory], stdin=archive.stdout)
+    archive.stdout.close()
+    if archive.wait() != 0:
+        raise SystemExit('cannot export fc2 from git revision {0}'.format(revision))
+
+
+def _run_revision(revision, args):
+    """ Run bench_client on the fc2 package of a git revision, or of the working tree when revision is None. """
+    if revision is None:
+        return _run_tree(_ROOT, args)
+    directory = tempfile.mkdtemp()
+    try:
+        _export(revision, directory)
+        return _run_tree(directory, args)
+    finally:
+        shutil.rmtree(directory)
+
+
+def _report(name, per_request):
+    print('{0:<24} {1:8.2f} us per request ({2:.0f} requests/s)'.format(name, per_request * 1e6, 1 / per_request))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--debug', action='store_true', help='enable debug logging (to a null handler)')
+    parser.add_argument('--baseline', help='git revision of the fc2 package to compare with')
+    parser.add_argument('--revision', help='git revision of the fc2 package to measure, default the working tree')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, args.worker)
+        print(repr(bench_client(args.requests, args.debug)))
+        return
+
+    print('debug logging {0}'.format('on' if args.debug else 'off'))
+    current = _run_revision(args.revision, args)
+    _report(args.revision or 'working tree', current)
+    if args.baseline:
+        baseline = _run_revision(args.baseline, args)
+        _report(args.baseline, baseline)
+        print('overhead saved per request: {0:.2f} us ({1:.1%})'.format(
+            (baseline - current) * 1e6, 1 - current / baseline))
+
+
+if __name__ == '__main__':
+    main()
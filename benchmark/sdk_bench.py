@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite of the SDK request pipeline against the local emulator (fc2.emulator.Emulator), which runs
+in a child process so it does not share the interpreter, the CPU time or the memory of the client.
+
+Every case reports the operations per second, the p50 and p99 latency of an operation and the
+peak RSS of the client process after the case. The cases are:
+
+    invoke      synchronous invocations at every --concurrency level, from as many threads
+    crud        create/get/update/delete of services and functions, one at a time
+    list        walking --services services by pages of --page-size with iter_services
+    upload      create_function from a --code-size MB directory (codeDir) and zip file (codeZipFile)
+    zip         util.zip_dir of the same directory, serial and with --zip-workers workers
+
+The results can be saved with --json and compared to a saved run with --baseline, the script then
+exits with status 1 when a case lost more than --tolerance of its throughput.
+
+    $ python benchmark/sdk_bench.py
+    $ python benchmark/sdk_bench.py --cases invoke --concurrency 1 8 32 --requests 5000 --json run.json
+    $ python benchmark/sdk_bench.py --baseline run.json
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fc2
+from fc2 import util
+from fc2.emulator import Emulator
+
+CASES = ('invoke', 'crud', 'list', 'upload', 'zip')
+
+
+def _serve(connection):
+    emulator = Emulator().start()
+    connection.send(emulator.endpoint)
+    # serve until the parent says stop.
+    connection.recv()
+    emulator.stop()
+
+
+def _percentile(ordered, percentile):
+    return ordered[max(0, int(math.ceil(len(ordered) * percentile / 100.0)) - 1)]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KB on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def _result(name, latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'name': name,
+        'ops': len(ordered),
+        'opsPerSec': len(ordered) / elapsed,
+        'p50Ms': _percentile(ordered, 50) * 1000,
+        'p99Ms': _percentile(ordered, 99) * 1000,
+        'peakRssMb': _peak_rss_mb(),
+    }
+
+
+def _timed(operation, *args, **kwargs):
+    start = time.perf_counter()
+    operation(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def _run(name, operations):
+    """ Run the callables one after another. """
+    start = time.perf_counter()
+    latencies = [_timed(operation) for operation in operations]
+    return _result(name, latencies, time.perf_counter() - start)
+
+
+def bench_invoke(client, args):
+    client.create_service('bench-invoke')
+    client.create_function('bench-invoke', 'echo', 'python3', 'main.handler', codeDir=args.small_code)
+    payload = os.urandom(args.payload_size)
+    results = []
+    for concurrency in args.concurrency:
+        invoke = lambda _: _timed(client.invoke_function, 'bench-invoke', 'echo', payload)
+        with ThreadPoolExecutor(concurrency) as executor:
+            # warm up the connections of the pool.
+            list(executor.map(invoke, range(concurrency)))
+            start = time.perf_counter()
+            latencies = list(executor.map(invoke, range(args.requests)))
+            elapsed = time.perf_counter() - start
+        results.append(_result('invoke c={0}'.format(concurrency), latencies, elapsed))
+    return results
+
+
+def bench_crud(client, args):
+    rounds = range(args.crud_rounds)
+    results = [
+        _run('create_service', [lambda i=i: client.create_service('bench-crud-{0}'.format(i)) for i in rounds]),
+        _run('get_service', [lambda i=i: client.get_service('bench-crud-{0}'.format(i)) for i in rounds]),
+        _run('update_service', [lambda i=i: client.update_service('bench-crud-{0}'.format(i), description='updated')
+                                for i in rounds]),
+        _run('create_function', [lambda i=i: client.create_function(
+            'bench-crud-{0}'.format(i), 'fn', 'python3', 'main.handler', codeDir=args.small_code) for i in rounds]),
+        _run('get_function', [lambda i=i: client.get_function('bench-crud-{0}'.format(i), 'fn') for i in rounds]),
+        _run('update_function', [lambda i=i: client.update_function('bench-crud-{0}'.format(i), 'fn', memorySize=256)
+                                 for i in rounds]),
+        _run('delete_function', [lambda i=i: client.delete_function('bench-crud-{0}'.format(i), 'fn') for i in rounds]),
+        _run('delete_service', [lambda i=i: client.delete_service('bench-crud-{0}'.format(i)) for i in rounds]),
+    ]
+    return results
+
+
+def bench_list(client, args):
+    for i in range(args.services):
+        client.create_service('bench-list-{0:06d}'.format(i))
+
+    def walk():
+        count = sum(1 for _ in client.iter_services(pageSize=args.page_size, prefix='bench-list-'))
+        assert count == args.services
+
+    result = _run('iter_services {0}/{1}'.format(args.services, args.page_size), [walk] * args.list_rounds)
+    for i in range(args.services):
+        client.delete_service('bench-list-{0:06d}'.format(i))
+    return [result]
+
+
+def make_code(root, size_mb, files=50):
+    """ A directory of `files` incompressible files totalling size_mb MB. """
+    size = int(size_mb * 1024 * 1024) // files
+    for i in range(files):
+        directory = os.path.join(root, 'pkg{0}'.format(i % 5))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, 'file{0}.bin'.format(i)), 'wb') as f:
+            f.write(os.urandom(size))
+
+
+def bench_upload(client, args):
+    client.create_service('bench-upload')
+    zip_path = os.path.join(args.workdir, 'code.zip')
+    with open(zip_path, 'wb') as f:
+        util.zip_dir(args.large_code, f)
+    results = []
+    for name, kwargs in (('upload codeDir {0}MB'.format(args.code_size), {'codeDir': args.large_code}),
+                         ('upload codeZipFile {0}MB'.format(args.code_size), {'codeZipFile': zip_path})):
+        functions = ['fn{0}'.format(i) for i in range(args.upload_rounds)]
+        results.append(_run(name, [lambda fn=fn: client.create_function(
+            'bench-upload', fn, 'python3', 'main.handler', **kwargs) for fn in functions]))
+        for fn in functions:
+            client.delete_function('bench-upload', fn)
+    client.delete_service('bench-upload')
+    return results
+
+
+def bench_zip(client, args):
+    results = []
+    for workers in sorted(set([1, args.zip_workers])):
+        output = os.path.join(args.workdir, 'bench.zip')
+
+        def package():
+            with open(output, 'wb') as f:
+                util.zip_dir(args.large_code, f, workers=workers)
+
+        results.append(_run('zip_dir {0}MB workers={1}'.format(args.code_size, workers),
+                            [package] * args.upload_rounds))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """ :return: the names of the cases whose throughput dropped by more than tolerance. """
+    previous = dict((r['name'], r) for r in baseline)
+    regressions = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        change = result['opsPerSec'] / before['opsPerSec'] - 1
+        print('{0:32} {1:+7.1%}'.format(result['name'], change))
+        if change < -tolerance:
+            regressions.append(result['name'])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--requests', type=int, default=2000, help='invocations per concurrency level')
+    parser.add_argument('--payload-size', type=int, default=1024, help='invocation payload size in byte')
+    parser.add_argument('--crud-rounds', type=int, default=200)
+    parser.add_argument('--services', type=int, default=1000, help='number of services listed')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--list-rounds', type=int, default=5)
+    parser.add_argument('--code-size', type=int, default=20, help='size of the uploaded code in MB')
+    parser.add_argument('--upload-rounds', type=int, default=3)
+    parser.add_argument('--zip-workers', type=int, default=4)
+    parser.add_argument('--json', help='save the results to this file')
+    parser.add_argument('--baseline', help='compare the results to a file saved with --json')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='max throughput loss against the baseline, default 0.2')
+    args = parser.parse_args()
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(child,), daemon=True)
+    server.start()
+    endpoint = parent.recv()
+    pool_size = max(args.concurrency)
+    client = fc2.Client(endpoint=endpoint, accessKeyID='emulator', accessKeySecret='emulator',
+                        poolConnections=pool_size, poolMaxsize=pool_size)
+
+    args.workdir = tempfile.mkdtemp(prefix='fc2_sdk_bench_')
+    args.small_code = os.path.join(args.workdir, 'small')
+    args.large_code = os.path.join(args.workdir, 'large')
+    make_code(args.small_code, 0.01, files=1)
+    if 'upload' in args.cases or 'zip' in args.cases:
+        make_code(args.large_code, args.code_size)
+
+    results = []
+    print('{0:32} {1:>8} {2:>10} {3:>9} {4:>9} {5:>9}'.format('case', 'ops', 'ops/s', 'p50 ms', 'p99 ms', 'rss MB'))
+    try:
+        for case in CASES:
+            if case not in args.cases:
+                continue
+            for result in globals()['bench_' + case](client, args):
+                print('{name:32} {ops:>8} {opsPerSec:>10.1f} {p50Ms:>9.2f} {p99Ms:>9.2f} {peakRssMb:>9.1f}'.format(
+                    **result))
+                results.append(result)
+    finally:
+        client.close()
+        parent.send('stop')
+        server.join(5)
+        shutil.rmtree(args.workdir)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('Throughput regressions: {0}'.format(', '.join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
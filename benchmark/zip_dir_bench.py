@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the serial and the parallel modes of fc2.util.zip_dir.
+
+    $ python benchmark/zip_dir_bench.py --files 20000 --workers 1 4 8
+"""
+
+import argparse
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fc2 import util
+
+
+def make_tree(root, files, size):
+    words = [''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(8)) for _ in range(512)]
+    for i in range(files):
+        directory = os.path.join(root, 'pkg{0}'.format(i % 200), 'mod{0}'.format(i % 7))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        text = ' '.join(random.choice(words) for _ in range(size // 9))
+        with open(os.path.join(directory, 'file{0}.py'.format(i)), 'w') as f:
+            f.write(text)
+
+
+def bench(root, workers, rounds):
+    best = None
+    size = 0
+    for _ in range(rounds):
+        output = io.BytesIO()
+        start = time.time()
+        util.zip_dir(root, output, workers=workers)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+        size = len(output.getvalue())
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dir', help='existing directory to package, a synthetic tree is generated if omitted')
+    parser.add_argument('--files', type=int, default=5000, help='number of files of the synthetic tree')
+    parser.add_argument('--size', type=int, default=16 * 1024, help='size of each synthetic file, in byte')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    root = args.dir
+    if root is None:
+        root = tempfile.mkdtemp(prefix='fc2_zip_bench_')
+        make_tree(root, args.files, args.size)
+    try:
+        baseline = None
+        for workers in args.workers:
+            elapsed, size = bench(root, workers, args.rounds)
+            baseline = baseline or elapsed
+            print('workers={0:<3} {1:8.3f}s  {2:6.2f}x  zip size {3} bytes'.format(
+                workers, elapsed, baseline / elapsed, size))
+    finally:
+        if args.dir is None:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
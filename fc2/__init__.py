@@ -9,7 +9,19 @@ __author__ = 'Aliyun Function Compute'
 __version__ = '2.5.2'
 
 from .client import Client
+from .async_client import AsyncClient
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+from .code_cache import CodePackageCache
+from .concurrency import AdaptiveConcurrencyLimit, AdaptiveConcurrencyLimiter
+from .credentials import (Credentials, CredentialsProvider, EnvironmentCredentialsProvider,
+                          FileCredentialsProvider, RefreshableCredentialsProvider, StaticCredentialsProvider)
 from .fc_exceptions import FcError
+from .hedging import HedgingPolicy
+from .hooks import RequestEvent, RequestHooks
+from .inventory import InventoryCrawler, InventorySnapshot
+from .metrics import LatencyHistogram, MetricsRegistry
+from .ratelimit import RateLimiter, RateLimitExceededError, TokenBucket
+from .retry import RetryBudget, RetryPolicy
 
 # Set default logging handler to avoid "No handler found" warnings.
 import logging
@@ -0,0 +1,1264 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import collections
+import collections.abc
+import functools
+import json
+import logging
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import client as fc_client
+from . import fc_exceptions
+from . import util
+from .client import Client, FcHttpResponse, InvokeResult, delimiter, unescape
+from .hooks import call_hooks
+
+logger = logging.getLogger(__name__)
+
+
+def _to_query(params):
+    """ Flatten the params dict to the (key, str value) pairs aiohttp expects. """
+    query = []
+    for key, value in (params or {}).items():
+        if isinstance(value, (list, tuple)):
+            query.extend((key, str(v)) for v in value)
+        else:
+            query.append((key, str(value)))
+    return query
+
+
+async def _async_chunks(iterable):
+    for chunk in iterable:
+        yield chunk
+
+
+def _trace_config():
+    """ Record the connection setup and the arrival of the response headers in the trace_request_ctx dict. """
+    config = aiohttp.TraceConfig()
+
+    async def on_connection_create_start(session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, context, params):
+        context.trace_request_ctx['connect'] += time.perf_counter() - context.connect_start
+
+    async def on_request_end(session, context, params):
+        context.trace_request_ctx['headers'] = time.perf_counter()
+
+    config.on_connection_create_start.append(on_connection_create_start)
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_request_end.append(on_request_end)
+    return config
+
+
+class RawResponse(object):
+    """
+    The fully-read http response of an :class:`AsyncClient` request, or the successful response
+    of a streamed request whose body is left unread.
+    It exposes the ``status_code``, ``headers``, ``content``, ``text`` and ``json()``
+    members of ``requests.Response`` that the SDK relies on.
+    """
+
+    def __init__(self, status_code, headers, content, stream=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        # the unread aiohttp response of a streamed request, content is None then.
+        self.stream = stream
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+class AsyncFcStreamingResponse(object):
+    """
+    Asynchronous version of :class:`fc2.client.FcStreamingResponse`, the output is read with
+    ``await read()``, ``async for chunk in response`` or ``await write_to(file)``.
+    """
+
+    def __init__(self, headers, response):
+        self._headers = headers
+        self._response = response
+
+    @property
+    def headers(self):
+        return self._headers
+
+    async def read(self, size=-1):
+        if size is None:
+            size = -1
+        return await self._response.content.read(size)
+
+    async def iter_chunks(self, chunkSize=64 * 1024):
+        async for chunk in self._response.content.iter_chunked(chunkSize):
+            yield chunk
+
+    def __aiter__(self):
+        return self.iter_chunks()
+
+    async def write_to(self, dest, chunkSize=1024 * 1024):
+        """
+        Copy the output to a file and close the response, the file is written synchronously.
+        :return: the number of bytes written.
+        """
+        if isinstance(dest, str):
+            with open(dest, 'wb') as f:
+                return await self.write_to(f, chunkSize)
+        written = 0
+        async with self:
+            async for chunk in self.iter_chunks(chunkSize):
+                dest.write(chunk)
+                written += len(chunk)
+        return written
+
+    def close(self):
+        self._response.release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+class AsyncClient(Client):
+    """
+    Asyncio version of :class:`fc2.Client` built on aiohttp.
+    It accepts the same constructor parameters as :class:`fc2.Client`, plus:
+        connectionLimit: (optional, integer) max number of simultaneous connections, default 100, 0 means unlimited.
+        poolMaxsize: (optional, integer) max number of simultaneous connections per host, default 0 (unlimited).
+        idleTimeout: (optional, number) keep-alive timeout of idle connections in second.
+    All the API methods are coroutines that take the same parameters and return the
+    same results as their :class:`fc2.Client` counterparts, the ``iter_*`` paginators
+    are async generators to be consumed with ``async for``.
+    The connection pool is created on the first request, call ``await client.close()``
+    or use ``async with`` to release it.
+    """
+
+    def __init__(self, **kwargs):
+        if aiohttp is None:
+            raise ImportError(
+                'aiohttp is required by AsyncClient, install it with `pip install aliyun-fc2[async]`.')
+        super(AsyncClient, self).__init__(**kwargs)
+        self.connection_limit = kwargs.get('connectionLimit', 100)
+        self.pool_maxsize = kwargs.get('poolMaxsize', 0)
+
+    def __enter__(self):
+        raise TypeError("AsyncClient is an asynchronous context manager, use 'async with' in place of 'with'.")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the connection pool of this client.
+        """
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector_kwargs = {'limit': self.connection_limit,
+                                'limit_per_host': self.pool_maxsize}
+            if self.idle_timeout is not None:
+                connector_kwargs['keepalive_timeout'] = self.idle_timeout
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(**connector_kwargs),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[_trace_config()] if self.hooks else None)
+        return self._session
+
+    async def _request(self, method, url, headers, params=None, body=None, stream=False, timings=None):
+        """
+        :param timings: (optional, dict) filled with the perf_counter() values of the 'start', the 'headers'
+                        and the 'end' of the request, and the 'connect' duration, for the hooks.
+        """
+        headers = dict(headers)
+        if isinstance(body, util.ZipFileJsonStream):
+            headers['content-length'] = str(len(body))
+        elif body is not None and headers.get('content-length') == '0':
+            # the default of the common headers, let aiohttp compute the length of the actual body.
+            del headers['content-length']
+        if isinstance(body, util.SizedIterator) or \
+                (isinstance(body, collections.abc.Iterator) and not hasattr(body, 'read')):
+            # aiohttp only streams asynchronous iterables.
+            body = _async_chunks(body)
+        kwargs = {}
+        if timings is not None:
+            timings.update(start=time.perf_counter(), connect=0.0)
+            kwargs['trace_request_ctx'] = timings
+        resp = await self._get_session().request(method, url, headers=headers, params=_to_query(params), data=body,
+                                                 **kwargs)
+        if stream and resp.status < 400 and not resp.headers.get('x-fc-error-type'):
+            return RawResponse(resp.status, resp.headers, None, resp)
+        try:
+            content = await resp.read()
+        finally:
+            resp.release()
+        if timings is not None:
+            timings['end'] = time.perf_counter()
+        return RawResponse(resp.status, resp.headers, content)
+
+    async def _iter_pages(self, listMethod, key, readAhead, *args, **kwargs):
+        """
+        Asynchronous version of :meth:`fc2.Client._iter_pages`, the next page is fetched as a
+        concurrent task when readAhead is True.
+        """
+        pending = None
+        try:
+            page = await listMethod(*args, nextToken=None, **kwargs)
+            while True:
+                nextToken = page.data.get('nextToken')
+                if nextToken and readAhead:
+                    pending = asyncio.ensure_future(listMethod(*args, nextToken=nextToken, **kwargs))
+                for item in page.data.get(key) or []:
+                    yield item
+                if not nextToken:
+                    break
+                if pending is not None:
+                    page, pending = await pending, None
+                else:
+                    page = await listMethod(*args, nextToken=nextToken, **kwargs)
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def do_http_request(self, method, serviceName, functionName, path, headers={}, params=None, body=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.do_http_request`.
+        :return: RawResponse
+        """
+        params = {} if params is None else params
+        if not isinstance(params, dict):
+            raise TypeError('`None` or `dict` required for params')
+        path = '/{0}/proxy/{1}/{2}{3}'.format(
+            self.api_version, serviceName, functionName, path if path != "" else "/")
+        url = '{0}{1}'.format(self.endpoint, path)
+        headers = self._build_common_headers(
+            method, unescape(path), headers, params, operation='do_http_request')
+        logger.debug('Do http request. Method: %s. URL: %s. Params: %s. Headers: %s', method, url, params, headers)
+        return (await self._observed_send(method, url, 'do_http_request', headers, params, body))[0]
+
+    async def _observed_send(self, method, url, operation, headers, params=None, body=None, stream=False):
+        """
+        Asynchronous version of :meth:`fc2.Client._observed_send`.
+        """
+        event = getattr(headers, 'event', None)
+        if event is None:
+            return await self._send(method, url, operation, headers, params, body, stream), fc_client._UNDECODED
+        try:
+            r = await self._send(method, url, operation, headers, params, body, stream)
+        except Exception as e:
+            self._observed_error(headers, e)
+            raise
+        return r, self._observed_response(event, operation, r, stream)
+
+    async def _send(self, method, url, operation, headers, params=None, body=None, stream=False):
+        """
+        Asynchronous version of :meth:`fc2.Client._send`, without a retry policy the request is sent once.
+        """
+        limiter = self.rate_limiter
+        policy = self.retry_policy
+        event = getattr(headers, 'event', None)
+        if policy is None:
+            if limiter is not None:
+                await limiter.acquire_async(operation)
+            if event is not None:
+                return await self._observed_attempt(event, 1, method, url, headers, params, body, stream)
+            return await self._request(method, url, headers, params=params, body=body, stream=stream)
+
+        policy.on_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            if limiter is not None:
+                await limiter.acquire_async(operation)
+            try:
+                if event is not None:
+                    r = await self._observed_attempt(event, attempt, method, url, headers, params, body, stream)
+                else:
+                    r = await self._request(method, url, headers, params=params, body=body, stream=stream)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = policy.retry_delay(operation, method, attempt, error=e)
+                if delay is None or not fc_client._rewind_body(body):
+                    raise
+                logger.warning('Retry %s in %.3fs, attempt %s failed: %s', operation, delay, attempt, e)
+            else:
+                delay = policy.retry_delay(operation, method, attempt, response=r)
+                if delay is None or not fc_client._rewind_body(body):
+                    return r
+                logger.warning('Retry %s in %.3fs, attempt %s failed with status %s. Request id: %s',
+                               operation, delay, attempt, r.status_code, r.headers.get('X-Fc-Request-Id'))
+            if event is not None:
+                event.retry_delay = delay
+                call_hooks(self.hooks, 'on_retry', event)
+            await asyncio.sleep(delay)
+
+    async def _observed_attempt(self, event, attempt, method, url, headers, params, body, stream):
+        """ Asynchronous version of :meth:`fc2.Client._observed_attempt`. """
+        event.begin_attempt(attempt)
+        call_hooks(self.hooks, 'before_send', event)
+        timings = {}
+        try:
+            r = await self._request(method, url, headers, params=params, body=body, stream=stream, timings=timings)
+        except Exception as e:
+            event.error = e
+            event.timings['connect'] = timings.get('connect', 0.0)
+            raise
+        start = timings['start']
+        received = timings.get('headers', start)
+        event.record_response(r.status_code, r.headers, timings['connect'], received - start,
+                              timings.get('end', received) - received)
+        return r
+
+    async def _do_request(self, method, path, headers, params=None, body=None, operation=None, stream=False):
+        return (await self._perform_request(method, path, headers, params, body, operation, stream))[0]
+
+    async def _do_json_request(self, method, path, headers, params=None, body=None, operation=None):
+        r, data = await self._perform_request(method, path, headers, params, body, operation)
+        return r, r.json() if data is fc_client._UNDECODED else data
+
+    async def _perform_request(self, method, path, headers, params=None, body=None, operation=None, stream=False):
+        url = '{0}{1}'.format(self.endpoint, path)
+        logger.debug('Perform http request. Method: %s. URL: %s. Headers: %s', method, url, headers)
+        r, data = await self._observed_send(method, url, operation, headers, params, body, stream)
+
+        if r.status_code < 400:
+            logger.debug('Http status code: %s. Method: %s. URL: %s. Headers: %s',
+                         r.status_code, method, url, r.headers)
+        else:
+            logger.error('Request error: %s. Method: %s. URL: %s. Request headers: %s. Response headers: %s',
+                         r.status_code, method, url, headers, r.headers)
+            error = fc_client._gen_request_err(r)
+            self._observed_error(headers, error)
+            raise error
+
+        return r, data
+
+    async def get_account_settings(self, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_account_settings`.
+        """
+        method = 'GET'
+        path = '/{0}/account-settings'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='get_account_settings')
+        r, data = await self._do_json_request(method, path, headers, operation='get_account_settings')
+        return FcHttpResponse(r.headers, data)
+
+    async def create_service(self, serviceName, description=None, logConfig=None, role=None, headers={},
+                             internetAccess=None, vpcConfig=None, nasConfig=None, tracingConfig=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.create_service`.
+        """
+        method = 'POST'
+        path = '/{0}/services'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='create_service')
+
+        payload = {'serviceName': serviceName, 'description': description}
+        if logConfig:
+            payload['logConfig'] = logConfig
+        if role:
+            payload['role'] = role
+        if vpcConfig:
+            payload['vpcConfig'] = vpcConfig
+        if internetAccess != None:
+            payload['internetAccess'] = internetAccess
+        if nasConfig:
+            payload['nasConfig'] = nasConfig
+        if tracingConfig:
+            payload['tracingConfig'] = tracingConfig
+
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='create_service')
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_service(self, serviceName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_service`.
+        """
+        method = 'DELETE'
+        path = '/{0}/services/{1}'.format(self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='delete_service')
+
+        await self._do_request(method, path, headers, operation='delete_service')
+
+    async def update_service(self, serviceName, description=None, logConfig=None, role=None, headers={},
+                             internetAccess=None, vpcConfig=None, nasConfig=None, tracingConfig=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.update_service`.
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}'.format(self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='update_service')
+
+        payload = {}
+        if description:
+            payload['description'] = description
+        if logConfig:
+            payload['logConfig'] = logConfig
+        if role:
+            payload['role'] = role
+        if internetAccess is not None:
+            payload['internetAccess'] = internetAccess
+        if vpcConfig:
+            payload['vpcConfig'] = vpcConfig
+        if nasConfig:
+            payload['nasConfig'] = nasConfig
+        if tracingConfig is not None:
+            payload['tracingConfig'] = tracingConfig
+
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='update_service')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_service(self, serviceName, headers={}, qualifier=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_service`.
+        """
+        method = 'GET'
+        if qualifier:
+            serviceName += '{0}{1}'.format(delimiter, qualifier)
+        path = '/{0}/services/{1}'.format(self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='get_service')
+
+        r, data = await self._do_json_request(method, path, headers, operation='get_service')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_services(self, limit=None, nextToken=None, prefix=None, startKey=None, headers={}, tags=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_services`.
+        """
+        method = 'GET'
+        path = '/{0}/services'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='list_services')
+
+        paramlst = [('limit', limit), ('prefix', prefix),
+                    ('nextToken', nextToken), ('startKey', startKey)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        if tags:
+            for k, v in tags.items():
+                params["tag_" + k] = v
+
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_services')
+        return FcHttpResponse(r.headers, data)
+
+    async def create_function(
+            self, serviceName, functionName, runtime, handler,
+            initializer=None, initializationTimeout=30,
+            codeZipFile=None, codeDir=None, codeOSSBucket=None, codeOSSObject=None,
+            description=None, memorySize=256, timeout=60, headers={}, environmentVariables=None,
+            instanceConcurrency=None, customContainerConfig=None, caPort=None, instanceType=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.create_function`.
+        """
+        method = 'POST'
+        path = '/{0}/services/{1}/functions'.format(
+            self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='create_function')
+
+        # zipping codeDir would block the event loop.
+        payload = await asyncio.get_event_loop().run_in_executor(
+            None, self._create_function_payload,
+            functionName, runtime, handler, initializer, initializationTimeout,
+            codeZipFile, codeDir, codeOSSBucket, codeOSSObject, description, memorySize, timeout,
+            environmentVariables, instanceConcurrency, customContainerConfig, caPort, instanceType)
+
+        body = self._function_body(payload)
+        try:
+            r, data = await self._do_json_request(method, path, headers, body=body, operation='create_function')
+        finally:
+            if isinstance(body, util.ZipFileJsonStream):
+                body.close()
+        return FcHttpResponse(r.headers, data)
+
+    async def update_function(
+            self, serviceName, functionName,
+            initializer=None, initializationTimeout=None,
+            codeZipFile=None, codeDir=None, codeOSSBucket=None, codeOSSObject=None,
+            description=None, handler=None, memorySize=None, runtime=None, timeout=None,
+            headers={}, environmentVariables=None, instanceConcurrency=None, customContainerConfig=None,
+            caPort=None, instanceType=None, skipUnchangedCode=False):
+        """
+        Asynchronous version of :meth:`fc2.Client.update_function`.
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}/functions/{2}'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='update_function')
+
+        payload = await asyncio.get_event_loop().run_in_executor(
+            None, self._update_function_payload,
+            runtime, handler, initializer, initializationTimeout,
+            codeZipFile, codeDir, codeOSSBucket, codeOSSObject, description, memorySize, timeout,
+            environmentVariables, instanceConcurrency, customContainerConfig, caPort, instanceType)
+        if skipUnchangedCode:
+            deployed = await self.get_function(serviceName, functionName)
+            await asyncio.get_event_loop().run_in_executor(
+                None, self._skip_unchanged_code, payload, deployed.data.get('codeChecksum'))
+
+        body = self._function_body(payload)
+        try:
+            r, data = await self._do_json_request(method, path, headers, body=body, operation='update_function')
+        finally:
+            if isinstance(body, util.ZipFileJsonStream):
+                body.close()
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_function(self, serviceName, functionName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_function`.
+        """
+        method = 'DELETE'
+        path = '/{0}/services/{1}/functions/{2}'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='delete_function')
+
+        await self._do_request(method, path, headers, operation='delete_function')
+
+    async def get_function(self, serviceName, functionName, headers={}, qualifier=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_function`.
+        """
+        method = 'GET'
+        if qualifier:
+            serviceName += '{0}{1}'.format(delimiter, qualifier)
+        path = '/{0}/services/{1}/functions/{2}'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='get_function')
+
+        r, data = await self._do_json_request(method, path, headers, operation='get_function')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_function_code(self, serviceName, functionName, headers={}, qualifier=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_function_code`.
+        """
+        method = 'GET'
+        if qualifier:
+            serviceName += '{0}{1}'.format(delimiter, qualifier)
+        path = '/{0}/services/{1}/functions/{2}/code'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='get_function_code')
+
+        r, data = await self._do_json_request(method, path, headers, operation='get_function_code')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_functions(self, serviceName, limit=None, nextToken=None, prefix=None, startKey=None, headers={},
+                             qualifier=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_functions`.
+        """
+        method = 'GET'
+        if qualifier:
+            serviceName += '{0}{1}'.format(delimiter, qualifier)
+        path = '/{0}/services/{1}/functions'.format(
+            self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='list_functions')
+
+        paramlst = [('limit', limit), ('prefix', prefix),
+                    ('nextToken', nextToken), ('startKey', startKey)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_functions')
+        return FcHttpResponse(r.headers, data)
+
+    async def invoke_function(self, serviceName, functionName, payload=None, headers={}, qualifier=None,
+                              hedge=False, stream=False):
+        """
+        Asynchronous version of :meth:`fc2.Client.invoke_function`.
+        The request which loses a hedged invocation is cancelled, a streamed output is returned as an
+        AsyncFcStreamingResponse.
+        """
+        key = (serviceName, qualifier or None, functionName)
+        invoke = functools.partial(self._invoke, stream=True) if stream else self._invoke
+        policy = self._hedging_policy(False if stream else hedge, headers, payload)
+        if policy is not None:
+            invoke = functools.partial(self._hedged_invoke, policy, key)
+        if self.concurrency_limiter is not None:
+            limit = self.concurrency_limiter.get(serviceName, qualifier, functionName)
+            invoke = functools.partial(self._limited_invoke, limit, invoke)
+        breaker = None
+        if self.circuit_breakers is not None:
+            breaker = self.circuit_breakers.get(serviceName, qualifier, functionName)
+        method = 'POST'
+        if qualifier:
+            serviceName += '{0}{1}'.format(delimiter, qualifier)
+        path = '/{0}/services/{1}/functions/{2}/invocations'.format(
+            self.api_version, serviceName, functionName)
+        body, length = util.prepare_payload(payload)
+        headers = self._build_common_headers(method, path, headers, operation='invoke_function')
+        if length is None:
+            # the payload is sent with the chunked transfer encoding.
+            headers.pop('content-length', None)
+        else:
+            headers['content-length'] = str(length)
+
+        if breaker is None:
+            return await invoke(method, path, headers, body)
+        try:
+            breaker.acquire()
+        except fc_exceptions.FcError as e:
+            # the call is rejected by the open circuit.
+            self._observed_error(headers, e)
+            raise
+        start = time.time()
+        try:
+            response = await invoke(method, path, headers, body)
+        except Exception as e:
+            breaker.record_error(e, time.time() - start)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(False, time.time() - start)
+        return response
+
+    async def _invoke(self, method, path, headers, payload, stream=False):
+        r = await self._do_request(method, path, headers, body=payload, operation='invoke_function', stream=stream)
+        if r.headers.get('x-fc-error-type', ''):
+            # For custom runtime Error exception
+            logger.error('Function execution error. Path: %s. Headers: %s', path, r.headers)
+            error = fc_client._gen_request_err(r)
+            self._observed_error(headers, error)
+            raise error
+
+        if stream:
+            return AsyncFcStreamingResponse(r.headers, r.stream)
+        return FcHttpResponse(r.headers, r.content)
+
+    async def _limited_invoke(self, limit, invoke, method, path, headers, payload):
+        start = await limit.acquire_async()
+        try:
+            response = await invoke(method, path, headers, payload)
+        except Exception as e:
+            limit.release(start, e)
+            raise
+        except BaseException:
+            limit.release(start, ignore=True)
+            raise
+        limit.release(start)
+        return response
+
+    async def _hedged_invoke(self, policy, key, method, path, headers, payload):
+        policy.on_request()
+        delay = policy.delay_for(key)
+        start = time.time()
+        if delay is None:
+            response = await self._invoke(method, path, headers, payload)
+            policy.record(key, time.time() - start)
+            return response
+
+        requests_headers = {}
+
+        def submit(hedge):
+            request_headers = self._fork_headers(headers, hedge)
+            task = asyncio.ensure_future(self._invoke(method, path, request_headers, payload))
+            requests_headers[task] = request_headers
+            return task
+
+        primary = submit(False)
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not policy.try_hedge():
+                try:
+                    response = await primary
+                except Exception as e:
+                    self._observed_hedge(headers, requests_headers[primary], e)
+                    raise
+                self._observed_hedge(headers, requests_headers[primary])
+                policy.record(key, time.time() - start)
+                return response
+
+            logger.debug('Hedging the invocation of %s after %.3fs', key, delay)
+            pending.add(submit(True))
+            error = failed = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        if error is None:
+                            error, failed = task.exception(), task
+                        continue
+                    self._observed_hedge(headers, requests_headers[task])
+                    policy.record(key, time.time() - start)
+                    return task.result()
+            self._observed_hedge(headers, requests_headers[failed], error)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _invoke_one(self, index, serviceName, functionName, payload, headers, qualifier):
+        start = time.time()
+        try:
+            r = await self.invoke_function(serviceName, functionName, payload=payload,
+                                           headers=headers, qualifier=qualifier)
+            return InvokeResult(index, response=r, latency=time.time() - start)
+        except (fc_exceptions.FcError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return InvokeResult(index, error=e, latency=time.time() - start)
+
+    async def invoke_many(self, serviceName, functionName, payloads, concurrency=10, qualifier=None, headers={},
+                          ordered=False):
+        """
+        Asynchronous version of :meth:`fc2.Client.invoke_many`, to be consumed with ``async for``.
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be a positive integer')
+
+        items = enumerate(payloads)
+
+        def submit():
+            item = next(items, None)
+            if item is None:
+                return None
+            return asyncio.ensure_future(self._invoke_one(
+                item[0], serviceName, functionName, item[1], headers, qualifier))
+
+        running = collections.deque() if ordered else set()
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(running) < concurrency:
+                    task = submit()
+                    if task is None:
+                        exhausted = True
+                    elif ordered:
+                        running.append(task)
+                    else:
+                        running.add(task)
+                if not running:
+                    break
+                if ordered:
+                    yield await running.popleft()
+                else:
+                    done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def create_trigger(self, serviceName, functionName, triggerName, triggerType, triggerConfig, sourceArn,
+                             invocationRole, headers={}, qualifier=None, description=''):
+        """
+        Asynchronous version of :meth:`fc2.Client.create_trigger`.
+        """
+        method = 'POST'
+        path = '/{0}/services/{1}/functions/{2}/triggers'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='create_trigger')
+        payload = {'triggerName': triggerName, 'description': description, 'triggerType': triggerType,
+                   'triggerConfig': triggerConfig, 'sourceArn': sourceArn, 'invocationRole': invocationRole,
+                   'qualifier': qualifier}
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='create_trigger')
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_trigger(self, serviceName, functionName, triggerName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_trigger`.
+        """
+        method = 'DELETE'
+        path = '/{0}/services/{1}/functions/{2}/triggers/{3}'.format(
+            self.api_version, serviceName, functionName, triggerName)
+        headers = self._build_common_headers(method, path, headers, operation='delete_trigger')
+        await self._do_request(method, path, headers, operation='delete_trigger')
+
+    async def update_trigger(self, serviceName, functionName, triggerName, triggerConfig=None, invocationRole=None,
+                             headers={}, qualifier=None, description=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.update_trigger`.
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}/functions/{2}/triggers/{3}'.format(
+            self.api_version, serviceName, functionName, triggerName)
+        headers = self._build_common_headers(method, path, headers, operation='update_trigger')
+        payload = {}
+        if description:
+            payload['description'] = description
+        if triggerConfig:
+            payload['triggerConfig'] = triggerConfig
+        if invocationRole:
+            payload['invocationRole'] = invocationRole
+        if qualifier:
+            payload['qualifier'] = qualifier
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='update_trigger')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_trigger(self, serviceName, functionName, triggerName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_trigger`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}/functions/{2}/triggers/{3}'.format(
+            self.api_version, serviceName, functionName, triggerName)
+        headers = self._build_common_headers(method, path, headers, operation='get_trigger')
+        r, data = await self._do_json_request(method, path, headers, operation='get_trigger')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_triggers(self, serviceName, functionName, limit=None, nextToken=None, prefix=None, startKey=None,
+                            headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_triggers`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}/functions/{2}/triggers'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='list_triggers')
+        paramlst = [('limit', limit), ('prefix', prefix),
+                    ('nextToken', nextToken), ('startKey', startKey)]
+        params = dict((k, v) for k, v in paramlst if v)
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_triggers')
+        return FcHttpResponse(r.headers, data)
+
+    async def create_custom_domain(self, domainName, protocol=None, routeConfig=None, headers={}, certConfig=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.create_custom_domain`.
+        """
+        method = 'POST'
+        path = '/{0}/custom-domains'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='create_custom_domain')
+
+        payload = {'domainName': domainName}
+        if protocol:
+            payload['protocol'] = protocol
+        if routeConfig:
+            payload['routeConfig'] = routeConfig
+        if certConfig:
+            payload['certConfig'] = certConfig
+
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'),
+                                              operation='create_custom_domain')
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_custom_domain(self, domainName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_custom_domain`.
+        """
+        method = 'DELETE'
+        path = '/{0}/custom-domains/{1}'.format(self.api_version, domainName)
+        headers = self._build_common_headers(method, path, headers, operation='delete_custom_domain')
+
+        await self._do_request(method, path, headers, operation='delete_custom_domain')
+
+    async def update_custom_domain(self, domainName, protocol=None, routeConfig=None, headers={}, certConfig=None):
+        """
+        Asynchronous version of :meth:`fc2.Client.update_custom_domain`.
+        """
+        method = 'PUT'
+        path = '/{0}/custom-domains/{1}'.format(self.api_version, domainName)
+        headers = self._build_common_headers(method, path, headers, operation='update_custom_domain')
+
+        payload = {}
+        if protocol:
+            payload['protocol'] = protocol
+        if routeConfig:
+            payload['routeConfig'] = routeConfig
+        if certConfig:
+            payload['certConfig'] = certConfig
+
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'),
+                                              operation='update_custom_domain')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_custom_domain(self, domainName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_custom_domain`.
+        """
+        method = 'GET'
+        path = '/{0}/custom-domains/{1}'.format(self.api_version, domainName)
+        headers = self._build_common_headers(method, path, headers, operation='get_custom_domain')
+
+        r, data = await self._do_json_request(method, path, headers, operation='get_custom_domain')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_custom_domains(self, limit=None, nextToken=None, prefix=None, startKey=None, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_custom_domains`.
+        """
+        method = 'GET'
+        path = '/{0}/custom-domains'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='list_custom_domains')
+
+        paramlst = [('limit', limit), ('prefix', prefix),
+                    ('nextToken', nextToken), ('startKey', startKey)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_custom_domains')
+        return FcHttpResponse(r.headers, data)
+
+    async def publish_version(self, serviceName, description=None, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.publish_version`.
+        """
+        method = 'POST'
+        path = '/{0}/services/{1}/versions'.format(
+            self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='publish_version')
+
+        payload = {}
+        if description:
+            payload['description'] = description
+
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='publish_version')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_versions(self, serviceName, limit=None, nextToken=None, startKey=None, direction=None,
+                            headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_versions`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}/versions'.format(
+            self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='list_versions')
+
+        paramlst = [('limit', limit), ('nextToken', nextToken),
+                    ('startKey', startKey), ('direction', direction)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_versions')
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_version(self, serviceName, versionId, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_version`.
+        """
+        method = 'DELETE'
+        path = '/{0}/services/{1}/versions/{2}'.format(
+            self.api_version, serviceName, versionId)
+        headers = self._build_common_headers(method, path, headers, operation='delete_version')
+
+        await self._do_request(method, path, headers, operation='delete_version')
+
+    async def create_alias(self, serviceName, aliasName, versionId, description=None, additionalVersionWeight=None,
+                           headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.create_alias`.
+        """
+        method = 'POST'
+        path = '/{0}/services/{1}/aliases'.format(
+            self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='create_alias')
+
+        payload = {'aliasName': aliasName, 'versionId': versionId}
+        if description:
+            payload['description'] = description
+        if additionalVersionWeight != None:
+            payload['additionalVersionWeight'] = additionalVersionWeight
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='create_alias')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_alias(self, serviceName, aliasName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_alias`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}/aliases/{2}'.format(
+            self.api_version, serviceName, aliasName)
+        headers = self._build_common_headers(method, path, headers, operation='get_alias')
+
+        r, data = await self._do_json_request(method, path, headers, operation='get_alias')
+        return FcHttpResponse(r.headers, data)
+
+    async def update_alias(self, serviceName, aliasName, versionId, description=None, additionalVersionWeight=None,
+                           headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.update_alias`.
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}/aliases/{2}'.format(
+            self.api_version, serviceName, aliasName)
+        headers = self._build_common_headers(method, path, headers, operation='update_alias')
+
+        payload = {}
+        if versionId:
+            payload['versionId'] = versionId
+        if description:
+            payload['description'] = description
+        if additionalVersionWeight != None:
+            payload['additionalVersionWeight'] = additionalVersionWeight
+
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='update_alias')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_aliases(self, serviceName, limit=None, nextToken=None, prefix=None, startKey=None, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_aliases`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}/aliases'.format(
+            self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='list_aliases')
+
+        paramlst = [('limit', limit), ('prefix', prefix),
+                    ('nextToken', nextToken), ('startKey', startKey)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_aliases')
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_alias(self, serviceName, aliasName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_alias`.
+        """
+        method = 'DELETE'
+        path = '/{0}/services/{1}/aliases/{2}'.format(
+            self.api_version, serviceName, aliasName)
+        headers = self._build_common_headers(method, path, headers, operation='delete_alias')
+
+        await self._do_request(method, path, headers, operation='delete_alias')
+
+    async def tag_resource(self, resourceArn, tags, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.tag_resource`.
+        """
+        method = 'POST'
+        path = '/{0}/tag'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='tag_resource')
+        payload = {
+            'resourceArn': resourceArn,
+            'tags': tags
+        }
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='tag_resource')
+        return FcHttpResponse(r.headers, data)
+
+    async def untag_resource(self, resourceArn, tagKeys, deleteAll=False, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.untag_resource`.
+        """
+        method = 'DELETE'
+        path = '/{0}/tag'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='untag_resource')
+        payload = {
+            'resourceArn': resourceArn,
+            'tagKeys': tagKeys,
+            'all': deleteAll
+        }
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'), operation='untag_resource')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_resource_tags(self, resourceArn, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_resource_tags`.
+        """
+        method = 'GET'
+        path = '/{0}/tag'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='get_resource_tags')
+
+        params = {"resourceArn": resourceArn}
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='get_resource_tags')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_reserved_capacities(self, limit=None, nextToken=None, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_reserved_capacities`.
+        """
+        method = 'GET'
+        path = '/{0}/reservedCapacities'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='list_reserved_capacities')
+
+        paramlst = [('limit', limit), ('nextToken', nextToken)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        r, data = await self._do_json_request(method, path, headers, params=params,
+                                              operation='list_reserved_capacities')
+        return FcHttpResponse(r.headers, data)
+
+    async def put_on_demand_config(self, serviceName, alias, functionName, maximumInstanceCount, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.put_on_demand_config`.
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}.{2}/functions/{3}/on-demand-config'.format(
+            self.api_version, serviceName, alias, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='put_on_demand_config')
+        payload = {
+            'maximumInstanceCount': maximumInstanceCount,
+        }
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'),
+                                              operation='put_on_demand_config')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_on_demand_config(self, serviceName, alias, functionName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_on_demand_config`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}.{2}/functions/{3}/on-demand-config'.format(
+            self.api_version, serviceName, alias, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='get_on_demand_config')
+        r, data = await self._do_json_request(method, path, headers, operation='get_on_demand_config')
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_on_demand_config(self, serviceName, alias, functionName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_on_demand_config`.
+        """
+        method = 'DELETE'
+        path = '/{0}/services/{1}.{2}/functions/{3}/on-demand-config'.format(
+            self.api_version, serviceName, alias, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='delete_on_demand_config')
+        r = await self._do_request(method, path, headers, operation='delete_on_demand_config')
+        return FcHttpResponse(r.headers, None)
+
+    async def list_on_demand_config(self, limit=100, nextToken=None, prefix=None, startKey=None, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_on_demand_config`.
+        """
+        method = 'GET'
+        path = '/{0}/on-demand-configs'.format(self.api_version)
+
+        paramlst = [('limit', limit), ('prefix', prefix),
+                    ('nextToken', nextToken), ('startKey', startKey)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        headers = self._build_common_headers(method, path, headers, operation='list_on_demand_config')
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_on_demand_config')
+        return FcHttpResponse(r.headers, data)
+
+    async def put_provision_config(self, serviceName, qualifier, functionName, target, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.put_provision_config`.
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}.{2}/functions/{3}/provision-config'.format(
+            self.api_version, serviceName, qualifier, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='put_provision_config')
+        payload = {
+            'target': target,
+        }
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'),
+                                              operation='put_provision_config')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_provision_config(self, serviceName, qualifier, functionName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_provision_config`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}.{2}/functions/{3}/provision-config'.format(
+            self.api_version, serviceName, qualifier, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='get_provision_config')
+
+        r, data = await self._do_json_request(method, path, headers, operation='get_provision_config')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_provision_configs(self, serviceName, qualifier, limit=None, nextToken=None, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_provision_configs`.
+        """
+        if qualifier and (not serviceName):
+            raise Exception(
+                'serviceName is required when qualifier is not empty')
+        method = 'GET'
+        path = '/{0}/provision-configs'.format(self.api_version)
+        headers = self._build_common_headers(method, path, headers, operation='list_provision_configs')
+
+        paramlst = [('serviceName', serviceName), ('qualifier', qualifier),
+                    ('limit', limit), ('nextToken', nextToken)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        r, data = await self._do_json_request(method, path, headers, params=params, operation='list_provision_configs')
+        return FcHttpResponse(r.headers, data)
+
+    async def put_function_async_invoke_config(self, serviceName, qualifier, functionName, asyncConfig, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.put_function_async_invoke_config`.
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}.{2}/functions/{3}/async-invoke-config'.format(
+            self.api_version, serviceName, qualifier, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='put_function_async_invoke_config')
+        payload = asyncConfig
+        r, data = await self._do_json_request(method, path, headers,
+                                              body=json.dumps(payload).encode('utf-8'),
+                                              operation='put_function_async_invoke_config')
+        return FcHttpResponse(r.headers, data)
+
+    async def get_function_async_invoke_config(self, serviceName, qualifier, functionName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.get_function_async_invoke_config`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}.{2}/functions/{3}/async-invoke-config'.format(
+            self.api_version, serviceName, qualifier, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='get_function_async_invoke_config')
+
+        r, data = await self._do_json_request(method, path, headers, operation='get_function_async_invoke_config')
+        return FcHttpResponse(r.headers, data)
+
+    async def list_function_async_invoke_configs(self, serviceName, functionName, limit=None, nextToken=None,
+                                                 headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_function_async_invoke_configs`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}/functions/{2}/async-invoke-configs'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='list_function_async_invoke_configs')
+
+        paramlst = [('limit', limit), ('nextToken', nextToken)]
+        params = dict((k, v) for k, v in paramlst if v)
+
+        r, data = await self._do_json_request(method, path, headers, params=params,
+                                              operation='list_function_async_invoke_configs')
+        return FcHttpResponse(r.headers, data)
+
+    async def delete_function_async_invoke_config(self, serviceName, qualifier, functionName, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.delete_function_async_invoke_config`.
+        """
+        method = 'DELETE'
+        path = '/{0}/services/{1}.{2}/functions/{3}/async-invoke-config'.format(
+            self.api_version, serviceName, qualifier, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='delete_function_async_invoke_config')
+
+        await self._do_request(method, path, headers, operation='delete_function_async_invoke_config')
+
+    async def list_instances(self, serviceName, qualifier, functionName, params={}, headers={}):
+        """
+        Asynchronous version of :meth:`fc2.Client.list_instances`.
+        """
+        method = 'GET'
+        path = '/{0}/services/{1}.{2}/functions/{3}/instances'.format(
+            self.api_version, serviceName, qualifier, functionName)
+
+        headers = self._build_common_headers(method, path, headers, operation='list_instances')
+
+        r, data = await self._do_json_request(method, path, headers, params, operation='list_instances')
+        return FcHttpResponse(r.headers, data)
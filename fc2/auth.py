@@ -5,25 +5,65 @@ import hashlib
 import hmac
 import base64
 import logging
+import operator
+
+from .credentials import Credentials
+
+logger = logging.getLogger(__name__)
+
+# the headers every request carries which are never part of the canonical headers.
+_COMMON_HEADERS = frozenset(['host', 'date', 'content-type', 'content-length', 'content-md5', 'user-agent',
+                             'authorization'])
+_header_key = operator.itemgetter(0)
+
 
 class Auth(object):
-    def __init__(self, access_key_id, access_key_secret, security_token=""):
+    def __init__(self, access_key_id, access_key_secret, security_token="", credentials_provider=None):
         self.id = access_key_id.strip()
         self.secret = access_key_secret.strip()
         self.security_token = security_token.strip()
+        # when set, the credentials are taken from the provider instead of id/secret/security_token.
+        self.credentials_provider = credentials_provider
+        # (secret, keyed hmac) replaced as a whole, so concurrent requests never mix them up.
+        self._hmac_state = None
+
+    def get_credentials(self):
+        """
+        The credentials to sign the next request with. The access key id, secret and security token
+        of a request must come from the same Credentials, as a provider may rotate them at any time.
+        :return: fc2.credentials.Credentials
+        """
+        if self.credentials_provider is not None:
+            return self.credentials_provider.get_credentials()
+        return Credentials(self.id, self.secret, self.security_token, None)
+
+    def _signer(self, secret):
+        """
+        The HMAC-SHA256 object keyed with the secret, before any data is fed to it. It is built once
+        per secret and copied for every request, which skips encoding the key and computing
+        the inner and outer padded key digests each time.
+        """
+        state = self._hmac_state
+        if state is None or state[0] != secret:
+            state = (secret, hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256))
+            self._hmac_state = state
+        return state[1]
 
     def __call__(self, r):
         return r
 
-    def sign_request(self, method, unescaped_path, headers, unescaped_queries=None):
+    def sign_request(self, method, unescaped_path, headers, unescaped_queries=None, credentials=None):
         """
         Sign the request. See the spec for reference.
         https://help.aliyun.com/document_detail/52877.html
         :param method: method of the http request.
         :param headers: headers of the http request.
         :param unescaped_path: unescaped path without queries of the http request.
+        :param credentials: the Credentials to sign with, default the ones of get_credentials().
         :return: the signature string.
         """
+        if credentials is None:
+            credentials = self.get_credentials()
         content_md5 = headers.get('content-md5', '')
         content_type = headers.get('content-type', '')
         date = headers.get('date', '')
@@ -33,9 +73,11 @@ class Auth(object):
             canonical_resource = Auth._get_sign_resource(unescaped_path, unescaped_queries)
         string_to_sign = '\n'.join(
             [method.upper(), content_md5, content_type, date, canonical_headers + canonical_resource])
-        logging.debug('string to sign:{0}'.format(string_to_sign))
-        h = hmac.new(self.secret.encode('utf-8'), string_to_sign.encode('utf-8'), hashlib.sha256)
-        signature = 'FC ' + self.id + ':' + base64.b64encode(h.digest()).decode('utf-8')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('string to sign:%s', string_to_sign)
+        h = self._signer(credentials.access_key_secret).copy()
+        h.update(string_to_sign.encode('utf-8'))
+        signature = 'FC ' + credentials.access_key_id + ':' + base64.b64encode(h.digest()).decode('utf-8')
         return signature
 
     @staticmethod
@@ -67,13 +109,16 @@ class Auth(object):
         """
         canonical_headers = []
         for k, v in headers.items():
-            lower_key = k.lower()
-            if lower_key.startswith('x-fc-'):
-                canonical_headers.append((lower_key, v))
-        canonical_headers.sort(key=lambda x: x[0])
-        if canonical_headers:
-            return '\n'.join(k + ':' + v for k, v in canonical_headers) + '\n'
-        else:
+            # fast path for the headers set by the client, which are already lowercase.
+            if k in _COMMON_HEADERS:
+                continue
+            if k.startswith('x-fc-'):
+                canonical_headers.append((k, v))
+            elif k[:5].lower() == 'x-fc-':
+                canonical_headers.append((k.lower(), v))
+        if not canonical_headers:
             return ''
+        canonical_headers.sort(key=_header_key)
+        return ''.join([k + ':' + v + '\n' for k, v in canonical_headers])
 
 
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+import threading
+import time
+
+from . import fc_exceptions
+from .ratelimit import RateLimitExceededError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(fc_exceptions.FcError):
+    """
+    Raised instead of sending a request while the circuit of the function is open.
+    """
+
+    def __init__(self, key, retry_in):
+        message = 'Circuit breaker of {0} is open, retry in {1:.1f}s'.format(key, retry_in)
+        super(CircuitOpenError, self).__init__(message, 503, 'CircuitOpen', '')
+        self.key = key
+        self.retry_in = retry_in
+
+
+def is_failure(error):
+    """
+    Whether an error of a call counts against the circuit: network errors, timeouts, server errors,
+    throttling and function errors do, the other client errors (4xx) do not.
+    """
+    if isinstance(error, (CircuitOpenError, RateLimitExceededError)):
+        # the request was rejected by the client, not by the function.
+        return False
+    if isinstance(error, fc_exceptions.FcError):
+        status = error.status_code
+        return not (400 <= status < 500) or fc_exceptions.is_throttling_error(status, error.err_code)
+    return True
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker of one function.
+
+    The outcome of the calls of the last `window` seconds is kept in time buckets. Once at least
+    minCalls calls were recorded, the circuit opens when the ratio of failed calls reaches
+    failureRateThreshold, or the ratio of calls slower than slowCallDuration reaches
+    slowCallRateThreshold. While open the calls fail fast with CircuitOpenError. After openDuration
+    seconds the circuit is half-open: halfOpenCalls trial calls are let through, it closes again when
+    they all succeed and opens again as soon as one fails.
+
+    :param window: (optional, number) length of the sliding window in second, default 10.
+    :param minCalls: (optional, integer) min number of calls in the window to evaluate the rates, default 20.
+    :param failureRateThreshold: (optional, number) failure ratio opening the circuit, default 0.5.
+    :param slowCallDuration: (optional, number) duration in second above which a call is slow,
+        default None (the latency is not tracked).
+    :param slowCallRateThreshold: (optional, number) slow call ratio opening the circuit, default 0.8.
+    :param openDuration: (optional, number) time in second the circuit stays open, default 30.
+    :param halfOpenCalls: (optional, integer) number of trial calls in the half-open state, default 1.
+    :param onStateChange: (optional, callable) called with (key, old state, new state) on every transition.
+    """
+
+    _BUCKETS = 10
+
+    def __init__(self, key=None, window=10, minCalls=20, failureRateThreshold=0.5, slowCallDuration=None,
+                 slowCallRateThreshold=0.8, openDuration=30, halfOpenCalls=1, onStateChange=None):
+        self.key = key
+        self.window = float(window)
+        self.min_calls = minCalls
+        self.failure_rate_threshold = failureRateThreshold
+        self.slow_call_duration = slowCallDuration
+        self.slow_call_rate_threshold = slowCallRateThreshold
+        self.open_duration = openDuration
+        self.half_open_calls = halfOpenCalls
+        self.on_state_change = onStateChange
+        self._bucket_width = self.window / self._BUCKETS
+        # [bucket start, calls, failures, slow calls], oldest first.
+        self._buckets = collections.deque()
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+        self._trial_successes = 0
+        self._lock = threading.Lock()
+
+    def _current_bucket(self, now):
+        start = now - now % self._bucket_width
+        buckets = self._buckets
+        while buckets and buckets[0][0] <= now - self.window:
+            buckets.popleft()
+        if not buckets or buckets[-1][0] != start:
+            buckets.append([start, 0, 0, 0])
+        return buckets[-1]
+
+    def _counts(self, now):
+        self._current_bucket(now)
+        calls = failures = slow = 0
+        for _, c, f, s in self._buckets:
+            calls += c
+            failures += f
+            slow += s
+        return calls, failures, slow
+
+    def _transition(self, state, now):
+        old, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = now
+        elif state == HALF_OPEN:
+            self._trials = 0
+            self._trial_successes = 0
+        else:
+            self._buckets.clear()
+        logger.warning('Circuit breaker of %s: %s -> %s', self.key, old, state)
+        if self.on_state_change is not None:
+            self.on_state_change(self.key, old, state)
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.time() - self._opened_at >= self.open_duration:
+                self._transition(HALF_OPEN, time.time())
+            return self._state
+
+    def acquire(self):
+        """
+        Called before a call, raise CircuitOpenError when the call is not permitted.
+        """
+        with self._lock:
+            now = time.time()
+            if self._state == OPEN:
+                retry_in = self._opened_at + self.open_duration - now
+                if retry_in > 0:
+                    raise CircuitOpenError(self.key, retry_in)
+                self._transition(HALF_OPEN, now)
+            if self._state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    raise CircuitOpenError(self.key, 0)
+                self._trials += 1
+
+    def record(self, failed, duration):
+        """
+        Record the outcome of a permitted call.
+        :param failed: (bool) whether the call failed.
+        :param duration: (number) the duration of the call in second.
+        """
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        with self._lock:
+            now = time.time()
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN, now)
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self._transition(CLOSED, now)
+                return
+            if self._state == OPEN:
+                return
+            bucket = self._current_bucket(now)
+            bucket[1] += 1
+            bucket[2] += 1 if failed else 0
+            bucket[3] += 1 if slow else 0
+            calls, failures, slow_calls = self._counts(now)
+            if calls < self.min_calls:
+                return
+            if failures >= calls * self.failure_rate_threshold or \
+                    (self.slow_call_duration is not None and slow_calls >= calls * self.slow_call_rate_threshold):
+                self._transition(OPEN, now)
+
+    def record_error(self, error, duration):
+        self.record(is_failure(error), duration)
+
+    def release(self):
+        """
+        Called instead of record() when a permitted call was abandoned (cancelled) before completing.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def snapshot(self):
+        """
+        The state of the circuit for monitoring.
+        :return: dict
+        {
+            'state': 'closed',  // 'closed', 'open' or 'half_open'
+            'calls': 100,       // calls in the window
+            'failures': 3,
+            'slowCalls': 0,
+            'openedAt': None    // unix time the circuit was last opened
+        }
+        """
+        state = self.state
+        with self._lock:
+            calls, failures, slow = self._counts(time.time())
+            return {'state': state, 'calls': calls, 'failures': failures, 'slowCalls': slow,
+                    'openedAt': self._opened_at}
+
+
+class CircuitBreakerRegistry(object):
+    """
+    The circuit breakers of the functions invoked by a client, created on first use and keyed by
+    (serviceName, qualifier, functionName). Pass it to ``fc2.Client(circuitBreakers=...)``, it can be
+    shared by several clients. The keyword arguments are those of :class:`CircuitBreaker`.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, serviceName, qualifier, functionName):
+        key = (serviceName, qualifier or None, functionName)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(key, **self._kwargs)
+                    self._breakers[key] = breaker
+        return breaker
+
+    def states(self):
+        """
+        :return: dict, (serviceName, qualifier, functionName) -> CircuitBreaker.snapshot()
+        """
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return dict((key, breaker.snapshot()) for key, breaker in breakers)
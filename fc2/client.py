@@ -1,24 +1,35 @@
 # -*- coding: utf-8 -*-
 
 from requests.packages.urllib3.util.retry import Retry
+from requests.packages.urllib3 import connection as urllib3_connection, connectionpool
 from requests.adapters import HTTPAdapter
-import base64
+import collections
 import email
-import io
+import functools
+import heapq
+import itertools
 import json
 import logging
 import platform
+import socket
 import sys
+import tempfile
+import time
 import websocket
 from urllib.parse import quote
 import threading
+import types
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import requests
 
 from . import __version__
 from . import auth
 from . import fc_exceptions
+from . import hedging
 from . import util
+from .hooks import EventHeaders, RequestEvent, call_hooks
+from .ratelimit import DATA_PLANE_OPERATIONS
 
 _ver = sys.version_info
 if _ver[0] == 2:
@@ -32,6 +43,21 @@ backoff_factor = 1
 status_forcelist = (500, 502, 504)
 delimiter = '.'
 
+logger = logging.getLogger(__name__)
+
+# (unix second, Date header) of the last request, the header only changes once per second.
+_date_cache = (None, '')
+
+
+def _http_date():
+    global _date_cache
+    now = int(time.time())
+    cached = _date_cache
+    if cached[0] != now:
+        cached = (now, email.utils.formatdate(now, usegmt=True))
+        _date_cache = cached
+    return cached[1]
+
 
 def makeQuery(queries):
     array = []
@@ -44,8 +70,191 @@ def makeQuery(queries):
     return '&'.join(array)
 
 
-def requestWithTry(method, url, **kwargs):
-    with requests.Session() as session:
+# the time spent opening connections by the current thread, reset before every observed request.
+_connect_timer = threading.local()
+
+# the body of a response which was not decoded for the hooks.
+_UNDECODED = object()
+
+
+# the request of a hedged invocation sent by the current thread.
+_hedged_request = threading.local()
+
+
+class _HedgeAborted(Exception):
+    """ Raised by a request of a hedged invocation which was won by the other request. """
+
+
+class _HedgedRequest(object):
+    """
+    One of the two requests of a hedged invocation. When the other request wins, it shuts down
+    the connection this request is waiting on, and this request is not sent again.
+    """
+
+    def __init__(self):
+        self.lost = threading.Event()
+        self._lock = threading.Lock()
+        self._done = False
+        self._connection = None
+
+    def sending(self, connection):
+        with self._lock:
+            if self.lost.is_set():
+                raise _HedgeAborted('the other request of the hedged invocation completed first')
+            self._connection = connection
+
+    def received(self, connection):
+        with self._lock:
+            if self._connection is connection:
+                self._connection = None
+
+    def finish(self):
+        with self._lock:
+            self._done = True
+
+    def abort(self):
+        with self._lock:
+            if self._done:
+                return
+            self.lost.set()
+            connection, self._connection = self._connection, None
+            # under the lock: the connection is not released to the pool while it is shut down.
+            if connection is not None and connection.sock is not None:
+                try:
+                    socket.socket.shutdown(connection.sock, socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class _HedgedCall(object):
+    """ A hedged invocation, whose primary request is sent on the calling thread. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = False
+        self.primary = _HedgedRequest()
+        self.hedge_request = _HedgedRequest()
+        self.hedge = None
+        self.hedge_headers = None
+
+
+def _lost_hedge():
+    """ Whether the current thread sends a request of a hedged invocation won by the other request. """
+    request = getattr(_hedged_request, 'current', None)
+    return request is not None and request.lost.is_set()
+
+
+def _retry_sleep(delay):
+    request = getattr(_hedged_request, 'current', None)
+    if request is None:
+        time.sleep(delay)
+    else:
+        # the other request may win in the meantime.
+        request.lost.wait(delay)
+
+
+class _ObservedConnectionMixin(object):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super(_ObservedConnectionMixin, self).connect()
+        finally:
+            _connect_timer.elapsed = getattr(_connect_timer, 'elapsed', 0.0) + time.perf_counter() - start
+
+    def putrequest(self, *args, **kwargs):
+        request = getattr(_hedged_request, 'current', None)
+        if request is not None:
+            request.sending(self)
+        return super(_ObservedConnectionMixin, self).putrequest(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        # not on errors: urllib3 1.x probes getresponse(buffering=True) first, and closes the failed connections.
+        response = super(_ObservedConnectionMixin, self).getresponse(*args, **kwargs)
+        self._received()
+        return response
+
+    def close(self):
+        self._received()
+        super(_ObservedConnectionMixin, self).close()
+
+    def _received(self):
+        request = getattr(_hedged_request, 'current', None)
+        if request is not None:
+            request.received(self)
+
+
+class _ObservedHTTPConnection(_ObservedConnectionMixin, urllib3_connection.HTTPConnection):
+    pass
+
+
+class _ObservedHTTPSConnection(_ObservedConnectionMixin, urllib3_connection.HTTPSConnection):
+    pass
+
+
+class _ObservedHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = _ObservedHTTPConnection
+
+
+class _ObservedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _ObservedHTTPSConnection
+
+
+class _Timers(object):
+    """ A thread calling the functions scheduled with call_later in time order. """
+
+    def __init__(self, name):
+        self._name = name
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def call_later(self, delay, function):
+        """ :return: the timer, which cancel() takes. """
+        timer = [time.monotonic() + delay, next(self._counter), function]
+        with self._condition:
+            heapq.heappush(self._heap, timer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return timer
+
+    @staticmethod
+    def cancel(timer):
+        timer[2] = None
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    if self._heap:
+                        remaining = self._heap[0][0] - time.monotonic()
+                        if remaining <= 0:
+                            function = heapq.heappop(self._heap)[2]
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+            if function is not None:
+                try:
+                    function()
+                except Exception:
+                    logger.exception('Scheduled call %s failed', function)
+
+
+def _new_session(pool_connections=10, pool_maxsize=10, retry=None, observed=False):
+    session = requests.Session()
+    if retry is None:
         retry = Retry(
             total=retries,
             read=retries,
@@ -53,25 +262,71 @@ def requestWithTry(method, url, **kwargs):
             backoff_factor=backoff_factor,
             status_forcelist=status_forcelist,
         )
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize, max_retries=retry)
+    if observed:
+        # measure the connection setup for the hooks, and track the primary requests of the hedged invocations.
+        adapter.poolmanager.pool_classes_by_scheme = {'http': _ObservedHTTPConnectionPool,
+                                                      'https': _ObservedHTTPSConnectionPool}
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def requestWithTry(method, url, session=None, **kwargs):
+    if session is not None:
+        return session.request(method=method, url=url, **kwargs)
 
+    with _new_session() as session:
         return session.request(method=method, url=url, **kwargs)
 
 
+def _rewind_body(body):
+    """
+    Prepare a request body to be sent again.
+    :return: bool, False when the body is a stream which cannot be sent again.
+    """
+    if body is None or isinstance(body, (bytes, bytearray, str, memoryview)):
+        return True
+    if isinstance(body, util.ZipFileJsonStream):
+        body.seek(0)
+        return True
+    return False
+
+
+def _gen_request_err(r):
+    try:
+        err_d = r.json()
+    except json.JSONDecodeError:
+        err_d = {
+            'ErrorMessage': r.text,
+            'ErrorType': r.headers.get('x-fc-error-type', ''),
+            'RequestId': r.headers.get('X-Fc-Request-Id', 'unknown'),
+            'ErrorCode': r.headers.get('ErrorCode', '')
+        }
+        err_code = err_d.get('ErrorCode', '')
+        err_msg = json.dumps(err_d)
+        return fc_exceptions.get_fc_error(err_msg, r.status_code, err_code, err_d['RequestId'])
+
+    err_d['RequestId'] = r.headers.get('X-Fc-Request-Id', 'unknown')
+    err_code = err_d.get('ErrorCode', '')
+    err_msg = json.dumps(err_d)
+    return fc_exceptions.get_fc_error(err_msg, r.status_code, err_code, err_d['RequestId'])
+
+
 class Client(object):
     def __init__(self, **kwargs):
         endpoint = kwargs.get('endpoint', None)
         if not endpoint:
             raise ValueError(
                 'A valid Endpoint parameter must be specified to construct the Client object.')
+        credentials_provider = kwargs.get('credentialsProvider', None)
         access_key_id = kwargs.get("accessKeyID", None)
-        if not access_key_id:
+        if not access_key_id and credentials_provider is None:
             raise ValueError(
                 'A valid AccessKeyID parameter must be specified to construct the Client object.')
         access_key_secret = kwargs.get('accessKeySecret', None)
-        if not access_key_secret:
+        if not access_key_secret and credentials_provider is None:
             raise ValueError(
                 'A valid AccessKeySecret parameter must be specified to construct the Client object.')
         security_token = kwargs.get('securityToken', '')
@@ -82,8 +337,99 @@ class Client(object):
             'aliyun-fc-sdk-v{0}.python-{1}.{2}-{3}-{4}'. \
             format(__version__, platform.python_version(),
                    platform.system(), platform.release(), platform.machine())
-        self.auth = auth.Auth(access_key_id, access_key_secret, security_token)
+        self.auth = auth.Auth(access_key_id or '', access_key_secret or '', security_token or '',
+                              credentials_provider)
+        # the headers which are the same for every request, copied by _build_common_headers.
+        self._header_template = types.MappingProxyType({
+            'host': self.host,
+            'content-type': 'application/json',
+            'content-length': '0',
+            'user-agent': self.user_agent,
+        })
         self.timeout = kwargs.get('Timeout', 60)
+        self.pool_connections = kwargs.get('poolConnections', 10)
+        self.pool_maxsize = kwargs.get('poolMaxsize', 10)
+        self.idle_timeout = kwargs.get('idleTimeout', None)
+        self.zip_workers = kwargs.get('zipWorkers', 1)
+        self.deterministic_zip = kwargs.get('deterministicZip', False)
+        self.code_cache = kwargs.get('codeCache', None)
+        self.retry_policy = kwargs.get('retryPolicy', None)
+        self.circuit_breakers = kwargs.get('circuitBreakers', None)
+        self.hedging_policy = kwargs.get('hedgingPolicy', None)
+        self.concurrency_limiter = kwargs.get('concurrencyLimiter', None)
+        self.rate_limiter = kwargs.get('rateLimiter', None)
+        hooks = kwargs.get('hooks', None)
+        if hooks is None:
+            hooks = ()
+        elif not isinstance(hooks, (list, tuple)):
+            hooks = (hooks,)
+        self.metrics = kwargs.get('metrics', None)
+        if self.metrics is not None:
+            hooks = tuple(hooks) + (self.metrics,)
+        self.hooks = tuple(hooks)
+        self._hedge_executor = None
+        self._hedge_timers = None
+        self._session = None
+        self._session_last_used = 0
+        self._session_inflight = 0
+        self._session_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the pooled connections held by this client.
+        The client can still be used afterwards, a new pool is created on the next request.
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+            if self._hedge_timers is not None:
+                self._hedge_timers.close()
+                self._hedge_timers = None
+
+    def _get_session(self):
+        """
+        Return the long-lived session shared by all requests of this client.
+        The session is (re)created lazily, and recycled when no request is in flight
+        and the last one completed more than idleTimeout seconds ago.
+        The caller is counted as in flight until it calls _release_session().
+        """
+        now = time.time()
+        with self._session_lock:
+            if self._session is not None and self.idle_timeout is not None and self._session_inflight == 0 \
+                    and now - self._session_last_used > self.idle_timeout:
+                self._session.close()
+                self._session = None
+            if self._session is None:
+                # the retry policy replaces the retries of urllib3.
+                self._session = _new_session(self.pool_connections, self.pool_maxsize,
+                                             0 if self.retry_policy is not None else None, True)
+            self._session_last_used = now
+            self._session_inflight += 1
+            return self._session
+
+    def _release_session(self):
+        with self._session_lock:
+            self._session_inflight -= 1
+            self._session_last_used = time.time()
+
+    def _session_request(self, method, url, headers, params, body, stream):
+        """ Send one attempt on the shared session, which is in flight until its response is received. """
+        session = self._get_session()
+        try:
+            return requestWithTry(method, url, session=session, headers=headers,
+                                  params=params, data=body, timeout=self.timeout, stream=stream)
+        finally:
+            self._release_session()
 
     @staticmethod
     def _normalize_endpoint(url):
@@ -102,26 +448,35 @@ class Client(object):
 
         return endpoint.strip()
 
-    def _build_common_headers(self, method, path, customHeaders={}, unescaped_queries=None):
-        headers = {
-            'host': self.host,
-            'date': email.utils.formatdate(usegmt=True),
-            'content-type': 'application/json',
-            'content-length': '0',
-            'user-agent': self.user_agent,
-        }
-        if self.auth.security_token != '':
-            headers['x-fc-security-token'] = self.auth.security_token
+    def _build_common_headers(self, method, path, customHeaders={}, unescaped_queries=None, operation=None):
+        headers = self._header_template.copy() if not self.hooks else EventHeaders(self._header_template)
+        headers['date'] = _http_date()
+        credentials = self.auth.get_credentials()
+        if credentials.security_token != '':
+            headers['x-fc-security-token'] = credentials.security_token
 
         if customHeaders:
             headers.update(customHeaders)
 
+        if self.hooks:
+            return self._sign_observed(operation, method, path, headers, unescaped_queries, credentials)
+
         # Sign the request and set the signature to headers.
         headers['authorization'] = self.auth.sign_request(
-            method, path, headers, unescaped_queries)
+            method, path, headers, unescaped_queries, credentials)
 
         return headers
 
+    def _sign_observed(self, operation, method, path, headers, unescaped_queries, credentials):
+        event = RequestEvent(operation, method, path, headers)
+        headers.event = event
+        call_hooks(self.hooks, 'before_sign', event)
+        start = time.perf_counter()
+        headers['authorization'] = self.auth.sign_request(
+            method, path, headers, unescaped_queries, credentials)
+        event.timings['sign'] = time.perf_counter() - start
+        return headers
+
     def do_http_request(self, method, serviceName, functionName, path, headers={}, params=None, body=None):
         params = {} if params is None else params
         if not isinstance(params, dict):
@@ -130,63 +485,209 @@ class Client(object):
             self.api_version, serviceName, functionName, path if path != "" else "/")
         url = '{0}{1}'.format(self.endpoint, path)
         headers = self._build_common_headers(
-            method, unescape(path), headers, params)
-        logging.debug(
-            'Do http request. Method: {0}. URL: {1}. Params: {2}. Headers: {3}'.format(method, url, params, headers))
-        r = requestWithTry(method, url, headers=headers,
-                           params=params, data=body, timeout=self.timeout)
+            method, unescape(path), headers, params, operation='do_http_request')
+        logger.debug('Do http request. Method: %s. URL: %s. Params: %s. Headers: %s', method, url, params, headers)
+        return self._observed_send(method, url, 'do_http_request', headers, params, body)[0]
+
+    def _observed_send(self, method, url, operation, headers, params=None, body=None, stream=False):
+        """
+        Send the request and call the after_response hooks with its response, or the on_error hooks.
+        :return: the response and its body when it was decoded for the hooks, _UNDECODED otherwise.
+        """
+        event = getattr(headers, 'event', None)
+        if event is None:
+            return self._send(method, url, operation, headers, params, body, stream), _UNDECODED
+        try:
+            r = self._send(method, url, operation, headers, params, body, stream)
+        except Exception as e:
+            self._observed_error(headers, e)
+            raise
+        return r, self._observed_response(event, operation, r, stream)
+
+    def _send(self, method, url, operation, headers, params=None, body=None, stream=False):
+        """
+        Send the request, retrying the failed attempts according to the retry policy of the client.
+        Without a retry policy, the retries are done by urllib3 with the module level settings.
+        Every attempt waits for the rate limiter of the client, if any.
+        """
+        limiter = self.rate_limiter
+        policy = self.retry_policy
+        event = getattr(headers, 'event', None)
+        if policy is None:
+            if limiter is not None:
+                limiter.acquire(operation)
+            if event is not None:
+                return self._observed_attempt(event, 1, method, url, headers, params, body, stream)
+            return self._session_request(method, url, headers, params, body, stream)
+
+        policy.on_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            if limiter is not None:
+                limiter.acquire(operation)
+            try:
+                if event is not None:
+                    r = self._observed_attempt(event, attempt, method, url, headers, params, body, stream)
+                else:
+                    r = self._session_request(method, url, headers, params, body, stream)
+            except requests.exceptions.RequestException as e:
+                delay = None if _lost_hedge() else policy.retry_delay(operation, method, attempt, error=e)
+                if delay is None or not _rewind_body(body):
+                    raise
+                logger.warning('Retry %s in %.3fs, attempt %s failed: %s', operation, delay, attempt, e)
+            else:
+                delay = None if _lost_hedge() else policy.retry_delay(operation, method, attempt, response=r)
+                if delay is None or not _rewind_body(body):
+                    return r
+                logger.warning('Retry %s in %.3fs, attempt %s failed with status %s. Request id: %s',
+                               operation, delay, attempt, r.status_code, r.headers.get('X-Fc-Request-Id'))
+                # release the connection of a streamed response.
+                r.close()
+            if event is not None:
+                event.retry_delay = delay
+                call_hooks(self.hooks, 'on_retry', event)
+            _retry_sleep(delay)
+
+    def _observed_attempt(self, event, attempt, method, url, headers, params, body, stream):
+        """ Send one attempt of a request observed by hooks, recording its timings in the event. """
+        event.begin_attempt(attempt)
+        call_hooks(self.hooks, 'before_send', event)
+        _connect_timer.elapsed = 0.0
+        start = time.perf_counter()
+        try:
+            r = self._session_request(method, url, headers, params, body, stream)
+        except Exception as e:
+            event.error = e
+            event.timings['connect'] = _connect_timer.elapsed
+            raise
+        # requests reads the body before returning, r.elapsed stops at the response headers.
+        ttfb = r.elapsed.total_seconds()
+        event.record_response(r.status_code, r.headers, _connect_timer.elapsed, ttfb,
+                              0.0 if stream else time.perf_counter() - start - ttfb)
         return r
 
-    def _do_request(self, method, path, headers, params=None, body=None):
+    def _observed_response(self, event, operation, r, stream):
+        """
+        Decode the JSON response of a control plane operation and call the after_response hooks.
+        :return: the decoded body, or _UNDECODED.
+        """
+        data = _UNDECODED
+        if r.status_code < 400 and not stream and operation not in DATA_PLANE_OPERATIONS \
+                and 'json' in r.headers.get('Content-Type', ''):
+            start = time.perf_counter()
+            try:
+                data = r.json()
+            except ValueError:
+                pass
+            event.timings['decode'] = time.perf_counter() - start
+        event.finish()
+        # the hedged invocation calls the hooks once for its two requests.
+        if event.parent is None:
+            call_hooks(self.hooks, 'after_response', event)
+        return data
+
+    def _observed_error(self, headers, error):
+        event = getattr(headers, 'event', None)
+        if event is not None:
+            event.error = error
+            event.finish()
+            if event.parent is None:
+                call_hooks(self.hooks, 'on_error', event)
+
+    def _fork_headers(self, headers, hedge):
+        """ :return: the headers of one request of a hedged invocation, with its own event when observed. """
+        event = getattr(headers, 'event', None)
+        if event is None:
+            return headers
+        forked = EventHeaders(headers)
+        forked.event = event.fork(hedge)
+        forked.event.headers = forked
+        return forked
+
+    def _observed_hedge(self, headers, request_headers, error=None):
+        """ Call the after_response and on_error hooks of a hedged invocation with the request which completed it. """
+        event = getattr(headers, 'event', None)
+        if event is None:
+            return
+        event.adopt(request_headers.event)
+        event.finish()
+        if event.status is not None:
+            call_hooks(self.hooks, 'after_response', event)
+        if error is not None:
+            event.error = error
+            call_hooks(self.hooks, 'on_error', event)
+
+    def _do_request(self, method, path, headers, params=None, body=None, operation=None, stream=False):
+        return self._perform_request(method, path, headers, params, body, operation, stream)[0]
+
+    def _do_json_request(self, method, path, headers, params=None, body=None, operation=None):
+        """ :return: the response of a control plane request and its decoded JSON body. """
+        r, data = self._perform_request(method, path, headers, params, body, operation)
+        return r, r.json() if data is _UNDECODED else data
+
+    def _perform_request(self, method, path, headers, params=None, body=None, operation=None, stream=False):
+        """ :return: the response and its body when it was decoded for the hooks, _UNDECODED otherwise. """
         url = '{0}{1}'.format(self.endpoint, path)
-        logging.debug('Perform http request. Method: {0}. URL: {1}. Headers: {2}'.format(
-            method, url, headers))
-        r = requestWithTry(method, url, headers=headers,
-                           params=params, data=body, timeout=self.timeout)
+        logger.debug('Perform http request. Method: %s. URL: %s. Headers: %s', method, url, headers)
+        r, data = self._observed_send(method, url, operation, headers, params, body, stream)
 
         if r.status_code < 400:
-            logging.debug(
-                'Http status code: {0}. Method: {1}. URL: {2}. Headers: {3}'.format(
-                    r.status_code, method, url, r.headers))
+            logger.debug('Http status code: %s. Method: %s. URL: %s. Headers: %s',
+                         r.status_code, method, url, r.headers)
         elif 400 <= r.status_code < 500:
-            errmsg = \
-                'Client error: {0}. Message: {1}. Method: {2}. URL: {3}. Request headers: {4}. Response headers: {5}'. \
-                format(r.status_code, r.json(),
-                       method, url, headers, r.headers)
-            logging.error(errmsg)
-            raise self.__gen_request_err(r)
+            logger.error('Client error: %s. Message: %s. Method: %s. URL: %s. Request headers: %s. Response headers: %s',
+                         r.status_code, r.json(), method, url, headers, r.headers)
+            error = self.__gen_request_err(r)
+            self._observed_error(headers, error)
+            raise error
         elif 500 <= r.status_code < 600:
-            errmsg = \
-                'Server error: {0}. Message: {1}. Method: {2}. URL: {3}. Request headers: {4}. Response headers: {5}'. \
-                format(r.status_code, r.json(),
-                       method, url, headers, r.headers)
-            logging.error(errmsg)
-            raise self.__gen_request_err(r)
+            logger.error('Server error: %s. Message: %s. Method: %s. URL: %s. Request headers: %s. Response headers: %s',
+                         r.status_code, r.json(), method, url, headers, r.headers)
+            error = self.__gen_request_err(r)
+            self._observed_error(headers, error)
+            raise error
 
-        return r
+        return r, data
 
     def __gen_request_err(self, r):
-        try:
-            err_d = r.json()
-        except json.JSONDecodeError:
-            err_d = {
-                'ErrorMessage': r.text,
-                'ErrorType': r.headers.get('x-fc-error-type', ''),
-                'RequestId': r.headers.get('X-Fc-Request-Id', 'unknown'),
-                'ErrorCode': r.headers.get('ErrorCode', '')
-            }
-            err_code = err_d.get('ErrorCode', '')
-            err_msg = json.dumps(err_d)
-            return fc_exceptions.get_fc_error(err_msg, r.status_code, err_code, err_d['RequestId'])
+        return _gen_request_err(r)
 
-        err_d['RequestId'] = r.headers.get('X-Fc-Request-Id', 'unknown')
-        err_code = err_d.get('ErrorCode', '')
-        err_msg = json.dumps(err_d)
-        return fc_exceptions.get_fc_error(err_msg, r.status_code, err_code, err_d['RequestId'])
+    def _iter_pages(self, listMethod, key, readAhead, *args, **kwargs):
+        """
+        Lazily walk the pages of a list_* API and yield the items under `key` one by one.
+        The next page is only requested once the items of the current page are consumed, unless
+        readAhead is True, then it is fetched on a background thread while they are being consumed.
+        kwargs are passed to every listMethod call, nextToken is set from the previous page.
+        """
+        def fetch(nextToken):
+            return listMethod(*args, nextToken=nextToken, **kwargs)
+
+        executor = ThreadPoolExecutor(max_workers=1) if readAhead else None
+        pending = None
+        try:
+            page = fetch(None)
+            while True:
+                nextToken = page.data.get('nextToken')
+                if nextToken and executor is not None:
+                    pending = executor.submit(fetch, nextToken)
+                for item in page.data.get(key) or []:
+                    yield item
+                if not nextToken:
+                    break
+                if pending is not None:
+                    page, pending = pending.result(), None
+                else:
+                    page = fetch(nextToken)
+        finally:
+            if pending is not None:
+                pending.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
 
     def websocket(self, url, queries={}, headers={}):
         header = self._build_common_headers(
-            "GET", url, headers
+            "GET", url, headers, operation='websocket'
         )
         del header["host"]
 
@@ -213,9 +714,9 @@ class Client(object):
         """
         method = 'GET'
         path = '/{0}/account-settings'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        headers = self._build_common_headers(method, path, headers, operation='get_account_settings')
+        r, data = self._do_json_request(method, path, headers, operation='get_account_settings')
+        return FcHttpResponse(r.headers, data)
 
     def create_service(self, serviceName, description=None, logConfig=None, role=None, headers={}, internetAccess=None,
                        vpcConfig=None, nasConfig=None, tracingConfig=None):
@@ -278,7 +779,7 @@ class Client(object):
         """
         method = 'POST'
         path = '/{0}/services'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='create_service')
 
         payload = {'serviceName': serviceName, 'description': description}
         if logConfig:
@@ -294,10 +795,10 @@ class Client(object):
         if tracingConfig:
             payload['tracingConfig'] = tracingConfig
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='create_service')
         # 'etag' now in headers
-        return FcHttpResponse(r.headers, r.json())
+        return FcHttpResponse(r.headers, data)
 
     def delete_service(self, serviceName, headers={}):
         """
@@ -311,9 +812,9 @@ class Client(object):
         """
         method = 'DELETE'
         path = '/{0}/services/{1}'.format(self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_service')
 
-        self._do_request(method, path, headers)
+        self._do_request(method, path, headers, operation='delete_service')
 
     def update_service(self, serviceName, description=None, logConfig=None, role=None, headers={}, internetAccess=None,
                        vpcConfig=None, nasConfig=None, tracingConfig=None):
@@ -378,7 +879,7 @@ class Client(object):
         """
         method = 'PUT'
         path = '/{0}/services/{1}'.format(self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='update_service')
 
         payload = {}
         if description:
@@ -396,10 +897,10 @@ class Client(object):
         if tracingConfig is not None:
             payload['tracingConfig'] = tracingConfig
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='update_service')
         # 'etag' now in headers
-        return FcHttpResponse(r.headers, r.json())
+        return FcHttpResponse(r.headers, data)
 
     def get_service(self, serviceName, headers={}, qualifier=None):
         """
@@ -417,10 +918,10 @@ class Client(object):
         if qualifier:
             serviceName += '{0}{1}'.format(delimiter, qualifier)
         path = '/{0}/services/{1}'.format(self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_service')
 
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, operation='get_service')
+        return FcHttpResponse(r.headers, data)
 
     def list_services(self, limit=None, nextToken=None, prefix=None, startKey=None, headers={}, tags=None):
         """
@@ -459,7 +960,7 @@ class Client(object):
         """
         method = 'GET'
         path = '/{0}/services'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_services')
 
         paramlst = [('limit', limit), ('prefix', prefix),
                     ('nextToken', nextToken), ('startKey', startKey)]
@@ -469,8 +970,25 @@ class Client(object):
             for k, v in tags.items():
                 params["tag_" + k] = v
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_services')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_services(self, pageSize=None, prefix=None, startKey=None, headers={}, tags=None, readAhead=False):
+        """
+        Iterate over all the services in the current account, the pages are fetched on demand.
+        :param pageSize: (optional, integer) the number of services fetched per request.
+        :param prefix: (optional, string) list the services with the given prefix.
+        :param startKey: (optional, string) startKey is where you want to start listing from.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param tags: (optional, dict) list the services with the given tags.
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the service attributes as returned by list_services.
+        """
+        return self._iter_pages(self.list_services, 'services', readAhead, limit=pageSize, prefix=prefix,
+                                startKey=startKey, headers=headers, tags=tags)
 
     def _check_function_param_valid(self, codeZipFile, codeDir, codeOSSBucket, codeOSSObject):
         code_d = {}
@@ -494,53 +1012,52 @@ class Client(object):
 
         return True
 
-    def create_function(
-            self, serviceName, functionName, runtime, handler,
-            initializer=None, initializationTimeout=30,
-            codeZipFile=None, codeDir=None, codeOSSBucket=None, codeOSSObject=None,
-            description=None, memorySize=256, timeout=60, headers={}, environmentVariables=None,
-            instanceConcurrency=None, customContainerConfig=None, caPort=None, instanceType=None):
+    def _zip_code_dir(self, codeDir):
         """
-        Create a function.
-        :param serviceName: (required, string) the name of the service that the function belongs to.
-        :param functionName: (required, string) the name of the function.
-        :param runtime: (required, string) the runtime type. For example, nodejs4.4, python2.7 and etc.
-        :param handler: (required, string) the entry point of the function.
-        :param initializer: (required, string) the entry point of the initializer.
-        :param codeZipFile: (optional, string) the file path of the zipped code.
-        :param codeDir: (optional, string) the directory of the code.
-        :param codeOSSBucket: (optional, string) the oss bucket where the code located in.
-        :param codeOSSObject: (optional, string) the zipped code stored as a OSS object.
-        :param description: (optional, string) the readable description of the function.
-        :param memorySize: (optional, integer) the memory size of the function, in MB.
-        :param timeout: (optional, integer) the max execution time of the function, in second.
-        :param initializationTimeout: (optional, integer) the max execution time of the initializer, in second.
-        :param environmentVariables: (optional, dict) the environment variables of the function, both key and value are string type.
-        :param instanceConcurrency: (optional, integer) the instance concurrency of the function
-        :param headers, optional
-            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
-            2, user define key value
-        :return: FcHttpResponse
-        headers: dict {'etag':'string', ...}
-        data: dict of the function attributes.
-        {
-            'codeChecksum': 'string',     // CRC64 checksum
-            'codeSize': 1024,             // in byte
-            'createdTime': 'string',
-            'description': 'string',
-            'functionId': 'string',
-            'functionName': 'string',
-            'handler': 'string',
-            'initializer': 'string',
-            'lastModifiedTime': 'string',
-            'memorySize': 512,            // in MB
-            'runtime': 'string',
-            'timeout': 60,                // in second
-            'initializationTimeout': 30   // in second
-        }
+        Package codeDir, through the code package cache when the client has one.
+        :return: the zip file object, positioned at its beginning.
         """
-        serviceName, functionName, runtime, handler, memorySize, timeout = \
-            str(serviceName), str(functionName), str(runtime), str(
+        if self.code_cache is not None:
+            return self.code_cache.open_package(codeDir)
+        zipFile = tempfile.TemporaryFile()
+        util.zip_dir(codeDir, zipFile, workers=self.zip_workers, deterministic=self.deterministic_zip)
+        zipFile.seek(0)
+        return zipFile
+
+    @staticmethod
+    def _skip_unchanged_code(payload, deployedChecksum):
+        """
+        Remove the zip file from the update function payload when its crc64 equals deployedChecksum.
+        :return: True if the code was removed.
+        """
+        zipFile = payload.get('code', {}).get('zipFile')
+        if zipFile is None or not deployedChecksum:
+            return False
+        checksum = util.crc64_file(zipFile)
+        if checksum != str(deployedChecksum):
+            return False
+        logger.debug('Code checksum %s unchanged, skip uploading the code', checksum)
+        zipFile.close()
+        del payload['code']
+        return True
+
+    @staticmethod
+    def _function_body(payload):
+        """
+        Encode the create/update function payload. When the code is given as a zip file object,
+        the body streams it as base64 instead of holding the encoded package in memory.
+        """
+        zipFile = payload.get('code', {}).get('zipFile')
+        if zipFile is None:
+            return json.dumps(payload).encode('utf-8')
+        return util.ZipFileJsonStream(payload, zipFile)
+
+    def _create_function_payload(
+            self, functionName, runtime, handler, initializer, initializationTimeout,
+            codeZipFile, codeDir, codeOSSBucket, codeOSSObject, description, memorySize, timeout,
+            environmentVariables, instanceConcurrency, customContainerConfig, caPort, instanceType):
+        functionName, runtime, handler, memorySize, timeout = \
+            str(functionName), str(runtime), str(
                 handler), int(memorySize), int(timeout)
 
         initializer = str(initializer) if initializer else initializer
@@ -548,11 +1065,6 @@ class Client(object):
             initializationTimeout) if initializationTimeout else initializationTimeout
         instanceType = str(instanceType) if instanceType else instanceType
 
-        method = 'POST'
-        path = '/{0}/services/{1}/functions'.format(
-            self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
-
         payload = {'functionName': functionName,
                    'runtime': runtime, 'handler': handler}
 
@@ -568,15 +1080,9 @@ class Client(object):
 
             if codeZipFile:
                 # codeZipFile has highest priority.
-                file = open(codeZipFile, 'rb')
-                data = file.read()
-                encoded = base64.b64encode(data).decode('utf-8')
-                payload['code'] = {'zipFile': encoded}
+                payload['code'] = {'zipFile': open(codeZipFile, 'rb')}
             elif codeDir:
-                bytesIO = io.BytesIO()
-                util.zip_dir(codeDir, bytesIO)
-                encoded = base64.b64encode(bytesIO.getvalue()).decode('utf-8')
-                payload['code'] = {'zipFile': encoded}
+                payload['code'] = {'zipFile': self._zip_code_dir(codeDir)}
             else:
                 payload['code'] = {'ossBucketName': codeOSSBucket,
                                    'ossObjectName': codeOSSObject}
@@ -614,19 +1120,16 @@ class Client(object):
         if instanceType:
             payload['instanceType'] = instanceType
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        # 'etag' now in headers
-        return FcHttpResponse(r.headers, r.json())
+        return payload
 
-    def update_function(
-            self, serviceName, functionName,
-            initializer=None, initializationTimeout=None,
+    def create_function(
+            self, serviceName, functionName, runtime, handler,
+            initializer=None, initializationTimeout=30,
             codeZipFile=None, codeDir=None, codeOSSBucket=None, codeOSSObject=None,
-            description=None, handler=None, memorySize=None, runtime=None, timeout=None,
-            headers={}, environmentVariables=None, instanceConcurrency=None, customContainerConfig=None, caPort=None, instanceType=None):
+            description=None, memorySize=256, timeout=60, headers={}, environmentVariables=None,
+            instanceConcurrency=None, customContainerConfig=None, caPort=None, instanceType=None):
         """
-        Update the function.
+        Create a function.
         :param serviceName: (required, string) the name of the service that the function belongs to.
         :param functionName: (required, string) the name of the function.
         :param runtime: (required, string) the runtime type. For example, nodejs4.4, python2.7 and etc.
@@ -640,13 +1143,11 @@ class Client(object):
         :param memorySize: (optional, integer) the memory size of the function, in MB.
         :param timeout: (optional, integer) the max execution time of the function, in second.
         :param initializationTimeout: (optional, integer) the max execution time of the initializer, in second.
-        :param etag: (optional, string) delete the service only when matched the given etag.
         :param environmentVariables: (optional, dict) the environment variables of the function, both key and value are string type.
         :param instanceConcurrency: (optional, integer) the instance concurrency of the function
         :param headers, optional
             1, 'x-fc-trace-id': string (a uuid to do the request tracing)
-            2, 'if-match': string (update the function only when matched the given etag.)
-            3, user define key value
+            2, user define key value
         :return: FcHttpResponse
         headers: dict {'etag':'string', ...}
         data: dict of the function attributes.
@@ -663,10 +1164,32 @@ class Client(object):
             'memorySize': 512,            // in MB
             'runtime': 'string',
             'timeout': 60,                // in second
-            'initializationTimeout': 30,  // in second
+            'initializationTimeout': 30   // in second
         }
         """
-        serviceName, functionName = str(serviceName), str(functionName)
+        method = 'POST'
+        path = '/{0}/services/{1}/functions'.format(
+            self.api_version, serviceName)
+        headers = self._build_common_headers(method, path, headers, operation='create_function')
+
+        payload = self._create_function_payload(
+            functionName, runtime, handler, initializer, initializationTimeout,
+            codeZipFile, codeDir, codeOSSBucket, codeOSSObject, description, memorySize, timeout,
+            environmentVariables, instanceConcurrency, customContainerConfig, caPort, instanceType)
+
+        body = self._function_body(payload)
+        try:
+            r, data = self._do_json_request(method, path, headers, body=body, operation='create_function')
+        finally:
+            if isinstance(body, util.ZipFileJsonStream):
+                body.close()
+        # 'etag' now in headers
+        return FcHttpResponse(r.headers, data)
+
+    def _update_function_payload(
+            self, runtime, handler, initializer, initializationTimeout,
+            codeZipFile, codeDir, codeOSSBucket, codeOSSObject, description, memorySize, timeout,
+            environmentVariables, instanceConcurrency, customContainerConfig, caPort, instanceType):
         handler = str(handler) if handler else handler
         initializer = str(initializer) if initializer else initializer
         instanceType = str(instanceType) if instanceType else instanceType
@@ -680,11 +1203,6 @@ class Client(object):
         codeOSSBucket = str(codeOSSBucket) if codeOSSBucket else codeOSSBucket
         codeOSSObject = str(codeOSSObject) if codeOSSObject else codeOSSObject
 
-        method = 'PUT'
-        path = '/{0}/services/{1}/functions/{2}'.format(
-            self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
-
         payload = {}
         if runtime:
             payload['runtime'] = runtime
@@ -697,15 +1215,9 @@ class Client(object):
 
         if codeZipFile:
             # codeZipFile has highest priority.
-            file = open(codeZipFile, 'rb')
-            data = file.read()
-            encoded = base64.b64encode(data).decode('utf-8')
-            payload['code'] = {'zipFile': encoded}
+            payload['code'] = {'zipFile': open(codeZipFile, 'rb')}
         elif codeDir:
-            bytesIO = io.BytesIO()
-            util.zip_dir(codeDir, bytesIO)
-            encoded = base64.b64encode(bytesIO.getvalue()).decode('utf-8')
-            payload['code'] = {'zipFile': encoded}
+            payload['code'] = {'zipFile': self._zip_code_dir(codeDir)}
         elif codeOSSBucket and codeOSSObject:
             payload['code'] = {'ossBucketName': codeOSSBucket,
                                'ossObjectName': codeOSSObject}
@@ -737,10 +1249,79 @@ class Client(object):
         if instanceType:
             payload['instanceType'] = instanceType
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
+        return payload
+
+    def update_function(
+            self, serviceName, functionName,
+            initializer=None, initializationTimeout=None,
+            codeZipFile=None, codeDir=None, codeOSSBucket=None, codeOSSObject=None,
+            description=None, handler=None, memorySize=None, runtime=None, timeout=None,
+            headers={}, environmentVariables=None, instanceConcurrency=None, customContainerConfig=None, caPort=None, instanceType=None,
+            skipUnchangedCode=False):
+        """
+        Update the function.
+        :param serviceName: (required, string) the name of the service that the function belongs to.
+        :param functionName: (required, string) the name of the function.
+        :param runtime: (required, string) the runtime type. For example, nodejs4.4, python2.7 and etc.
+        :param handler: (required, string) the entry point of the function.
+        :param initializer: (required, string) the entry point of the initializer.
+        :param codeZipFile: (optional, string) the file path of the zipped code.
+        :param codeDir: (optional, string) the directory of the code.
+        :param codeOSSBucket: (optional, string) the oss bucket where the code located in.
+        :param codeOSSObject: (optional, string) the zipped code stored as a OSS object.
+        :param description: (optional, string) the readable description of the function.
+        :param memorySize: (optional, integer) the memory size of the function, in MB.
+        :param timeout: (optional, integer) the max execution time of the function, in second.
+        :param initializationTimeout: (optional, integer) the max execution time of the initializer, in second.
+        :param etag: (optional, string) delete the service only when matched the given etag.
+        :param environmentVariables: (optional, dict) the environment variables of the function, both key and value are string type.
+        :param instanceConcurrency: (optional, integer) the instance concurrency of the function
+        :param skipUnchangedCode: (optional, bool) compare the crc64 of codeZipFile/codeDir with the codeChecksum
+                                  of the deployed function first, and do not upload the code when they match.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, 'if-match': string (update the function only when matched the given etag.)
+            3, user define key value
+        :return: FcHttpResponse
+        headers: dict {'etag':'string', ...}
+        data: dict of the function attributes.
+        {
+            'codeChecksum': 'string',     // CRC64 checksum
+            'codeSize': 1024,             // in byte
+            'createdTime': 'string',
+            'description': 'string',
+            'functionId': 'string',
+            'functionName': 'string',
+            'handler': 'string',
+            'initializer': 'string',
+            'lastModifiedTime': 'string',
+            'memorySize': 512,            // in MB
+            'runtime': 'string',
+            'timeout': 60,                // in second
+            'initializationTimeout': 30,  // in second
+        }
+        """
+        method = 'PUT'
+        path = '/{0}/services/{1}/functions/{2}'.format(
+            self.api_version, serviceName, functionName)
+        headers = self._build_common_headers(method, path, headers, operation='update_function')
+
+        payload = self._update_function_payload(
+            runtime, handler, initializer, initializationTimeout,
+            codeZipFile, codeDir, codeOSSBucket, codeOSSObject, description, memorySize, timeout,
+            environmentVariables, instanceConcurrency, customContainerConfig, caPort, instanceType)
+        if skipUnchangedCode:
+            self._skip_unchanged_code(
+                payload, self.get_function(serviceName, functionName).data.get('codeChecksum'))
+
+        body = self._function_body(payload)
+        try:
+            r, data = self._do_json_request(method, path, headers, body=body, operation='update_function')
+        finally:
+            if isinstance(body, util.ZipFileJsonStream):
+                body.close()
         # 'etag' now in headers
-        return FcHttpResponse(r.headers, r.json())
+        return FcHttpResponse(r.headers, data)
 
     def delete_function(self, serviceName, functionName, headers={}):
         """
@@ -756,9 +1337,9 @@ class Client(object):
         method = 'DELETE'
         path = '/{0}/services/{1}/functions/{2}'.format(
             self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_function')
 
-        self._do_request(method, path, headers)
+        self._do_request(method, path, headers, operation='delete_function')
 
     def get_function(self, serviceName, functionName, headers={}, qualifier=None):
         """
@@ -778,11 +1359,11 @@ class Client(object):
             serviceName += '{0}{1}'.format(delimiter, qualifier)
         path = '/{0}/services/{1}/functions/{2}'.format(
             self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_function')
 
-        r = self._do_request(method, path, headers)
+        r, data = self._do_json_request(method, path, headers, operation='get_function')
         # 'etag' now in headers
-        return FcHttpResponse(r.headers, r.json())
+        return FcHttpResponse(r.headers, data)
 
     def get_function_code(self, serviceName, functionName, headers={}, qualifier=None):
         """
@@ -806,10 +1387,10 @@ class Client(object):
             serviceName += '{0}{1}'.format(delimiter, qualifier)
         path = '/{0}/services/{1}/functions/{2}/code'.format(
             self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_function_code')
 
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, operation='get_function_code')
+        return FcHttpResponse(r.headers, data)
 
     def list_functions(self, serviceName, limit=None, nextToken=None, prefix=None, startKey=None, headers={}, qualifier=None):
         """
@@ -853,22 +1434,46 @@ class Client(object):
             serviceName += '{0}{1}'.format(delimiter, qualifier)
         path = '/{0}/services/{1}/functions'.format(
             self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_functions')
 
         paramlst = [('limit', limit), ('prefix', prefix),
                     ('nextToken', nextToken), ('startKey', startKey)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_functions')
+        return FcHttpResponse(r.headers, data)
 
-    def invoke_function(self, serviceName, functionName, payload=None, headers={}, qualifier=None):
+    def iter_functions(self, serviceName, pageSize=None, prefix=None, startKey=None, headers={}, qualifier=None,
+                       readAhead=False):
+        """
+        Iterate over all the functions of the specified service, the pages are fetched on demand.
+        :param serviceName: (required, string), name of the service.
+        :param pageSize: (optional, integer) the number of functions fetched per request.
+        :param prefix: (optional, string) list the functions with the given prefix.
+        :param startKey: (optional, string) startKey is where you want to start listing from.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param qualifier: (optional, string) qualifier of service.
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the function attributes as returned by list_functions.
+        """
+        return self._iter_pages(self.list_functions, 'functions', readAhead, serviceName, limit=pageSize,
+                                prefix=prefix, startKey=startKey, headers=headers, qualifier=qualifier)
+
+    def invoke_function(self, serviceName, functionName, payload=None, headers={}, qualifier=None, hedge=False,
+                        stream=False):
         """
         Invoke the function synchronously or asynchronously., default is synchronously.
+        When the client has a concurrencyLimiter, the call first waits for a free slot of the function.
         :param serviceName: (required, string) the name of the service.
         :param functionName: (required, string) the name of the function.
         :param qualifier: (optional, string) qualifier of service.
-        :param payload: (optional, bytes or seekable file-like object): the input of the function.
+        :param payload: (optional, bytes, bytes-like object, file-like object or iterable of bytes): the input
+                        of the function. bytearray, memoryview and mmap.mmap payloads are sent without copy,
+                        a file-like object is read by chunks, an iterable of bytes chunks is sent with the
+                        chunked transfer encoding, or with a content-length when wrapped in util.SizedIterator.
         :param logType: (optional, string) 'None' or 'Tail'. When invoke a function synchronously,
         you can set the log type to 'Tail' to get the last 4KB base64-encoded function log.
         :param traceId: (optional, string) a uuid to do the request tracing.
@@ -876,29 +1481,246 @@ class Client(object):
                             'x-fc-invocation-type' : require, 'Sync'/'Async' ,only two choice
                             'x-fc-trace-id' : option
                             # other can add user define header
-        :return: function output FcHttpResponse object.
-        """
+        :param hedge: (optional, bool or HedgingPolicy) hedge the synchronous invocation with the
+                      hedgingPolicy of the client (True) or the given policy, default False. Only for
+                      the functions which can safely be executed twice.
+        :param stream: (optional, bool) return the output of the function as a FcStreamingResponse read
+                       from the connection on demand instead of buffering it, default False. Streamed
+                       invocations are not hedged.
+        :return: function output FcHttpResponse object, or FcStreamingResponse when stream is True.
+        :raise: circuit_breaker.CircuitOpenError when the client has circuitBreakers and the circuit
+                of the function is open.
+        """
+        key = (serviceName, qualifier or None, functionName)
+        invoke = functools.partial(self._invoke, stream=True) if stream else self._invoke
+        policy = self._hedging_policy(False if stream else hedge, headers, payload)
+        if policy is not None:
+            invoke = functools.partial(self._hedged_invoke, policy, key)
+        if self.concurrency_limiter is not None:
+            limit = self.concurrency_limiter.get(serviceName, qualifier, functionName)
+            invoke = functools.partial(self._limited_invoke, limit, invoke)
+        breaker = None
+        if self.circuit_breakers is not None:
+            breaker = self.circuit_breakers.get(serviceName, qualifier, functionName)
         method = 'POST'
         if qualifier:
             serviceName += '{0}{1}'.format(delimiter, qualifier)
         path = '/{0}/services/{1}/functions/{2}/invocations'.format(
             self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
+        body, length = util.prepare_payload(payload)
+        headers = self._build_common_headers(method, path, headers, operation='invoke_function')
+        if length is None:
+            # the payload is sent with the chunked transfer encoding.
+            headers.pop('content-length', None)
+        else:
+            headers['content-length'] = str(length)
 
-        r = self._do_request(method, path, headers, body=payload)
+        if breaker is None:
+            return invoke(method, path, headers, body)
+        try:
+            breaker.acquire()
+        except fc_exceptions.FcError as e:
+            # the call is rejected by the open circuit.
+            self._observed_error(headers, e)
+            raise
+        start = time.time()
+        try:
+            response = invoke(method, path, headers, body)
+        except Exception as e:
+            breaker.record_error(e, time.time() - start)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(False, time.time() - start)
+        return response
+
+    def _invoke(self, method, path, headers, payload, stream=False):
+        r = self._do_request(method, path, headers, body=payload, operation='invoke_function', stream=stream)
         if r.headers.get('x-fc-error-type', ''):
             # For custom runtime Error exception
             try:
-                errmsg = 'Function execution error: {0}. Path: {1}. Headers: {2}'.format(
-                    r.json(), path, r.headers)
+                logger.error('Function execution error: %s. Path: %s. Headers: %s', r.json(), path, r.headers)
             except json.JSONDecodeError:
-                errmsg = 'Function execution error. Path: {0}. Headers: {1}'.format(
-                    path, r.headers)
-            logging.error(errmsg)
-            raise self.__gen_request_err(r)
+                logger.error('Function execution error. Path: %s. Headers: %s', path, r.headers)
+            error = self.__gen_request_err(r)
+            self._observed_error(headers, error)
+            raise error
 
+        if stream:
+            return FcStreamingResponse(r.headers, r)
         return FcHttpResponse(r.headers, r.content)
 
+    def _limited_invoke(self, limit, invoke, method, path, headers, payload):
+        start = limit.acquire()
+        try:
+            response = invoke(method, path, headers, payload)
+        except Exception as e:
+            limit.release(start, e)
+            raise
+        except BaseException:
+            limit.release(start, ignore=True)
+            raise
+        limit.release(start)
+        return response
+
+    def _hedging_policy(self, hedge, headers, payload):
+        if not hedge:
+            return None
+        policy = self.hedging_policy if hedge is True else hedge
+        if policy is None:
+            raise ValueError('hedge=True requires the hedgingPolicy parameter of the client.')
+        if not hedging.can_hedge(headers, payload):
+            logger.debug('Not hedging the invocation: asynchronous invocation or streamed payload')
+            return None
+        return policy
+
+    def _get_hedge_executor(self):
+        with self._session_lock:
+            if self._hedge_executor is None:
+                # the threads are only started on demand.
+                self._hedge_executor = ThreadPoolExecutor(max_workers=max(32, 2 * self.pool_maxsize),
+                                                          thread_name_prefix='fc2-hedge')
+                self._hedge_timers = _Timers('fc2-hedge-timers')
+            return self._hedge_executor, self._hedge_timers
+
+    def _hedged_invoke(self, policy, key, method, path, headers, payload):
+        """
+        Send the invocation on the calling thread, and a second identical request from the hedge
+        executor if it has not completed after the hedging delay, return the response of the first
+        one to succeed. The request which loses is aborted by shutting down its connection.
+        """
+        policy.on_request()
+        delay = policy.delay_for(key)
+        start = time.time()
+        if delay is None:
+            response = self._invoke(method, path, headers, payload)
+            policy.record(key, time.time() - start)
+            return response
+
+        executor, timers = self._get_hedge_executor()
+        call = _HedgedCall()
+        primary_headers = self._fork_headers(headers, False)
+        timer = timers.call_later(delay, functools.partial(
+            self._start_hedge, call, executor, policy, key, delay, method, path, headers, payload))
+        _hedged_request.current = call.primary
+        error = None
+        try:
+            response = self._invoke(method, path, primary_headers, payload)
+        except Exception as e:
+            error = e
+        finally:
+            _hedged_request.current = None
+            call.primary.finish()
+            timers.cancel(timer)
+            with call.lock:
+                call.done = True
+
+        hedge = call.hedge
+        if hedge is not None and (error is not None or call.primary.lost.is_set()):
+            # the primary request was aborted by the hedge, or failed while the hedge is in flight.
+            try:
+                response = hedge.result()
+            except Exception:
+                pass
+            else:
+                self._observed_hedge(headers, call.hedge_headers)
+                policy.record(key, time.time() - start)
+                return response
+        if hedge is not None:
+            hedge.cancel()
+            if error is None:
+                call.hedge_request.abort()
+        if error is not None:
+            self._observed_hedge(headers, primary_headers, error)
+            raise error
+        self._observed_hedge(headers, primary_headers)
+        policy.record(key, time.time() - start)
+        return response
+
+    def _start_hedge(self, call, executor, policy, key, delay, method, path, headers, payload):
+        """ Send the hedge of a hedged invocation whose primary request is still in flight. """
+        with call.lock:
+            if call.done or not policy.try_hedge():
+                return
+            logger.debug('Hedging the invocation of %s after %.3fs', key, delay)
+            call.hedge_headers = self._fork_headers(headers, True)
+            call.hedge = executor.submit(self._send_hedge, call, method, path, call.hedge_headers, payload)
+
+    def _send_hedge(self, call, method, path, headers, payload):
+        _hedged_request.current = call.hedge_request
+        try:
+            response = self._invoke(method, path, headers, payload)
+        finally:
+            _hedged_request.current = None
+            call.hedge_request.finish()
+        call.primary.abort()
+        return response
+
+    def _invoke_one(self, index, serviceName, functionName, payload, headers, qualifier):
+        start = time.time()
+        try:
+            r = self.invoke_function(serviceName, functionName, payload=payload,
+                                     headers=headers, qualifier=qualifier)
+            return InvokeResult(index, response=r, latency=time.time() - start)
+        except (fc_exceptions.FcError, requests.exceptions.RequestException) as e:
+            return InvokeResult(index, error=e, latency=time.time() - start)
+
+    def invoke_many(self, serviceName, functionName, payloads, concurrency=10, qualifier=None, headers={},
+                    ordered=False):
+        """
+        Invoke the function once per payload, with at most `concurrency` invocations in flight.
+        The invocations share the connection pool of the client, so poolMaxsize should not be
+        smaller than concurrency.
+        :param serviceName: (required, string) the name of the service.
+        :param functionName: (required, string) the name of the function.
+        :param payloads: (required, iterable) the inputs of the function, consumed lazily.
+        :param concurrency: (optional, integer) max number of in-flight invocations, default 10.
+        :param qualifier: (optional, string) qualifier of service.
+        :param headers: (optional, dict) user-defined request header, sent with every invocation.
+        :param ordered: (optional, bool) yield the results in the order of payloads instead of
+                        in the order they complete, default False.
+        :return: generator of InvokeResult. A failed invocation (FcError or network error) is
+                 reported through InvokeResult.error and does not abort the batch.
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be a positive integer')
+
+        items = enumerate(payloads)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        def submit():
+            item = next(items, None)
+            if item is None:
+                return None
+            return executor.submit(self._invoke_one, item[0], serviceName, functionName,
+                                   item[1], headers, qualifier)
+
+        running = collections.deque() if ordered else set()
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(running) < concurrency:
+                    future = submit()
+                    if future is None:
+                        exhausted = True
+                    elif ordered:
+                        running.append(future)
+                    else:
+                        running.add(future)
+                if not running:
+                    break
+                if ordered:
+                    yield running.popleft().result()
+                else:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     def create_trigger(self, serviceName, functionName, triggerName, triggerType, triggerConfig, sourceArn,
                        invocationRole, headers={}, qualifier=None, description=''):
         """
@@ -932,12 +1754,12 @@ class Client(object):
         method = 'POST'
         path = '/{0}/services/{1}/functions/{2}/triggers'.format(
             self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='create_trigger')
         payload = {'triggerName': triggerName, 'description': description, 'triggerType': triggerType, 'triggerConfig': triggerConfig,
                    'sourceArn': sourceArn, 'invocationRole': invocationRole, 'qualifier': qualifier}
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='create_trigger')
+        return FcHttpResponse(r.headers, data)
 
     def delete_trigger(self, serviceName, functionName, triggerName, headers={}):
         """
@@ -954,8 +1776,8 @@ class Client(object):
         method = 'DELETE'
         path = '/{0}/services/{1}/functions/{2}/triggers/{3}'.format(self.api_version, serviceName, functionName,
                                                                      triggerName)
-        headers = self._build_common_headers(method, path, headers)
-        self._do_request(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_trigger')
+        self._do_request(method, path, headers, operation='delete_trigger')
 
     def update_trigger(self, serviceName, functionName, triggerName, triggerConfig=None, invocationRole=None,
                        headers={}, qualifier=None, description=None):
@@ -989,7 +1811,7 @@ class Client(object):
         method = 'PUT'
         path = '/{0}/services/{1}/functions/{2}/triggers/{3}'.format(self.api_version, serviceName, functionName,
                                                                      triggerName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='update_trigger')
         payload = {}
         if description:
             payload['description'] = description
@@ -999,9 +1821,9 @@ class Client(object):
             payload['invocationRole'] = invocationRole
         if qualifier:
             payload['qualifier'] = qualifier
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='update_trigger')
+        return FcHttpResponse(r.headers, data)
 
     def get_trigger(self, serviceName, functionName, triggerName, headers={}):
         """
@@ -1028,9 +1850,9 @@ class Client(object):
         method = 'GET'
         path = '/{0}/services/{1}/functions/{2}/triggers/{3}'.format(self.api_version, serviceName, functionName,
                                                                      triggerName)
-        headers = self._build_common_headers(method, path, headers)
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        headers = self._build_common_headers(method, path, headers, operation='get_trigger')
+        r, data = self._do_json_request(method, path, headers, operation='get_trigger')
+        return FcHttpResponse(r.headers, data)
 
     def list_triggers(self, serviceName, functionName, limit=None, nextToken=None, prefix=None, startKey=None,
                       headers={}):
@@ -1066,12 +1888,31 @@ class Client(object):
         method = 'GET'
         path = '/{0}/services/{1}/functions/{2}/triggers'.format(
             self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_triggers')
         paramlst = [('limit', limit), ('prefix', prefix),
                     ('nextToken', nextToken), ('startKey', startKey)]
         params = dict((k, v) for k, v in paramlst if v)
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_triggers')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_triggers(self, serviceName, functionName, pageSize=None, prefix=None, startKey=None, headers={},
+                      readAhead=False):
+        """
+        Iterate over all the triggers of the specified function, the pages are fetched on demand.
+        :param serviceName: (required, string), name of the service.
+        :param functionName: (required, string), name of the function.
+        :param pageSize: (optional, integer) the number of triggers fetched per request.
+        :param prefix: (optional, string) list the triggers with the given prefix.
+        :param startKey: (optional, string) startKey is where you want to start listing from.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the trigger attributes as returned by list_triggers.
+        """
+        return self._iter_pages(self.list_triggers, 'triggers', readAhead, serviceName, functionName,
+                                limit=pageSize, prefix=prefix, startKey=startKey, headers=headers)
 
     def create_custom_domain(self, domainName, protocol=None, routeConfig=None, headers={}, certConfig=None):
         """
@@ -1106,7 +1947,7 @@ class Client(object):
         """
         method = 'POST'
         path = '/{0}/custom-domains'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='create_custom_domain')
 
         payload = {'domainName': domainName}
         if protocol:
@@ -1116,10 +1957,10 @@ class Client(object):
         if certConfig:
             payload['certConfig'] = certConfig
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='create_custom_domain')
         # 'etag' now in headers
-        return FcHttpResponse(r.headers, r.json())
+        return FcHttpResponse(r.headers, data)
 
     def delete_custom_domain(self, domainName, headers={}):
         """
@@ -1132,9 +1973,9 @@ class Client(object):
         """
         method = 'DELETE'
         path = '/{0}/custom-domains/{1}'.format(self.api_version, domainName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_custom_domain')
 
-        self._do_request(method, path, headers)
+        self._do_request(method, path, headers, operation='delete_custom_domain')
 
     def update_custom_domain(self, domainName, protocol=None, routeConfig=None, headers={}, certConfig=None):
         """
@@ -1167,7 +2008,7 @@ class Client(object):
         """
         method = 'PUT'
         path = '/{0}/custom-domains/{1}'.format(self.api_version, domainName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='update_custom_domain')
 
         payload = {}
         if protocol:
@@ -1177,10 +2018,10 @@ class Client(object):
         if certConfig:
             payload['certConfig'] = certConfig
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='update_custom_domain')
         # 'etag' now in headers
-        return FcHttpResponse(r.headers, r.json())
+        return FcHttpResponse(r.headers, data)
 
     def get_custom_domain(self, domainName, headers={}):
         """
@@ -1195,10 +2036,10 @@ class Client(object):
         """
         method = 'GET'
         path = '/{0}/custom-domains/{1}'.format(self.api_version, domainName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_custom_domain')
 
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, operation='get_custom_domain')
+        return FcHttpResponse(r.headers, data)
 
     def list_custom_domains(self, limit=None, nextToken=None, prefix=None, startKey=None, headers={}):
         """
@@ -1232,14 +2073,30 @@ class Client(object):
         """
         method = 'GET'
         path = '/{0}/custom-domains'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_custom_domains')
 
         paramlst = [('limit', limit), ('prefix', prefix),
                     ('nextToken', nextToken), ('startKey', startKey)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_custom_domains')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_custom_domains(self, pageSize=None, prefix=None, startKey=None, headers={}, readAhead=False):
+        """
+        Iterate over all the custom domains in the current account, the pages are fetched on demand.
+        :param pageSize: (optional, integer) the number of custom domains fetched per request.
+        :param prefix: (optional, string) list the custom domains with the given prefix.
+        :param startKey: (optional, string) startKey is where you want to start listing from.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the custom domain attributes as returned by list_custom_domains.
+        """
+        return self._iter_pages(self.list_custom_domains, 'customDomains', readAhead, limit=pageSize,
+                                prefix=prefix, startKey=startKey, headers=headers)
 
     def publish_version(self, serviceName, description=None, headers={}):
         """
@@ -1264,15 +2121,15 @@ class Client(object):
         method = 'POST'
         path = '/{0}/services/{1}/versions'.format(
             self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='publish_version')
 
         payload = {}
         if description:
             payload['description'] = description
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='publish_version')
+        return FcHttpResponse(r.headers, data)
 
     def list_versions(self, serviceName, limit=None, nextToken=None, startKey=None, direction=None, headers={}):
         """
@@ -1305,14 +2162,31 @@ class Client(object):
         method = 'GET'
         path = '/{0}/services/{1}/versions'.format(
             self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_versions')
 
         paramlst = [('limit', limit), ('nextToken', nextToken),
                     ('startKey', startKey), ('direction', direction)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_versions')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_versions(self, serviceName, pageSize=None, startKey=None, direction=None, headers={}, readAhead=False):
+        """
+        Iterate over all the versions of the specified service, the pages are fetched on demand.
+        :param serviceName: (required, string), name of the service.
+        :param pageSize: (optional, integer) the number of versions fetched per request.
+        :param startKey: (optional, string) startKey is where you want to start listing from.
+        :param direction: (optional, string) the sort order of the versions, 'FORWARD' or 'BACKWARD'.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the version attributes as returned by list_versions.
+        """
+        return self._iter_pages(self.list_versions, 'versions', readAhead, serviceName, limit=pageSize,
+                                startKey=startKey, direction=direction, headers=headers)
 
     def delete_version(self, serviceName, versionId, headers={}):
         """
@@ -1327,9 +2201,9 @@ class Client(object):
         method = 'DELETE'
         path = '/{0}/services/{1}/versions/{2}'.format(
             self.api_version, serviceName, versionId)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_version')
 
-        self._do_request(method, path, headers)
+        self._do_request(method, path, headers, operation='delete_version')
 
     def create_alias(self, serviceName, aliasName, versionId, description=None, additionalVersionWeight=None, headers={}):
         """
@@ -1360,17 +2234,17 @@ class Client(object):
         method = 'POST'
         path = '/{0}/services/{1}/aliases'.format(
             self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='create_alias')
 
         payload = {'aliasName': aliasName, 'versionId': versionId}
         if description:
             payload['description'] = description
         if additionalVersionWeight != None:
             payload['additionalVersionWeight'] = additionalVersionWeight
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='create_alias')
 
-        return FcHttpResponse(r.headers, r.json())
+        return FcHttpResponse(r.headers, data)
 
     def get_alias(self, serviceName, aliasName, headers={}):
         """
@@ -1395,10 +2269,10 @@ class Client(object):
         method = 'GET'
         path = '/{0}/services/{1}/aliases/{2}'.format(
             self.api_version, serviceName, aliasName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_alias')
 
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, operation='get_alias')
+        return FcHttpResponse(r.headers, data)
 
     def update_alias(self, serviceName, aliasName, versionId, description=None, additionalVersionWeight=None, headers={}):
         """
@@ -1430,7 +2304,7 @@ class Client(object):
         method = 'PUT'
         path = '/{0}/services/{1}/aliases/{2}'.format(
             self.api_version, serviceName, aliasName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='update_alias')
 
         payload = {}
         if versionId:
@@ -1440,9 +2314,9 @@ class Client(object):
         if additionalVersionWeight != None:
             payload['additionalVersionWeight'] = additionalVersionWeight
 
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='update_alias')
+        return FcHttpResponse(r.headers, data)
 
     def list_aliases(self, serviceName, limit=None, nextToken=None, prefix=None, startKey=None, headers={}):
         """
@@ -1477,14 +2351,31 @@ class Client(object):
         method = 'GET'
         path = '/{0}/services/{1}/aliases'.format(
             self.api_version, serviceName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_aliases')
 
         paramlst = [('limit', limit), ('prefix', prefix),
                     ('nextToken', nextToken), ('startKey', startKey)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_aliases')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_aliases(self, serviceName, pageSize=None, prefix=None, startKey=None, headers={}, readAhead=False):
+        """
+        Iterate over all the aliases of the specified service, the pages are fetched on demand.
+        :param serviceName: (required, string), name of the service.
+        :param pageSize: (optional, integer) the number of aliases fetched per request.
+        :param prefix: (optional, string) list the aliases with the given prefix.
+        :param startKey: (optional, string) startKey is where you want to start listing from.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the alias attributes as returned by list_aliases.
+        """
+        return self._iter_pages(self.list_aliases, 'aliases', readAhead, serviceName, limit=pageSize,
+                                prefix=prefix, startKey=startKey, headers=headers)
 
     def delete_alias(self, serviceName, aliasName, headers={}):
         """
@@ -1500,9 +2391,9 @@ class Client(object):
         method = 'DELETE'
         path = '/{0}/services/{1}/aliases/{2}'.format(
             self.api_version, serviceName, aliasName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_alias')
 
-        self._do_request(method, path, headers)
+        self._do_request(method, path, headers, operation='delete_alias')
 
     def tag_resource(self, resourceArn, tags, headers={}):
         """
@@ -1521,14 +2412,14 @@ class Client(object):
         """
         method = 'POST'
         path = '/{0}/tag'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='tag_resource')
         payload = {
             'resourceArn': resourceArn,
             'tags': tags
         }
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='tag_resource')
+        return FcHttpResponse(r.headers, data)
 
     def untag_resource(self, resourceArn, tagKeys, deleteAll=False, headers={}):
         """
@@ -1548,15 +2439,15 @@ class Client(object):
         """
         method = 'DELETE'
         path = '/{0}/tag'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='untag_resource')
         payload = {
             'resourceArn': resourceArn,
             'tagKeys': tagKeys,
             'all': deleteAll
         }
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='untag_resource')
+        return FcHttpResponse(r.headers, data)
 
     def get_resource_tags(self, resourceArn,  headers={}):
         """
@@ -1579,11 +2470,11 @@ class Client(object):
         """
         method = 'GET'
         path = '/{0}/tag'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_resource_tags')
 
         params = {"resourceArn": resourceArn}
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='get_resource_tags')
+        return FcHttpResponse(r.headers, data)
 
     def list_reserved_capacities(self, limit=None, nextToken=None, headers={}):
         """
@@ -1614,13 +2505,27 @@ class Client(object):
         """
         method = 'GET'
         path = '/{0}/reservedCapacities'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_reserved_capacities')
 
         paramlst = [('limit', limit), ('nextToken', nextToken)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_reserved_capacities')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_reserved_capacities(self, pageSize=None, headers={}, readAhead=False):
+        """
+        Iterate over all the reserved capacities in the current account, the pages are fetched on demand.
+        :param pageSize: (optional, integer) the number of reserved capacities fetched per request.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the reserved capacity attributes as returned by list_reserved_capacities.
+        """
+        return self._iter_pages(self.list_reserved_capacities, 'reservedCapacities', readAhead, limit=pageSize,
+                                headers=headers)
 
     def put_on_demand_config(self, serviceName, alias, functionName, maximumInstanceCount, headers={}):
         """
@@ -1643,13 +2548,13 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/on-demand-config'.format(
             self.api_version, serviceName, alias, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='put_on_demand_config')
         payload = {
             'maximumInstanceCount': maximumInstanceCount,
         }
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='put_on_demand_config')
+        return FcHttpResponse(r.headers, data)
 
     def get_on_demand_config(self, serviceName, alias, functionName, headers={}):
         """
@@ -1671,9 +2576,9 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/on-demand-config'.format(
             self.api_version, serviceName, alias, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        headers = self._build_common_headers(method, path, headers, operation='get_on_demand_config')
+        r, data = self._do_json_request(method, path, headers, operation='get_on_demand_config')
+        return FcHttpResponse(r.headers, data)
 
     def delete_on_demand_config(self, serviceName, alias, functionName, headers={}):
         """
@@ -1691,8 +2596,8 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/on-demand-config'.format(
             self.api_version, serviceName, alias, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
-        r = self._do_request(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_on_demand_config')
+        r = self._do_request(method, path, headers, operation='delete_on_demand_config')
         return FcHttpResponse(r.headers, None)
 
     def list_on_demand_config(self, limit=100, nextToken=None, prefix=None, startKey=None, headers={}):
@@ -1728,9 +2633,25 @@ class Client(object):
                     ('nextToken', nextToken), ('startKey', startKey)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        headers = self._build_common_headers(method, path, headers)
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        headers = self._build_common_headers(method, path, headers, operation='list_on_demand_config')
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_on_demand_config')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_on_demand_configs(self, pageSize=100, prefix=None, startKey=None, headers={}, readAhead=False):
+        """
+        Iterate over all the on demand configs in the current account, the pages are fetched on demand.
+        :param pageSize: (optional, integer) the number of configs fetched per request, default 100.
+        :param prefix: (optional, string) list the resource with the given prefix.
+        :param startKey: (optional, string) startKey is where you want to start listing from.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the configs as returned by list_on_demand_config.
+        """
+        return self._iter_pages(self.list_on_demand_config, 'configs', readAhead, limit=pageSize, prefix=prefix,
+                                startKey=startKey, headers=headers)
 
     def put_provision_config(self, serviceName, qualifier, functionName, target, headers={}):
         """
@@ -1753,13 +2674,13 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/provision-config'.format(
             self.api_version, serviceName, qualifier, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='put_provision_config')
         payload = {
             'target': target,
         }
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'), operation='put_provision_config')
+        return FcHttpResponse(r.headers, data)
 
     def get_provision_config(self, serviceName, qualifier, functionName, headers={}):
         """
@@ -1781,10 +2702,10 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/provision-config'.format(
             self.api_version, serviceName, qualifier, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_provision_config')
 
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, operation='get_provision_config')
+        return FcHttpResponse(r.headers, data)
 
     def list_provision_configs(self, serviceName, qualifier,  limit=None, nextToken=None, headers={}):
         """
@@ -1815,14 +2736,30 @@ class Client(object):
                 'serviceName is required when qualifier is not empty')
         method = 'GET'
         path = '/{0}/provision-configs'.format(self.api_version)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_provision_configs')
 
         paramlst = [('serviceName', serviceName), ('qualifier', qualifier),
                     ('limit', limit), ('nextToken', nextToken)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params, operation='list_provision_configs')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_provision_configs(self, serviceName, qualifier, pageSize=None, headers={}, readAhead=False):
+        """
+        Iterate over all the provision configs of the specified service, the pages are fetched on demand.
+        :param serviceName: (optional, string), name of the service.
+        :param qualifier: (optional, string) name of the service's alias.
+        :param pageSize: (optional, integer) the number of provision configs fetched per request.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the provision configs as returned by list_provision_configs.
+        """
+        return self._iter_pages(self.list_provision_configs, 'provisionConfigs', readAhead, serviceName, qualifier,
+                                limit=pageSize, headers=headers)
 
     def put_function_async_invoke_config(self, serviceName, qualifier, functionName, asyncConfig, headers={}):
         """
@@ -1850,11 +2787,12 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/async-invoke-config'.format(
             self.api_version, serviceName, qualifier, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='put_function_async_invoke_config')
         payload = asyncConfig
-        r = self._do_request(method, path, headers,
-                             body=json.dumps(payload).encode('utf-8'))
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers,
+                                        body=json.dumps(payload).encode('utf-8'),
+                                        operation='put_function_async_invoke_config')
+        return FcHttpResponse(r.headers, data)
 
     def get_function_async_invoke_config(self, serviceName, qualifier, functionName, headers={}):
         """
@@ -1881,10 +2819,10 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/async-invoke-config'.format(
             self.api_version, serviceName, qualifier, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='get_function_async_invoke_config')
 
-        r = self._do_request(method, path, headers)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, operation='get_function_async_invoke_config')
+        return FcHttpResponse(r.headers, data)
 
     def list_function_async_invoke_configs(self, serviceName, functionName, limit=None, nextToken=None, headers={}):
         """
@@ -1926,13 +2864,31 @@ class Client(object):
         method = 'GET'
         path = '/{0}/services/{1}/functions/{2}/async-invoke-configs'.format(
             self.api_version, serviceName, functionName)
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_function_async_invoke_configs')
 
         paramlst = [('limit', limit), ('nextToken', nextToken)]
         params = dict((k, v) for k, v in paramlst if v)
 
-        r = self._do_request(method, path, headers, params=params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params=params,
+                                        operation='list_function_async_invoke_configs')
+        return FcHttpResponse(r.headers, data)
+
+    def iter_function_async_invoke_configs(self, serviceName, functionName, pageSize=None, headers={},
+                                           readAhead=False):
+        """
+        Iterate over all the async invoke configs of the specified function, the pages are fetched on demand.
+        :param serviceName: (required, string), name of the service.
+        :param functionName: (required, string), name of the function.
+        :param pageSize: (optional, integer) the number of configs fetched per request.
+        :param headers, optional
+            1, 'x-fc-trace-id': string (a uuid to do the request tracing)
+            2, user define key value
+        :param readAhead: (optional, bool) fetch the next page in the background while the current one is
+                          consumed, default False.
+        :return: generator of dict, the configs as returned by list_function_async_invoke_configs.
+        """
+        return self._iter_pages(self.list_function_async_invoke_configs, 'configs', readAhead, serviceName,
+                                functionName, limit=pageSize, headers=headers)
 
     def delete_function_async_invoke_config(self, serviceName, qualifier, functionName, headers={}):
         """
@@ -1948,9 +2904,9 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/async-invoke-config'.format(
             self.api_version, serviceName, qualifier, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='delete_function_async_invoke_config')
 
-        self._do_request(method, path, headers)
+        self._do_request(method, path, headers, operation='delete_function_async_invoke_config')
 
     def list_instances(self, serviceName, qualifier, functionName, params={}, headers={}):
         """
@@ -1969,10 +2925,10 @@ class Client(object):
         path = '/{0}/services/{1}.{2}/functions/{3}/instances'.format(
             self.api_version, serviceName, qualifier, functionName)
 
-        headers = self._build_common_headers(method, path, headers)
+        headers = self._build_common_headers(method, path, headers, operation='list_instances')
 
-        r = self._do_request(method, path, headers, params)
-        return FcHttpResponse(r.headers, r.json())
+        r, data = self._do_json_request(method, path, headers, params, operation='list_instances')
+        return FcHttpResponse(r.headers, data)
 
     def instance_exec(self, serviceName, qualifier, functionName, instance_id, params={}, hooks={}, headers={}):
         """
@@ -2081,3 +3037,83 @@ class FcHttpResponse(object):
     @property
     def data(self):
         return self._data
+
+
+class FcStreamingResponse(object):
+    """
+    The output of a function invoked with ``stream=True``, read from the connection on demand.
+    The connection goes back to the pool once the output is read to the end or the response is
+    closed, use it as a context manager when it may not be read to the end.
+    """
+
+    def __init__(self, headers, response):
+        self._headers = headers
+        self._response = response
+
+    @property
+    def headers(self):
+        return self._headers
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes of the output, all the rest when size is negative.
+        :return: bytes, empty at the end of the output.
+        """
+        if size is None or size < 0:
+            return self._response.raw.read(decode_content=True)
+        return self._response.raw.read(size, decode_content=True)
+
+    def iter_chunks(self, chunkSize=64 * 1024):
+        """
+        :return: iterator of the output bytes, by chunks of at most chunkSize bytes.
+        """
+        return self._response.iter_content(chunkSize)
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def write_to(self, dest, chunkSize=1024 * 1024):
+        """
+        Copy the output to a file and close the response.
+        :param dest: (required, string or writable file-like object) the path of the file or the file object.
+        :param chunkSize: (optional, integer) size of the chunks read from the connection, default 1MB.
+        :return: the number of bytes written.
+        """
+        if isinstance(dest, str):
+            with open(dest, 'wb') as f:
+                return self.write_to(f, chunkSize)
+        written = 0
+        with self:
+            for chunk in self.iter_chunks(chunkSize):
+                dest.write(chunk)
+                written += len(chunk)
+        return written
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class InvokeResult(object):
+    """
+    The outcome of one invocation of :meth:`Client.invoke_many`.
+        index: position of the payload in the input payloads.
+        response: FcHttpResponse of the invocation, None if it failed.
+        error: the FcError or network error raised by the invocation, None if it succeeded.
+        latency: duration of the invocation, in second.
+    """
+
+    def __init__(self, index, response=None, error=None, latency=0):
+        self.index = index
+        self.response = response
+        self.error = error
+        self.latency = latency
+
+    @property
+    def ok(self):
+        return self.error is None
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from . import util
+
+_ENTRY_HEADER = struct.Struct('<IQ')
+
+logger = logging.getLogger(__name__)
+
+
+def _default_cache_dir():
+    return os.path.join(os.path.expanduser('~'), '.cache', 'aliyun-fc2', 'code')
+
+
+class CodePackageCache(object):
+    """
+    Local on-disk cache of the zip packages built from code directories by
+    create_function/update_function (codeDir).
+
+    A package is keyed on the manifest of its entries (archive path, size, mtime, mode and
+    content hash), so an unchanged directory reuses the previously built zip. The deflated
+    content of every file is cached as well, keyed on its content hash, so a changed
+    directory only recompresses the files that actually changed.
+    The cache is bounded by maxSize bytes, the least recently used packages and entries are
+    evicted first.
+
+    :param cacheDir: (optional, string) the cache directory, default ~/.cache/aliyun-fc2/code.
+    :param maxSize: (optional, integer) the max size of the cache in byte, default 1 GB.
+    :param workers: (optional, integer) number of threads compressing the changed files, default 1.
+    :param deterministic: (optional, bool) build the packages like util.zip_dir(..., deterministic=True),
+        default False. The mtime of the files is then left out of the package key as well.
+    """
+
+    def __init__(self, cacheDir=None, maxSize=1024 * 1024 * 1024, workers=1, deterministic=False):
+        self.cache_dir = cacheDir or _default_cache_dir()
+        self.max_size = maxSize
+        self.workers = workers
+        self.deterministic = deterministic
+        self._packages_dir = os.path.join(self.cache_dir, 'packages')
+        self._entries_dir = os.path.join(self.cache_dir, 'entries')
+        self._index_path = os.path.join(self.cache_dir, 'index.json')
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _ensure_dirs(self):
+        for d in (self._packages_dir, self._entries_dir):
+            if not os.path.isdir(d):
+                os.makedirs(d)
+
+    def _load_index(self):
+        """ The stat index maps a file path to (size, mtime_ns, inode, content hash). """
+        if self._index is None:
+            try:
+                with open(self._index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (IOError, OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    @staticmethod
+    def _hash_file(fullPath):
+        h = hashlib.sha256()
+        with open(fullPath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def _content_hash(self, fullPath, st):
+        index = self._load_index()
+        key = os.path.abspath(fullPath)
+        stamp = [st.st_size, st.st_mtime_ns, st.st_ino]
+        cached = index.get(key)
+        if cached is not None and cached[:3] == stamp:
+            return cached[3]
+        digest = self._hash_file(fullPath)
+        index[key] = stamp + [digest]
+        return digest
+
+    def _manifest(self, codeDir):
+        """
+        :return: (manifest digest, entries), entries are (kind, fullPath, archiveName, content hash).
+        """
+        manifest = hashlib.sha256()
+        if self.deterministic:
+            manifest.update(b'deterministic\n')
+        entries = []
+        for kind, fullPath, archiveName in util._list_entries(codeDir, sort=self.deterministic):
+            digest = ''
+            if kind == 'file':
+                st = os.stat(fullPath)
+                digest = self._content_hash(fullPath, st)
+                if self.deterministic:
+                    line = [kind, archiveName, st.st_size, bool(st.st_mode & 0o111), digest]
+                else:
+                    line = [kind, archiveName, st.st_size, st.st_mtime_ns, st.st_mode, digest]
+            elif kind == 'link':
+                line = [kind, archiveName, os.readlink(fullPath)]
+            else:
+                line = [kind, archiveName]
+            manifest.update(json.dumps(line).encode('utf-8'))
+            manifest.update(b'\n')
+            entries.append((kind, fullPath, archiveName, digest))
+        return manifest.hexdigest(), entries
+
+    def _entry_path(self, digest):
+        return os.path.join(self._entries_dir, digest)
+
+    def _store_entry(self, digest, fullPath):
+        data, crc, size = util._deflate_file(fullPath)
+        fd, tmp = tempfile.mkstemp(dir=self._entries_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_ENTRY_HEADER.pack(crc, size))
+            f.write(data)
+        os.replace(tmp, self._entry_path(digest))
+
+    def _load_entry(self, digest):
+        path = self._entry_path(digest)
+        with open(path, 'rb') as f:
+            crc, size = _ENTRY_HEADER.unpack(f.read(_ENTRY_HEADER.size))
+            data = f.read()
+        os.utime(path, None)
+        return data, crc, size
+
+    def get_package(self, codeDir):
+        """
+        Return the path of the zip package of codeDir, building it when the directory changed.
+        The content of the package is the same as util.zip_dir(codeDir, ..., deterministic=self.deterministic).
+        The package may be evicted by a later call for another directory, see open_package.
+        :param codeDir: (required, string) the directory of the code.
+        :return: string, path of the cached zip file.
+        """
+        with self._lock:
+            return self._get_package(codeDir)
+
+    def open_package(self, codeDir):
+        """
+        Like get_package, but open the package before releasing the cache, so that the returned
+        file can still be read when a concurrent call evicts the package.
+        :param codeDir: (required, string) the directory of the code.
+        :return: the zip file object, opened in binary mode.
+        """
+        with self._lock:
+            return open(self._get_package(codeDir), 'rb')
+
+    def _get_package(self, codeDir):
+        """ get_package, with the lock held. """
+        self._ensure_dirs()
+        key, entries = self._manifest(codeDir)
+        self._prune_index(codeDir, entries)
+        self._save_index()
+
+        package = os.path.join(self._packages_dir, key + '.zip')
+        if os.path.exists(package):
+            logger.debug('Code package cache hit for %s: %s', codeDir, package)
+            os.utime(package, None)
+            return package
+
+        missing = {}
+        for kind, fullPath, _, digest in entries:
+            if kind == 'file' and digest not in missing and not os.path.exists(self._entry_path(digest)):
+                missing[digest] = fullPath
+        logger.debug('Code package cache miss for %s, %s of %s entries to compress',
+                     codeDir, len(missing), len(entries))
+        if self.workers > 1 and len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(lambda item: self._store_entry(*item), missing.items()))
+        else:
+            for digest, fullPath in missing.items():
+                self._store_entry(digest, fullPath)
+
+        fd, tmp = tempfile.mkstemp(dir=self._packages_dir)
+        with os.fdopen(fd, 'wb') as f:
+            zipOut = zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_DEFLATED)
+            for kind, fullPath, archiveName, digest in entries:
+                if kind == 'file':
+                    data, crc, size = self._load_entry(digest)
+                    zipInfo = util._file_info(fullPath, archiveName, self.deterministic)
+                    util._write_deflated(zipOut, zipInfo, data, crc, size)
+                else:
+                    util._write_entry(zipOut, kind, fullPath, archiveName, self.deterministic)
+            zipOut.close()
+        os.replace(tmp, package)
+
+        self._evict(keep=package)
+        return package
+
+    def _prune_index(self, codeDir, entries):
+        """ Forget the files of codeDir which no longer exist. """
+        prefix = os.path.join(os.path.abspath(codeDir), '')
+        seen = set(os.path.abspath(e[1]) for e in entries if e[0] == 'file')
+        index = self._load_index()
+        for path in [p for p in index if p.startswith(prefix) and p not in seen]:
+            del index[path]
+
+    def _files(self):
+        files = []
+        for d in (self._packages_dir, self._entries_dir):
+            if not os.path.isdir(d):
+                continue
+            for name in os.listdir(d):
+                path = os.path.join(d, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _evict(self, keep=None):
+        files = self._files()
+        total = sum(f[1] for f in files)
+        # least recently used first
+        for _, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def info(self):
+        """
+        Inspect the cache.
+        :return: dict
+        {
+            'cacheDir': 'string',
+            'maxSize': 1073741824,  // in byte
+            'size': 1024,           // in byte
+            'packages': 1,
+            'entries': 10
+        }
+        """
+        with self._lock:
+            files = self._files()
+        return {
+            'cacheDir': self.cache_dir,
+            'maxSize': self.max_size,
+            'size': sum(f[1] for f in files),
+            'packages': len([f for f in files if os.path.dirname(f[2]) == self._packages_dir]),
+            'entries': len([f for f in files if os.path.dirname(f[2]) == self._entries_dir]),
+        }
+
+    def clear(self):
+        """
+        Remove all the cached packages and entries.
+        """
+        with self._lock:
+            if os.path.isdir(self.cache_dir):
+                shutil.rmtree(self.cache_dir)
+            self._index = None
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import collections
+import logging
+import threading
+import time
+
+from . import fc_exceptions
+from .ratelimit import RateLimitExceededError
+
+logger = logging.getLogger(__name__)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AdaptiveConcurrencyLimit(object):
+    """
+    Adaptive limit of the in-flight invocations of one function (AIMD).
+
+    Every successful invocation adds 1 / limit to the limit, so it grows by about one per round trip
+    while the invocations keep the limit busy. A throttled invocation (http 429 or a throttling error
+    code) multiplies it by backoffRatio, and so does a latency increase: when the recent average latency
+    exceeds latencyTolerance times the long-term average. Only the invocations started after the last
+    decrease can decrease the limit again, so a burst of throttling errors backs off once.
+
+    :param initialLimit: (optional, integer) the limit before any feedback, default 10.
+    :param minLimit: (optional, integer) lower bound of the limit, default 1.
+    :param maxLimit: (optional, integer) upper bound of the limit, default 1000.
+    :param backoffRatio: (optional, number) the factor applied to the limit on throttling, default 0.7.
+    :param latencyTolerance: (optional, number) the ratio of the recent to the long-term average latency
+        considered as congestion, default 2, None ignores the latency.
+    :param minSamples: (optional, integer) number of invocations before the latency is considered, default 20.
+    """
+
+    def __init__(self, key=None, initialLimit=10, minLimit=1, maxLimit=1000, backoffRatio=0.7,
+                 latencyTolerance=2.0, minSamples=20):
+        if not 0 < minLimit <= initialLimit <= maxLimit:
+            raise ValueError('0 < minLimit <= initialLimit <= maxLimit required')
+        if not 0 < backoffRatio < 1:
+            raise ValueError('backoffRatio must be between 0 and 1')
+        self.key = key
+        self.min_limit = minLimit
+        self.max_limit = maxLimit
+        self.backoff_ratio = backoffRatio
+        self.latency_tolerance = latencyTolerance
+        self.min_samples = minSamples
+        self._limit = float(initialLimit)
+        self._inflight = 0
+        self._samples = 0
+        self._short_latency = None
+        self._long_latency = None
+        self._last_decrease = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # (loop, future) of the coroutines waiting in acquire_async.
+        self._waiters = collections.deque()
+
+    @property
+    def limit(self):
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def inflight(self):
+        return self._inflight
+
+    def _try_acquire(self):
+        if self._inflight < self.limit:
+            self._inflight += 1
+            return True
+        return False
+
+    def _notify(self):
+        free = self.limit - self._inflight
+        if free <= 0:
+            return
+        self._cond.notify(free)
+        while free > 0 and self._waiters:
+            loop, waiter = self._waiters.popleft()
+            if not waiter.done():
+                loop.call_soon_threadsafe(_wake, waiter)
+                free -= 1
+
+    def acquire(self):
+        """
+        Wait for a free slot.
+        :return: the start time of the invocation, to pass to release().
+        """
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+        return time.monotonic()
+
+    def try_acquire(self):
+        """
+        Take a free slot without waiting.
+        :return: the start time of the invocation, None when the limit is reached.
+        """
+        with self._lock:
+            if not self._try_acquire():
+                return None
+        return time.monotonic()
+
+    async def acquire_async(self):
+        """
+        Asynchronous version of acquire().
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            with self._lock:
+                if self._try_acquire():
+                    return time.monotonic()
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # the slot we may have been woken for goes to another waiter.
+                with self._lock:
+                    self._notify()
+                raise
+
+    def _decrease(self, start, now, reason):
+        if start < self._last_decrease:
+            return
+        old = self.limit
+        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        self._last_decrease = now
+        logger.info('Concurrency limit of %s decreased from %s to %s: %s', self.key, old, self.limit, reason)
+
+    def release(self, start, error=None, ignore=False):
+        """
+        Release the slot of an invocation and adapt the limit to its outcome.
+        :param start: the value returned by acquire().
+        :param error: (optional) the exception raised by the invocation.
+        :param ignore: (optional, bool) release without feedback, for a cancelled invocation.
+        """
+        now = time.monotonic()
+        with self._lock:
+            inflight = self._inflight
+            self._inflight -= 1
+            if ignore or isinstance(error, RateLimitExceededError):
+                pass
+            elif isinstance(error, fc_exceptions.FcError) and \
+                    fc_exceptions.is_throttling_error(error.status_code, error.err_code):
+                self._decrease(start, now, 'throttled')
+            elif error is None:
+                self._on_success(start, now, inflight)
+            self._notify()
+
+    def _on_success(self, start, now, inflight):
+        latency = now - start
+        self._samples += 1
+        if self._long_latency is None:
+            self._short_latency = self._long_latency = latency
+        else:
+            self._short_latency += (latency - self._short_latency) * 0.2
+            self._long_latency += (latency - self._long_latency) * 0.02
+        if self.latency_tolerance is not None and self._samples >= self.min_samples and \
+                self._short_latency > self._long_latency * self.latency_tolerance:
+            self._decrease(start, now, 'latency increased')
+            return
+        # the limit only grows while it is actually used.
+        if inflight * 2 >= self.limit:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+    def snapshot(self):
+        """
+        :return: dict, {'limit': 12, 'inflight': 10, 'latency': 0.05}, latency is the recent average
+                 latency of the successful invocations in second.
+        """
+        with self._lock:
+            return {'limit': self.limit, 'inflight': self._inflight, 'latency': self._short_latency}
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """
+    The adaptive concurrency limits of the functions invoked by a client, created on first use and
+    keyed by (serviceName, qualifier, functionName). Pass it to ``fc2.Client(concurrencyLimiter=...)``:
+    invoke_function then waits for a free slot of the function before sending the request. The keyword
+    arguments are those of :class:`AdaptiveConcurrencyLimit`.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def get(self, serviceName, qualifier, functionName):
+        key = (serviceName, qualifier or None, functionName)
+        limit = self._limits.get(key)
+        if limit is None:
+            with self._lock:
+                limit = self._limits.get(key)
+                if limit is None:
+                    limit = AdaptiveConcurrencyLimit(key, **self._kwargs)
+                    self._limits[key] = limit
+        return limit
+
+    def states(self):
+        """
+        :return: dict, (serviceName, qualifier, functionName) -> AdaptiveConcurrencyLimit.snapshot()
+        """
+        with self._lock:
+            limits = list(self._limits.items())
+        return dict((key, limit.snapshot()) for key, limit in limits)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+import calendar
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+Credentials = collections.namedtuple(
+    'Credentials', ['access_key_id', 'access_key_secret', 'security_token', 'expiration'])
+Credentials.__doc__ = """
+An immutable set of credentials. expiration is the unix time the credentials expire at,
+None for credentials which do not expire.
+"""
+
+
+def _parse_expiration(value):
+    """ Parse an STS expiration, either a unix time or an ISO 8601 UTC string like 2015-04-09T11:52:19Z. """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(calendar.timegm(time.strptime(value, '%Y-%m-%dT%H:%M:%SZ')))
+
+
+def _to_credentials(value):
+    """ Accept a Credentials or an STS style dict (AccessKeyId, AccessKeySecret, SecurityToken, Expiration). """
+    if isinstance(value, Credentials):
+        return value
+    if isinstance(value, dict):
+        return Credentials(value['AccessKeyId'].strip(), value['AccessKeySecret'].strip(),
+                           (value.get('SecurityToken') or '').strip(), _parse_expiration(value.get('Expiration')))
+    raise TypeError('Credentials or dict required, got {0}'.format(type(value).__name__))
+
+
+class CredentialsProvider(object):
+    """
+    Source of the credentials used to sign the requests of a client.
+    get_credentials() is called for every request, it must be cheap and thread-safe.
+    """
+
+    def get_credentials(self):
+        """
+        :return: Credentials
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release the resources of the provider, like its refresh thread.
+        """
+        pass
+
+
+class StaticCredentialsProvider(CredentialsProvider):
+    """
+    Credentials which never change.
+    :param accessKeyID: (required, string) the access key id.
+    :param accessKeySecret: (required, string) the access key secret.
+    :param securityToken: (optional, string) the STS security token.
+    """
+
+    def __init__(self, accessKeyID, accessKeySecret, securityToken=''):
+        self._credentials = Credentials(accessKeyID.strip(), accessKeySecret.strip(),
+                                        (securityToken or '').strip(), None)
+
+    def get_credentials(self):
+        return self._credentials
+
+
+class EnvironmentCredentialsProvider(StaticCredentialsProvider):
+    """
+    Credentials read from the environment variables ALIBABA_CLOUD_ACCESS_KEY_ID,
+    ALIBABA_CLOUD_ACCESS_KEY_SECRET and ALIBABA_CLOUD_SECURITY_TOKEN (optional) when the
+    provider is created.
+    """
+
+    def __init__(self, accessKeyIDVar='ALIBABA_CLOUD_ACCESS_KEY_ID',
+                 accessKeySecretVar='ALIBABA_CLOUD_ACCESS_KEY_SECRET',
+                 securityTokenVar='ALIBABA_CLOUD_SECURITY_TOKEN'):
+        access_key_id = os.environ.get(accessKeyIDVar)
+        access_key_secret = os.environ.get(accessKeySecretVar)
+        if not access_key_id or not access_key_secret:
+            raise ValueError('The environment variables {0} and {1} must be set.'.format(
+                accessKeyIDVar, accessKeySecretVar))
+        super(EnvironmentCredentialsProvider, self).__init__(
+            access_key_id, access_key_secret, os.environ.get(securityTokenVar, ''))
+
+
+class RefreshableCredentialsProvider(CredentialsProvider):
+    """
+    Credentials returned by a callable, like an STS AssumeRole call, and refreshed in the
+    background before they expire.
+
+    The current credentials are an immutable snapshot swapped by the refresh thread, so
+    get_credentials() is a plain attribute read and the signers are never blocked by a refresh.
+    Only when the credentials have already expired, because the refreshes kept failing, does
+    get_credentials() fetch new ones itself.
+
+    :param fetcher: (required, callable) returns a Credentials, or a dict with the AccessKeyId,
+        AccessKeySecret, SecurityToken and Expiration keys of an STS response.
+    :param refreshBefore: (optional, number) refresh the credentials this many seconds before they
+        expire, default 300.
+    :param refreshInterval: (optional, number) also refresh the credentials every refreshInterval
+        seconds, default None (only before they expire).
+    :param retryInterval: (optional, number) wait time in second before retrying a failed refresh, default 10.
+    """
+
+    def __init__(self, fetcher, refreshBefore=300, refreshInterval=None, retryInterval=10):
+        self.fetcher = fetcher
+        self.refresh_before = refreshBefore
+        self.refresh_interval = refreshInterval
+        self.retry_interval = retryInterval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._credentials = None
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name='fc2-credentials-refresh')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _fetch(self):
+        return _to_credentials(self.fetcher())
+
+    def refresh(self):
+        """
+        Fetch new credentials now.
+        :return: Credentials
+        """
+        with self._lock:
+            credentials = self._fetch()
+            self._credentials = credentials
+            self._fetched_at = time.time()
+        logger.debug('Credentials of %s refreshed, expiration: %s', credentials.access_key_id,
+                     credentials.expiration)
+        return credentials
+
+    def get_credentials(self):
+        credentials = self._credentials
+        if credentials.expiration is not None and time.time() >= credentials.expiration:
+            with self._lock:
+                # another signer may have refreshed them while we were waiting for the lock.
+                if self._credentials is credentials:
+                    self._credentials = self._fetch()
+                    self._fetched_at = time.time()
+                credentials = self._credentials
+        return credentials
+
+    def _next_refresh(self):
+        credentials = self._credentials
+        deadlines = []
+        if credentials.expiration is not None:
+            # never refresh before half of the lifetime of the credentials, short-lived
+            # credentials would be refreshed in a loop otherwise.
+            lifetime = credentials.expiration - self._fetched_at
+            deadlines.append(credentials.expiration - min(self.refresh_before, lifetime / 2))
+        if self.refresh_interval is not None:
+            deadlines.append(self._fetched_at + self.refresh_interval)
+        return min(deadlines) if deadlines else None
+
+    def _run(self):
+        delay = None
+        while True:
+            if delay is None:
+                deadline = self._next_refresh()
+                delay = None if deadline is None else max(0, deadline - time.time())
+            if self._stopped.wait(delay):
+                return
+            delay = None
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error('Failed to refresh the credentials, retry in %s seconds: %s', self.retry_interval, e)
+                delay = self.retry_interval
+
+    def close(self):
+        self._stopped.set()
+
+
+class FileCredentialsProvider(RefreshableCredentialsProvider):
+    """
+    Credentials read from a JSON file holding the AccessKeyId, AccessKeySecret, SecurityToken
+    and Expiration keys of an STS response, reloaded in the background when the file changes.
+    :param path: (required, string) the path of the file.
+    :param pollInterval: (optional, number) how often the modification time of the file is checked,
+        in second, default 5.
+    """
+
+    def __init__(self, path, pollInterval=5, retryInterval=10):
+        self.path = path
+        self._stamp = None
+        super(FileCredentialsProvider, self).__init__(
+            self._load, refreshBefore=0, refreshInterval=pollInterval, retryInterval=retryInterval)
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def refresh(self):
+        with self._lock:
+            stamp = self._stat()
+            if stamp != self._stamp or self._credentials is None:
+                self._credentials = self._fetch()
+                self._stamp = stamp
+                logger.debug('Credentials reloaded from %s', self.path)
+            self._fetched_at = time.time()
+            return self._credentials
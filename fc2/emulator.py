@@ -0,0 +1,1010 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import collections
+import email.utils
+import hashlib
+import hmac
+import json
+import logging
+import random
+import re
+import socketserver
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from . import auth, util
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = '2016-08-15'
+
+# (http method, path below /2016-08-15, handler), '*' matches any method.
+_ROUTES = [
+    ('GET', '/account-settings', 'get_account_settings'),
+    ('POST', '/services', 'create_service'),
+    ('GET', '/services', 'list_services'),
+    ('GET', '/services/(?P<service>[^/]+)', 'get_service'),
+    ('PUT', '/services/(?P<service>[^/]+)', 'update_service'),
+    ('DELETE', '/services/(?P<service>[^/]+)', 'delete_service'),
+    ('POST', '/services/(?P<service>[^/]+)/functions', 'create_function'),
+    ('GET', '/services/(?P<service>[^/]+)/functions', 'list_functions'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)', 'get_function'),
+    ('PUT', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)', 'update_function'),
+    ('DELETE', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)', 'delete_function'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/code', 'get_function_code'),
+    ('POST', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/invocations', 'invoke_function'),
+    ('POST', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/triggers', 'create_trigger'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/triggers', 'list_triggers'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/triggers/(?P<trigger>[^/]+)',
+     'get_trigger'),
+    ('PUT', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/triggers/(?P<trigger>[^/]+)',
+     'update_trigger'),
+    ('DELETE', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/triggers/(?P<trigger>[^/]+)',
+     'delete_trigger'),
+    ('PUT', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/on-demand-config', 'put_on_demand_config'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/on-demand-config', 'get_on_demand_config'),
+    ('DELETE', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/on-demand-config',
+     'delete_on_demand_config'),
+    ('GET', '/on-demand-configs', 'list_on_demand_config'),
+    ('PUT', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/provision-config', 'put_provision_config'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/provision-config', 'get_provision_config'),
+    ('GET', '/provision-configs', 'list_provision_configs'),
+    ('PUT', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/async-invoke-config',
+     'put_function_async_invoke_config'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/async-invoke-config',
+     'get_function_async_invoke_config'),
+    ('DELETE', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/async-invoke-config',
+     'delete_function_async_invoke_config'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/async-invoke-configs',
+     'list_function_async_invoke_configs'),
+    ('GET', '/services/(?P<service>[^/]+)/functions/(?P<function>[^/]+)/instances', 'list_instances'),
+    ('POST', '/services/(?P<service>[^/]+)/versions', 'publish_version'),
+    ('GET', '/services/(?P<service>[^/]+)/versions', 'list_versions'),
+    ('DELETE', '/services/(?P<service>[^/]+)/versions/(?P<version>[^/]+)', 'delete_version'),
+    ('POST', '/services/(?P<service>[^/]+)/aliases', 'create_alias'),
+    ('GET', '/services/(?P<service>[^/]+)/aliases', 'list_aliases'),
+    ('GET', '/services/(?P<service>[^/]+)/aliases/(?P<alias>[^/]+)', 'get_alias'),
+    ('PUT', '/services/(?P<service>[^/]+)/aliases/(?P<alias>[^/]+)', 'update_alias'),
+    ('DELETE', '/services/(?P<service>[^/]+)/aliases/(?P<alias>[^/]+)', 'delete_alias'),
+    ('POST', '/custom-domains', 'create_custom_domain'),
+    ('GET', '/custom-domains', 'list_custom_domains'),
+    ('GET', '/custom-domains/(?P<domain>[^/]+)', 'get_custom_domain'),
+    ('PUT', '/custom-domains/(?P<domain>[^/]+)', 'update_custom_domain'),
+    ('DELETE', '/custom-domains/(?P<domain>[^/]+)', 'delete_custom_domain'),
+    ('POST', '/tag', 'tag_resource'),
+    ('DELETE', '/tag', 'untag_resource'),
+    ('GET', '/tag', 'get_resource_tags'),
+    ('GET', '/reservedCapacities', 'list_reserved_capacities'),
+    ('*', '/proxy/(?P<service>[^/]+)/(?P<function>[^/]+)(?P<path>/.*)?', 'do_http_request'),
+]
+_COMPILED_ROUTES = [(method, re.compile('^/' + API_VERSION + pattern + '$'), name)
+                    for method, pattern, name in _ROUTES]
+
+
+class _ApiError(Exception):
+    def __init__(self, status, code, message):
+        super(_ApiError, self).__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+
+def _etag(data):
+    return hashlib.md5(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _split_qualifier(service):
+    name, _, qualifier = service.partition('.')
+    return name, qualifier or None
+
+
+class _Request(object):
+    def __init__(self, method, path, query, headers, body, request_id):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.request_id = request_id
+
+    def param(self, key, default=None):
+        values = self.query.get(key)
+        return values[0] if values else default
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body.decode('utf-8'))
+        except ValueError as e:
+            raise _ApiError(400, 'InvalidArgument', 'Invalid JSON body: {0}'.format(e))
+        if not isinstance(data, dict):
+            raise _ApiError(400, 'InvalidArgument', 'The body must be a JSON object')
+        return data
+
+
+class Fault(object):
+    """
+    Latency and errors injected into the invocations of the emulator.
+
+    :param latency: (optional, number or callable) the execution time of an invocation in second, or a
+        callable returning it, like ``lambda: random.expovariate(100)``, default 0.
+    :param errorRate: (optional, number) the ratio of the invocations rejected with errorStatus and
+        errorCode, default 0.
+    :param errorStatus: (optional, integer) the http status of the injected errors, default 500.
+    :param errorCode: (optional, string) the ErrorCode of the injected errors, default 'InternalServerError'.
+    :param functionErrorRate: (optional, number) the ratio of the invocations failing with an
+        'UnhandledInvocationError' function error, default 0.
+    :param maxConcurrency: (optional, integer) the invocations above this number of concurrent invocations
+        of the function are throttled (429 ResourceThrottled), default None (no limit).
+    """
+
+    def __init__(self, latency=0, errorRate=0, errorStatus=500, errorCode='InternalServerError',
+                 functionErrorRate=0, maxConcurrency=None):
+        self.latency = latency
+        self.error_rate = errorRate
+        self.error_status = errorStatus
+        self.error_code = errorCode
+        self.function_error_rate = functionErrorRate
+        self.max_concurrency = maxConcurrency
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            if self.max_concurrency is not None and self._inflight >= self.max_concurrency:
+                raise _ApiError(429, 'ResourceThrottled', 'Reached the max concurrency of the function')
+            self._inflight += 1
+        if self.error_rate and random.random() < self.error_rate:
+            self._exit()
+            raise _ApiError(self.error_status, self.error_code, 'Injected error')
+
+    def _exit(self):
+        with self._lock:
+            self._inflight -= 1
+
+    def _execution_time(self):
+        latency = self.latency
+        return latency() if callable(latency) else latency
+
+    def _function_error(self):
+        return bool(self.function_error_rate) and random.random() < self.function_error_rate
+
+
+def _echo(payload, context):
+    return payload
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # load tests open many connections at once.
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are written separately, Nagle would delay the body by the delayed ack.
+    disable_nagle_algorithm = True
+
+    def _read_body(self):
+        if 'chunked' in self.headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    # skip the trailers up to the final empty line.
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get('content-length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _handle(self):
+        body = self._read_body()
+        status, headers, data = self.server.emulator._dispatch(self.command, self.path, self.headers, body)
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _handle
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class Emulator(object):
+    """
+    A local in-process stand-in for the Function Compute API, to exercise and load test
+    :class:`fc2.Client` and :class:`fc2.AsyncClient` offline.
+
+    It serves the services, functions, triggers, versions, aliases, custom domains, tags, on-demand,
+    provision and async invoke configs APIs from memory, and checks the signature of every request with
+    auth.Auth like the real service. The invocations call a python handler, ``handler(payload, context)``
+    returning the output bytes or str, by default the payload is echoed. An exception raised by the
+    handler is returned as an 'UnhandledInvocationError' function error. Latency and errors are injected
+    into the invocations with a :class:`Fault`, for all the functions or per function.
+
+    The emulator does not keep the code packages: get_function_code returns their checksum and an empty url.
+
+        with fc2.emulator.Emulator() as emulator:
+            client = emulator.client()
+            client.create_service('demo')
+
+    :param credentials: (optional, dict) the accepted access key ids and their secrets,
+        default {'emulator': 'emulator'}.
+    :param host: (optional, string) the address to listen on, default '127.0.0.1'.
+    :param port: (optional, integer) the port to listen on, default 0 (a free port).
+    :param handler: (optional, callable) the default function handler, called with the payload (bytes) and
+        a context dict with the serviceName, qualifier, versionId, functionName, requestId and headers.
+    :param fault: (optional, Fault) the faults injected into the invocations of every function.
+    :param verifySignature: (optional, bool) reject the requests whose signature does not match, default True.
+    :param maxClockSkew: (optional, number) reject the requests whose date header is further than this from
+        the local time, in second, default 900. None disables the check.
+    :param accountId: (optional, string) the account id in the resource names, default '1234567890'.
+    """
+
+    def __init__(self, credentials=None, host='127.0.0.1', port=0, handler=None, fault=None,
+                 verifySignature=True, maxClockSkew=900, accountId='1234567890'):
+        self.credentials = dict(credentials or {'emulator': 'emulator'})
+        self.host = host
+        self.port = port
+        self.handler = handler or _echo
+        self.fault = fault
+        self.verify_signature = verifySignature
+        self.max_clock_skew = maxClockSkew
+        self.account_id = accountId
+        self._signers = dict((k, auth.Auth(k, v)) for k, v in self.credentials.items())
+        self._handlers = {}
+        self._faults = {}
+        self._counts = collections.Counter()
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+        self.reset()
+
+    def reset(self):
+        """ Delete all the resources. """
+        with self._lock:
+            self._services = {}
+            self._domains = {}
+            self._on_demand_configs = {}
+            self._provision_configs = {}
+            self._async_configs = {}
+            self._counts.clear()
+
+    def start(self):
+        """ Start serving in a background thread. """
+        if self._server is not None:
+            return self
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.emulator = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fc2-emulator')
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info('FC emulator listening on %s', self.endpoint)
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def endpoint(self):
+        if self._server is None:
+            raise RuntimeError('The emulator is not started')
+        return 'http://{0}:{1}'.format(self.host, self._server.server_port)
+
+    def client(self, **kwargs):
+        """
+        :return: a fc2.Client of the emulator signing with the first credentials, the keyword arguments
+                 are passed to the Client.
+        """
+        from .client import Client
+        access_key_id, access_key_secret = next(iter(self.credentials.items()))
+        kwargs.setdefault('accessKeyID', access_key_id)
+        kwargs.setdefault('accessKeySecret', access_key_secret)
+        return Client(endpoint=self.endpoint, **kwargs)
+
+    def set_handler(self, serviceName, functionName, handler):
+        """ Set the handler of a function, None restores the default handler. """
+        with self._lock:
+            if handler is None:
+                self._handlers.pop((serviceName, functionName), None)
+            else:
+                self._handlers[(serviceName, functionName)] = handler
+
+    def set_fault(self, serviceName, functionName, fault):
+        """ Set the faults injected into the invocations of a function, None restores the default fault. """
+        with self._lock:
+            if fault is None:
+                self._faults.pop((serviceName, functionName), None)
+            else:
+                self._faults[(serviceName, functionName)] = fault
+
+    def request_counts(self):
+        """
+        :return: dict, the number of requests received per operation (the client method name),
+                 'rejected' counts the requests rejected for their signature.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    # request handling
+
+    def _dispatch(self, method, target, headers, body):
+        request_id = str(uuid.uuid4())
+        url = urlsplit(target)
+        path = unquote(url.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        headers = dict((k.lower(), v) for k, v in headers.items())
+        try:
+            name, groups = self._route(method, path)
+            self._verify(method, path, headers, query if name == 'do_http_request' else None)
+            with self._lock:
+                self._counts[name] += 1
+            request = _Request(method, path, query, headers, body, request_id)
+            status, data, response_headers = getattr(self, '_' + name)(request, **groups)
+        except _ApiError as e:
+            status, response_headers = e.status, {}
+            data = {'ErrorCode': e.code, 'ErrorMessage': e.message}
+        except Exception as e:
+            logger.exception('Emulator failed to handle %s %s', method, target)
+            status, response_headers = 500, {}
+            data = {'ErrorCode': 'InternalServerError', 'ErrorMessage': str(e)}
+
+        response_headers['X-Fc-Request-Id'] = request_id
+        if isinstance(data, (dict, list)):
+            response_headers.setdefault('Content-Type', 'application/json')
+            data = json.dumps(data).encode('utf-8')
+        elif isinstance(data, str):
+            data = data.encode('utf-8')
+        elif data is None:
+            data = b''
+        return status, response_headers, bytes(data)
+
+    @staticmethod
+    def _route(method, path):
+        found = False
+        for route_method, pattern, name in _COMPILED_ROUTES:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            found = True
+            if route_method == '*' or route_method == method:
+                return name, dict((k, v) for k, v in match.groupdict().items() if v is not None)
+        if found:
+            raise _ApiError(405, 'MethodNotAllowed', 'Method {0} is not allowed on {1}'.format(method, path))
+        raise _ApiError(404, 'PathNotSupported', 'No API at {0}'.format(path))
+
+    def _verify(self, method, path, headers, queries):
+        if not self.verify_signature:
+            return
+        if self.max_clock_skew is not None:
+            parsed = email.utils.parsedate_tz(headers.get('date', ''))
+            if parsed is None or abs(email.utils.mktime_tz(parsed) - time.time()) > self.max_clock_skew:
+                self._reject()
+                raise _ApiError(403, 'RequestTimeTooSkewed', 'The date of the request is missing or too skewed')
+        authorization = headers.get('authorization', '')
+        access_key_id = authorization[3:].rsplit(':', 1)[0] if authorization.startswith('FC ') else None
+        signer = self._signers.get(access_key_id)
+        if signer is None:
+            self._reject()
+            raise _ApiError(403, 'InvalidAccessKeyID', 'Invalid access key id {0}'.format(access_key_id))
+        expected = signer.sign_request(method, path, headers, queries)
+        if not hmac.compare_digest(expected, authorization):
+            self._reject()
+            raise _ApiError(403, 'SignatureNotMatch', 'The request signature does not match')
+
+    def _reject(self):
+        with self._lock:
+            self._counts['rejected'] += 1
+
+    @staticmethod
+    def _page(request, items, key, name, default_limit=20):
+        """ One page of the items sorted by their `name` attribute, with the prefix/startKey/nextToken filters. """
+        limit = max(1, min(100, int(request.param('limit') or default_limit)))
+        prefix = request.param('prefix')
+        start = max(request.param('startKey') or '', request.param('nextToken') or '')
+        selected = sorted((item for item in items if item[name] >= start and
+                           (not prefix or item[name].startswith(prefix))), key=lambda item: item[name])
+        data = {key: selected[:limit]}
+        if len(selected) > limit:
+            data['nextToken'] = selected[limit][name]
+        return 200, data, {}
+
+    @staticmethod
+    def _resource(attrs):
+        return 200, attrs, {'ETag': _etag(attrs)}
+
+    @staticmethod
+    def _check_etag(request, attrs):
+        expected = request.headers.get('if-match')
+        if expected and expected != _etag(attrs):
+            raise _ApiError(412, 'PreconditionFailed', 'The etag does not match')
+
+    @staticmethod
+    def _update(attrs, data, ignored=()):
+        for k, v in data.items():
+            if v is not None and k not in ignored:
+                attrs[k] = v
+        attrs['lastModifiedTime'] = _now()
+
+    def _service(self, name):
+        record = self._services.get(name)
+        if record is None:
+            raise _ApiError(404, 'ServiceNotFound', 'Service {0} not found'.format(name))
+        return record
+
+    def _resolve(self, record, qualifier):
+        """ :return: (versionId, the functions of the version), 'LATEST' for the current functions. """
+        if not qualifier or qualifier == 'LATEST':
+            return 'LATEST', record['functions']
+        alias = record['aliases'].get(qualifier)
+        version_id = qualifier
+        if alias is not None:
+            version_id = alias['versionId']
+            draw = random.random()
+            for candidate, weight in (alias.get('additionalVersionWeight') or {}).items():
+                if draw < weight:
+                    version_id = candidate
+                    break
+                draw -= weight
+        version = record['versions'].get(version_id)
+        if version is None:
+            if alias is None and not qualifier.isdigit():
+                raise _ApiError(404, 'AliasNotFound', 'Alias {0} not found'.format(qualifier))
+            raise _ApiError(404, 'VersionNotFound', 'Version {0} not found'.format(version_id))
+        return version_id, version['functions']
+
+    def _function(self, service, function):
+        name, qualifier = _split_qualifier(service)
+        record = self._service(name)
+        _, functions = self._resolve(record, qualifier)
+        attrs = functions.get(function)
+        if attrs is None:
+            raise _ApiError(404, 'FunctionNotFound', 'Function {0} not found'.format(function))
+        return record, attrs
+
+    # account, services
+
+    def _get_account_settings(self, request):
+        return 200, {'availableAZs': []}, {}
+
+    def _create_service(self, request):
+        data = request.json()
+        name = data.get('serviceName')
+        if not name:
+            raise _ApiError(400, 'InvalidArgument', 'serviceName is required')
+        with self._lock:
+            if name in self._services:
+                raise _ApiError(409, 'ServiceAlreadyExists', 'Service {0} already exists'.format(name))
+            now = _now()
+            attrs = {'serviceName': name, 'serviceId': str(uuid.uuid4()), 'description': '', 'role': '',
+                     'logConfig': {'project': '', 'logstore': ''}, 'internetAccess': True,
+                     'createdTime': now, 'lastModifiedTime': now}
+            self._update(attrs, data)
+            self._services[name] = {'attrs': attrs, 'functions': {}, 'triggers': {}, 'versions': {},
+                                    'aliases': {}, 'lastVersion': 0, 'tags': {}}
+            return self._resource(attrs)
+
+    def _list_services(self, request):
+        tags = dict((k[4:], v[0]) for k, v in request.query.items() if k.startswith('tag_'))
+        with self._lock:
+            items = [dict(record['attrs']) for record in self._services.values()
+                     if all(record['tags'].get(k) == v for k, v in tags.items())]
+        return self._page(request, items, 'services', 'serviceName')
+
+    def _get_service(self, request, service):
+        name, qualifier = _split_qualifier(service)
+        with self._lock:
+            record = self._service(name)
+            self._resolve(record, qualifier)
+            return self._resource(dict(record['attrs']))
+
+    def _update_service(self, request, service):
+        data = request.json()
+        with self._lock:
+            attrs = self._service(service)['attrs']
+            self._check_etag(request, attrs)
+            self._update(attrs, data, ('serviceName', 'serviceId', 'createdTime'))
+            return self._resource(dict(attrs))
+
+    def _delete_service(self, request, service):
+        with self._lock:
+            record = self._service(service)
+            self._check_etag(request, record['attrs'])
+            if record['functions']:
+                raise _ApiError(400, 'ServiceNotEmpty', 'Service {0} has functions'.format(service))
+            del self._services[service]
+        return 204, None, {}
+
+    # functions
+
+    @staticmethod
+    def _code(data):
+        """ The code attributes of a function, from the code of a create or update request. """
+        code = data.get('code') or {}
+        if 'zipFile' in code:
+            try:
+                package = base64.b64decode(code['zipFile'])
+            except (TypeError, ValueError):
+                raise _ApiError(400, 'InvalidArgument', 'code.zipFile is not base64 encoded')
+            return {'codeSize': len(package), 'codeChecksum': str(util.crc64(package))}
+        if code.get('ossBucketName') and code.get('ossObjectName'):
+            return {'codeSize': 0, 'codeChecksum': ''}
+        return None
+
+    def _create_function(self, request, service):
+        data = request.json()
+        name = data.get('functionName')
+        if not name:
+            raise _ApiError(400, 'InvalidArgument', 'functionName is required')
+        code = self._code(data)
+        if code is None and not data.get('customContainerConfig'):
+            raise _ApiError(400, 'InvalidArgument', 'code is required')
+        with self._lock:
+            record = self._service(service)
+            if name in record['functions']:
+                raise _ApiError(409, 'FunctionAlreadyExists', 'Function {0} already exists'.format(name))
+            now = _now()
+            attrs = {'functionName': name, 'functionId': str(uuid.uuid4()), 'description': '',
+                     'memorySize': 128, 'timeout': 60, 'codeSize': 0, 'codeChecksum': '',
+                     'environmentVariables': {}, 'createdTime': now, 'lastModifiedTime': now}
+            self._update(attrs, data, ('code',))
+            attrs.update(code or {})
+            record['functions'][name] = attrs
+            record['triggers'][name] = {}
+            return self._resource(dict(attrs))
+
+    def _list_functions(self, request, service):
+        name, qualifier = _split_qualifier(service)
+        with self._lock:
+            _, functions = self._resolve(self._service(name), qualifier)
+            items = [dict(attrs) for attrs in functions.values()]
+        return self._page(request, items, 'functions', 'functionName')
+
+    def _get_function(self, request, service, function):
+        with self._lock:
+            _, attrs = self._function(service, function)
+            return self._resource(dict(attrs))
+
+    def _update_function(self, request, service, function):
+        data = request.json()
+        code = self._code(data)
+        with self._lock:
+            record = self._service(service)
+            attrs = record['functions'].get(function)
+            if attrs is None:
+                raise _ApiError(404, 'FunctionNotFound', 'Function {0} not found'.format(function))
+            self._check_etag(request, attrs)
+            self._update(attrs, data, ('code', 'functionName', 'functionId', 'createdTime'))
+            attrs.update(code or {})
+            return self._resource(dict(attrs))
+
+    def _delete_function(self, request, service, function):
+        with self._lock:
+            record = self._service(service)
+            attrs = record['functions'].get(function)
+            if attrs is None:
+                raise _ApiError(404, 'FunctionNotFound', 'Function {0} not found'.format(function))
+            self._check_etag(request, attrs)
+            if record['triggers'][function]:
+                raise _ApiError(400, 'FunctionNotEmpty', 'Function {0} has triggers'.format(function))
+            del record['functions'][function]
+            del record['triggers'][function]
+        return 204, None, {}
+
+    def _get_function_code(self, request, service, function):
+        with self._lock:
+            _, attrs = self._function(service, function)
+            return 200, {'checksum': attrs['codeChecksum'], 'url': ''}, {}
+
+    # invocations
+
+    def _invoke_function(self, request, service, function):
+        return self._execute(request, service, function,
+                             request.headers.get('x-fc-invocation-type', '').lower() == 'async')
+
+    def _do_http_request(self, request, service, function, path='/'):
+        return self._execute(request, service, function, False)
+
+    def _execute(self, request, service, function, asynchronous):
+        name, qualifier = _split_qualifier(service)
+        with self._lock:
+            record = self._service(name)
+            version_id, functions = self._resolve(record, qualifier)
+            if function not in functions:
+                raise _ApiError(404, 'FunctionNotFound', 'Function {0} not found'.format(function))
+            handler = self._handlers.get((name, function), self.handler)
+            fault = self._faults.get((name, function), self.fault)
+
+        headers = {'x-fc-invocation-service-version': version_id}
+        if asynchronous:
+            return 202, None, headers
+        context = {'serviceName': name, 'qualifier': qualifier, 'versionId': version_id, 'functionName': function,
+                   'requestId': request.request_id, 'headers': request.headers}
+        start = time.time()
+        if fault is not None:
+            fault._enter()
+        try:
+            if fault is not None:
+                delay = fault._execution_time()
+                if delay > 0:
+                    time.sleep(delay)
+                if fault._function_error():
+                    raise RuntimeError('Injected function error')
+            output = handler(request.body, context)
+        except Exception as e:
+            headers['x-fc-error-type'] = 'UnhandledInvocationError'
+            output = {'errorMessage': str(e), 'errorType': type(e).__name__}
+        finally:
+            if fault is not None:
+                fault._exit()
+        headers['x-fc-invocation-duration'] = str(int((time.time() - start) * 1000))
+        if not isinstance(output, (dict, list)):
+            headers['Content-Type'] = 'application/octet-stream'
+        return 200, output, headers
+
+    # triggers
+
+    def _triggers(self, service, function):
+        record = self._service(service)
+        triggers = record['triggers'].get(function)
+        if triggers is None:
+            raise _ApiError(404, 'FunctionNotFound', 'Function {0} not found'.format(function))
+        return triggers
+
+    def _trigger(self, service, function, trigger):
+        attrs = self._triggers(service, function).get(trigger)
+        if attrs is None:
+            raise _ApiError(404, 'TriggerNotFound', 'Trigger {0} not found'.format(trigger))
+        return attrs
+
+    def _create_trigger(self, request, service, function):
+        data = request.json()
+        name = data.get('triggerName')
+        if not name or not data.get('triggerType'):
+            raise _ApiError(400, 'InvalidArgument', 'triggerName and triggerType are required')
+        with self._lock:
+            triggers = self._triggers(service, function)
+            if name in triggers:
+                raise _ApiError(409, 'TriggerAlreadyExists', 'Trigger {0} already exists'.format(name))
+            now = _now()
+            attrs = {'triggerId': str(uuid.uuid4()), 'description': '', 'qualifier': '',
+                     'createdTime': now, 'lastModifiedTime': now}
+            self._update(attrs, data)
+            triggers[name] = attrs
+            return self._resource(dict(attrs))
+
+    def _list_triggers(self, request, service, function):
+        with self._lock:
+            items = [dict(attrs) for attrs in self._triggers(service, function).values()]
+        return self._page(request, items, 'triggers', 'triggerName')
+
+    def _get_trigger(self, request, service, function, trigger):
+        with self._lock:
+            return self._resource(dict(self._trigger(service, function, trigger)))
+
+    def _update_trigger(self, request, service, function, trigger):
+        data = request.json()
+        with self._lock:
+            attrs = self._trigger(service, function, trigger)
+            self._check_etag(request, attrs)
+            self._update(attrs, data, ('triggerName', 'triggerType', 'triggerId', 'sourceArn', 'createdTime'))
+            return self._resource(dict(attrs))
+
+    def _delete_trigger(self, request, service, function, trigger):
+        with self._lock:
+            attrs = self._trigger(service, function, trigger)
+            self._check_etag(request, attrs)
+            del self._triggers(service, function)[trigger]
+        return 204, None, {}
+
+    # versions and aliases
+
+    def _publish_version(self, request, service):
+        data = request.json()
+        with self._lock:
+            record = self._service(service)
+            record['lastVersion'] += 1
+            now = _now()
+            attrs = {'versionId': str(record['lastVersion']), 'description': data.get('description', ''),
+                     'createdTime': now, 'lastModifiedTime': now}
+            functions = dict((name, dict(fn)) for name, fn in record['functions'].items())
+            record['versions'][attrs['versionId']] = {'attrs': attrs, 'functions': functions}
+            return self._resource(dict(attrs))
+
+    def _list_versions(self, request, service):
+        limit = max(1, min(100, int(request.param('limit') or 20)))
+        forward = request.param('direction', 'BACKWARD').upper() == 'FORWARD'
+        start = request.param('nextToken') or request.param('startKey')
+        with self._lock:
+            versions = sorted((v['attrs'] for v in self._service(service)['versions'].values()),
+                              key=lambda attrs: int(attrs['versionId']), reverse=not forward)
+            if start:
+                start = int(start)
+                versions = [v for v in versions if (int(v['versionId']) >= start if forward else
+                                                    int(v['versionId']) <= start)]
+            data = {'versions': [dict(v) for v in versions[:limit]], 'direction': 'FORWARD' if forward else 'BACKWARD'}
+        if len(versions) > limit:
+            data['nextToken'] = versions[limit]['versionId']
+        return 200, data, {}
+
+    def _delete_version(self, request, service, version):
+        with self._lock:
+            record = self._service(service)
+            if version not in record['versions']:
+                raise _ApiError(404, 'VersionNotFound', 'Version {0} not found'.format(version))
+            if any(alias['versionId'] == version for alias in record['aliases'].values()):
+                raise _ApiError(400, 'VersionInUse', 'Version {0} is used by an alias'.format(version))
+            del record['versions'][version]
+        return 204, None, {}
+
+    def _check_versions(self, record, data):
+        versions = [data.get('versionId')] + list((data.get('additionalVersionWeight') or {}).keys())
+        for version_id in versions:
+            if version_id is not None and str(version_id) not in record['versions']:
+                raise _ApiError(404, 'VersionNotFound', 'Version {0} not found'.format(version_id))
+
+    def _alias(self, record, alias):
+        attrs = record['aliases'].get(alias)
+        if attrs is None:
+            raise _ApiError(404, 'AliasNotFound', 'Alias {0} not found'.format(alias))
+        return attrs
+
+    def _create_alias(self, request, service):
+        data = request.json()
+        name = data.get('aliasName')
+        if not name or not data.get('versionId'):
+            raise _ApiError(400, 'InvalidArgument', 'aliasName and versionId are required')
+        with self._lock:
+            record = self._service(service)
+            if name in record['aliases']:
+                raise _ApiError(409, 'AliasAlreadyExists', 'Alias {0} already exists'.format(name))
+            self._check_versions(record, data)
+            now = _now()
+            attrs = {'description': '', 'additionalVersionWeight': {}, 'createdTime': now, 'lastModifiedTime': now}
+            self._update(attrs, data)
+            record['aliases'][name] = attrs
+            return self._resource(dict(attrs))
+
+    def _list_aliases(self, request, service):
+        with self._lock:
+            items = [dict(attrs) for attrs in self._service(service)['aliases'].values()]
+        return self._page(request, items, 'aliases', 'aliasName')
+
+    def _get_alias(self, request, service, alias):
+        with self._lock:
+            return self._resource(dict(self._alias(self._service(service), alias)))
+
+    def _update_alias(self, request, service, alias):
+        data = request.json()
+        with self._lock:
+            record = self._service(service)
+            attrs = self._alias(record, alias)
+            self._check_etag(request, attrs)
+            self._check_versions(record, data)
+            self._update(attrs, data, ('aliasName', 'createdTime'))
+            return self._resource(dict(attrs))
+
+    def _delete_alias(self, request, service, alias):
+        with self._lock:
+            record = self._service(service)
+            self._check_etag(request, self._alias(record, alias))
+            del record['aliases'][alias]
+        return 204, None, {}
+
+    # custom domains
+
+    def _domain(self, domain):
+        attrs = self._domains.get(domain)
+        if attrs is None:
+            raise _ApiError(404, 'DomainNameNotFound', 'Domain {0} not found'.format(domain))
+        return attrs
+
+    def _create_custom_domain(self, request):
+        data = request.json()
+        name = data.get('domainName')
+        if not name:
+            raise _ApiError(400, 'InvalidArgument', 'domainName is required')
+        with self._lock:
+            if name in self._domains:
+                raise _ApiError(409, 'DomainNameAlreadyExists', 'Domain {0} already exists'.format(name))
+            now = _now()
+            attrs = {'accountId': self.account_id, 'apiVersion': API_VERSION, 'protocol': 'HTTP',
+                     'routeConfig': {'routes': []}, 'createdTime': now, 'lastModifiedTime': now}
+            self._update(attrs, data)
+            self._domains[name] = attrs
+            return self._resource(dict(attrs))
+
+    def _list_custom_domains(self, request):
+        with self._lock:
+            items = [dict(attrs) for attrs in self._domains.values()]
+        return self._page(request, items, 'customDomains', 'domainName')
+
+    def _get_custom_domain(self, request, domain):
+        with self._lock:
+            return self._resource(dict(self._domain(domain)))
+
+    def _update_custom_domain(self, request, domain):
+        data = request.json()
+        with self._lock:
+            attrs = self._domain(domain)
+            self._check_etag(request, attrs)
+            self._update(attrs, data, ('domainName', 'accountId', 'createdTime'))
+            return self._resource(dict(attrs))
+
+    def _delete_custom_domain(self, request, domain):
+        with self._lock:
+            self._check_etag(request, self._domain(domain))
+            del self._domains[domain]
+        return 204, None, {}
+
+    # tags, only services can be tagged.
+
+    def _tagged_service(self, arn):
+        if not arn or 'services/' not in arn:
+            raise _ApiError(400, 'InvalidArgument', 'Invalid resourceArn {0}'.format(arn))
+        return self._service(arn.rsplit('services/', 1)[1].strip('/'))
+
+    def _tag_resource(self, request):
+        data = request.json()
+        with self._lock:
+            self._tagged_service(data.get('resourceArn'))['tags'].update(data.get('tags') or {})
+        return 200, {'requestId': request.request_id}, {}
+
+    def _untag_resource(self, request):
+        data = request.json()
+        with self._lock:
+            tags = self._tagged_service(data.get('resourceArn'))['tags']
+            if data.get('tagKeys'):
+                for key in data['tagKeys']:
+                    tags.pop(key, None)
+            elif data.get('all'):
+                tags.clear()
+        return 200, {'requestId': request.request_id}, {}
+
+    def _get_resource_tags(self, request):
+        arn = request.param('resourceArn')
+        with self._lock:
+            tags = dict(self._tagged_service(arn)['tags'])
+        return 200, {'requestId': request.request_id, 'resourceArn': arn, 'tags': tags}, {}
+
+    def _list_reserved_capacities(self, request):
+        return self._page(request, [], 'reservedCapacities', 'instanceId')
+
+    # function configs
+
+    def _config_target(self, service, function):
+        """ :return: (serviceName, qualifier, functionName) of a function config, the function must exist. """
+        name, qualifier = _split_qualifier(service)
+        self._function(service, function)
+        return name, qualifier or 'LATEST', function
+
+    def _put_on_demand_config(self, request, service, function):
+        data = request.json()
+        with self._lock:
+            name, qualifier, function = self._config_target(service, function)
+            resource = 'services/{0}.{1}/functions/{2}'.format(name, qualifier, function)
+            config = {'resource': resource, 'maximumInstanceCount': data.get('maximumInstanceCount')}
+            self._on_demand_configs[resource] = config
+            return self._resource(dict(config))
+
+    def _on_demand_config(self, service, function):
+        name, qualifier = _split_qualifier(service)
+        resource = 'services/{0}.{1}/functions/{2}'.format(name, qualifier or 'LATEST', function)
+        config = self._on_demand_configs.get(resource)
+        if config is None:
+            raise _ApiError(404, 'OnDemandConfigNotFound', 'No on-demand config for {0}'.format(resource))
+        return resource, config
+
+    def _get_on_demand_config(self, request, service, function):
+        with self._lock:
+            return self._resource(dict(self._on_demand_config(service, function)[1]))
+
+    def _delete_on_demand_config(self, request, service, function):
+        with self._lock:
+            resource, _ = self._on_demand_config(service, function)
+            del self._on_demand_configs[resource]
+        return 204, None, {}
+
+    def _list_on_demand_config(self, request):
+        with self._lock:
+            items = [dict(config) for config in self._on_demand_configs.values()]
+        return self._page(request, items, 'configs', 'resource', 100)
+
+    def _provision_resource(self, name, qualifier, function):
+        return '{0}#{1}#{2}#{3}'.format(self.account_id, name, qualifier, function)
+
+    def _put_provision_config(self, request, service, function):
+        data = request.json()
+        target = data.get('target')
+        if not isinstance(target, int) or target < 0:
+            raise _ApiError(400, 'InvalidArgument', 'target must be a non negative integer')
+        with self._lock:
+            name, qualifier, function = self._config_target(service, function)
+            resource = self._provision_resource(name, qualifier, function)
+            config = {'resource': resource, 'target': target, 'current': target}
+            self._provision_configs[(name, qualifier, function)] = config
+            return self._resource(dict(config))
+
+    def _get_provision_config(self, request, service, function):
+        with self._lock:
+            key = self._config_target(service, function)
+            config = self._provision_configs.get(key) or \
+                {'resource': self._provision_resource(*key), 'target': 0, 'current': 0}
+            return self._resource(dict(config))
+
+    def _list_provision_configs(self, request):
+        name = request.param('serviceName')
+        qualifier = request.param('qualifier')
+        with self._lock:
+            items = [dict(config) for key, config in self._provision_configs.items()
+                     if (not name or key[0] == name) and (not qualifier or key[1] == qualifier)]
+        return self._page(request, items, 'provisionConfigs', 'resource')
+
+    def _put_function_async_invoke_config(self, request, service, function):
+        data = request.json()
+        with self._lock:
+            key = self._config_target(service, function)
+            config = self._async_configs.get(key)
+            if config is None:
+                config = {'service': key[0], 'qualifier': key[1], 'function': key[2], 'createdTime': _now()}
+                self._async_configs[key] = config
+            self._update(config, data, ('service', 'qualifier', 'function', 'createdTime'))
+            return self._resource(dict(config))
+
+    def _async_config(self, service, function):
+        name, qualifier = _split_qualifier(service)
+        key = (name, qualifier or 'LATEST', function)
+        config = self._async_configs.get(key)
+        if config is None:
+            raise _ApiError(404, 'AsyncConfigNotExists', 'No async invoke config for {0}'.format(key))
+        return key, config
+
+    def _get_function_async_invoke_config(self, request, service, function):
+        with self._lock:
+            return self._resource(dict(self._async_config(service, function)[1]))
+
+    def _delete_function_async_invoke_config(self, request, service, function):
+        with self._lock:
+            key, _ = self._async_config(service, function)
+            del self._async_configs[key]
+        return 204, None, {}
+
+    def _list_function_async_invoke_configs(self, request, service, function):
+        with self._lock:
+            items = [dict(config) for key, config in self._async_configs.items()
+                     if key[0] == service and key[2] == function]
+        return self._page(request, items, 'configs', 'qualifier')
+
+    def _list_instances(self, request, service, function):
+        with self._lock:
+            self._function(service, function)
+        return 200, {'instances': []}, {}
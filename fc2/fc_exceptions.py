@@ -9,4 +9,11 @@ class FcError(Exception):
         self.request_id = request_id
 
 def get_fc_error(message, status, err_code = '', request_id = ''):
-    return FcError(message, status, err_code, request_id)
\ No newline at end of file
+    return FcError(message, status, err_code, request_id)
+
+# error codes of the requests rejected because a limit of the account or of a function was reached.
+THROTTLING_ERROR_CODES = frozenset(['ResourceThrottled', 'ResourceExhausted', 'Throttling', 'ThrottlingException'])
+
+def is_throttling_error(status_code, err_code='', throttling_codes=THROTTLING_ERROR_CODES):
+    """ Whether a request failed because it was throttled, it was not executed and can be retried. """
+    return status_code == 429 or err_code in throttling_codes
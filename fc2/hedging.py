@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import math
+import threading
+
+from .retry import RetryBudget
+
+
+def can_hedge(headers, payload):
+    """
+    Whether an invocation can be sent twice: only the synchronous invocations with an in-memory
+    payload (bytes-like or str), a file-like or iterable payload can only be read once.
+    """
+    if payload is not None and not isinstance(payload, str):
+        try:
+            memoryview(payload)
+        except TypeError:
+            return False
+    for key, value in (headers or {}).items():
+        if key.lower() == 'x-fc-invocation-type' and str(value).lower() == 'async':
+            return False
+    return True
+
+
+class HedgingPolicy(object):
+    """
+    Hedging of the synchronous invocations of idempotent functions, used by
+    ``invoke_function(..., hedge=True)`` when given to ``fc2.Client(hedgingPolicy=...)``.
+
+    When an invocation has not completed after the `percentile` latency of the recent invocations of
+    the same function, a second identical request is sent over another pooled connection and the
+    response of the first one to complete successfully is returned. Until minSamples latencies were
+    recorded for the function, the fixed `delay` is used, or the invocation is not hedged when delay
+    is None. The hedges are bounded by a RetryBudget: every invocation adds `ratio` token to it and
+    every hedge takes one.
+
+    Only hedge the functions which can safely be executed twice for the same input.
+
+    :param delay: (optional, number) the hedging delay in second until enough latencies are known,
+        or always when percentile is None, default None.
+    :param percentile: (optional, number) the percentile of the recent latencies used as the hedging
+        delay, default 95.
+    :param minSamples: (optional, integer) min number of latencies of a function to use the percentile,
+        default 20.
+    :param sampleSize: (optional, integer) the number of recent latencies kept per function, default 200.
+    :param minDelay: (optional, number) lower bound of the hedging delay in second, default 0.01.
+    :param maxDelay: (optional, number) upper bound of the hedging delay in second, default None.
+    :param budget: (optional, RetryBudget) budget of the hedges shared by all the clients using the policy,
+        default RetryBudget(ratio=0.05, rate=1, capacity=10), None disables the cap.
+    """
+
+    def __init__(self, delay=None, percentile=95, minSamples=20, sampleSize=200, minDelay=0.01, maxDelay=None,
+                 budget=RetryBudget):
+        if delay is None and percentile is None:
+            raise ValueError('delay or percentile must be specified')
+        if percentile is not None and not 0 < percentile < 100:
+            raise ValueError('percentile must be between 0 and 100')
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = minSamples
+        self.sample_size = sampleSize
+        self.min_delay = minDelay
+        self.max_delay = maxDelay
+        self.budget = RetryBudget(ratio=0.05, rate=1, capacity=10) if budget is RetryBudget else budget
+        # key -> [recent latencies, cached percentile, latencies recorded since it was computed]
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, key):
+        entry = self._latencies.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._latencies.setdefault(key, [collections.deque(maxlen=self.sample_size), None, 0])
+        return entry
+
+    def on_request(self):
+        """ Called once per hedgeable invocation. """
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def try_hedge(self):
+        """ Take a hedge from the budget, False when the hedge rate is exhausted. """
+        return self.budget is None or self.budget.try_acquire()
+
+    def record(self, key, latency):
+        """ Record the latency of a successful invocation of the function `key`. """
+        entry = self._entry(key)
+        entry[0].append(latency)
+        entry[2] += 1
+
+    def delay_for(self, key):
+        """
+        :return: the hedging delay of the function in second, None when it is not hedged yet.
+        """
+        delay = self.delay
+        if self.percentile is not None:
+            entry = self._entry(key)
+            samples = entry[0]
+            if len(samples) >= self.min_samples:
+                # the percentile is only recomputed once a tenth of the samples are new.
+                if entry[1] is None or entry[2] >= max(1, len(samples) // 10):
+                    ordered = sorted(samples)
+                    entry[1] = ordered[max(0, int(math.ceil(len(ordered) * self.percentile / 100.0)) - 1)]
+                    entry[2] = 0
+                delay = entry[1]
+        if delay is None:
+            return None
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return max(delay, self.min_delay)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# /2016-08-15/services/{service[.qualifier]}/functions/{function}/... or /2016-08-15/proxy/{service}/{function}/...
+_FUNCTION_PATH = re.compile(r'^/[^/]+/(?:services|proxy)/([^/]+)(?:/functions/([^/]+)|/([^/]+))?')
+
+
+class RequestEvent(object):
+    """
+    The state of an API call passed to the hooks of the client, the same event is updated as the call
+    goes through its attempts.
+
+    operation: the name of the client method, like 'invoke_function'.
+    method, path: the http method and the unescaped path of the request.
+    service_name, qualifier, function_name: the function the request is about, None when not applicable.
+    headers: the request headers, the before_sign hooks can still modify them.
+    attempt: the number of the current attempt, starting at 1.
+    hedge: True for the second request of a hedged invocation, and in after_response and on_error
+        when that request completed the call.
+    status: the http status of the last response, None before a response is received.
+    request_id: the x-fc-request-id of the last response.
+    error: the exception of the last failed attempt, or of the failed call in on_error.
+    retry_delay: the delay before the next attempt in second, in on_retry.
+    timings: dict of durations in second
+        'sign':     signing the request
+        'connect':  opening a new connection (DNS, TCP and TLS handshakes), 0 when a pooled connection was reused
+        'ttfb':     from sending the request to receiving the response headers, excluding connect
+        'download': reading the response body, 0 for a streamed response
+        'decode':   decoding the JSON response of a control plane operation
+        'total':    the whole call, set before after_response and on_error
+    context: dict shared by the events of a call, in which the hooks can keep their own state.
+    parent: the event of the call for the event of a request of a hedged invocation, None otherwise.
+
+    The two requests of a hedged invocation run concurrently, each one with its own event forked
+    from the event of the call: before_send and on_retry receive the event of the request, while
+    after_response and on_error are called once with the event of the call.
+    """
+
+    def __init__(self, operation, method, path, headers):
+        self.operation = operation
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.service_name = self.qualifier = self.function_name = None
+        match = _FUNCTION_PATH.match(path)
+        if match is not None:
+            self.service_name, _, qualifier = match.group(1).partition('.')
+            self.qualifier = qualifier or None
+            self.function_name = match.group(2) or match.group(3)
+        self.attempt = 0
+        self.hedge = False
+        self.status = None
+        self.request_id = None
+        self.error = None
+        self.retry_delay = None
+        self.timings = {'sign': 0.0}
+        self.context = {}
+        self.parent = None
+        self.start = time.perf_counter()
+
+    def fork(self, hedge):
+        """ :return: the event of one of the concurrent requests of a hedged call. """
+        event = copy.copy(self)
+        event.timings = dict(self.timings)
+        event.hedge = hedge
+        event.parent = self
+        return event
+
+    def adopt(self, event):
+        """ Take the attempt state of the forked request which completed the call. """
+        self.attempt = event.attempt
+        self.hedge = event.hedge
+        self.status = event.status
+        self.request_id = event.request_id
+        self.error = event.error
+        self.retry_delay = event.retry_delay
+        self.timings.update(event.timings)
+
+    def begin_attempt(self, attempt):
+        self.attempt = attempt
+        self.status = None
+        self.request_id = None
+        self.error = None
+        self.retry_delay = None
+        self.timings.update(connect=0.0, ttfb=0.0, download=0.0, decode=0.0)
+
+    def record_response(self, status, headers, connect, ttfb, download):
+        self.status = status
+        self.request_id = headers.get('X-Fc-Request-Id')
+        self.timings.update(connect=connect, ttfb=max(0.0, ttfb - connect), download=max(0.0, download))
+
+    def finish(self):
+        self.timings['total'] = time.perf_counter() - self.start
+
+
+class RequestHooks(object):
+    """
+    Callbacks observing the API calls of a client, passed to ``fc2.Client(hooks=...)`` as one object
+    or a list. Override the methods you need, they all receive the RequestEvent of the call:
+
+    before_sign:    before the request is signed, once per call.
+    before_send:    before every attempt.
+    on_retry:       after an attempt which is retried, with the status or the error of the attempt.
+    after_response: once the final response is received, whatever its status.
+    on_error:       when the call fails, with the exception about to be raised.
+
+    The hooks run synchronously in the request path, an exception raised by a hook is logged and ignored.
+    """
+
+    def before_sign(self, event):
+        pass
+
+    def before_send(self, event):
+        pass
+
+    def on_retry(self, event):
+        pass
+
+    def after_response(self, event):
+        pass
+
+    def on_error(self, event):
+        pass
+
+
+class EventHeaders(dict):
+    """ The request headers of a call observed by hooks, carrying its RequestEvent down to the transport. """
+    __slots__ = ('event',)
+
+
+def call_hooks(hooks, name, event):
+    for hook in hooks:
+        try:
+            getattr(hook, name)(event)
+        except Exception:
+            logger.exception('%s hook %r failed for %s', name, hook, event.operation)
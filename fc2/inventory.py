@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from . import fc_exceptions
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+InventoryRecord = collections.namedtuple('InventoryRecord', ['kind', 'serviceName', 'functionName', 'data'])
+InventoryRecord.__doc__ = """
+A resource found by :class:`InventoryCrawler`.
+kind is one of 'service', 'function', 'trigger', 'alias' or 'error', data is the resource attributes
+as returned by the list_* API, or (kind, serviceName, functionName, exception) for an 'error' record.
+"""
+
+# a unit of work is one page of a list_* API: (kind, serviceName, functionName, nextToken)
+_Unit = collections.namedtuple('_Unit', ['kind', 'serviceName', 'functionName', 'nextToken'])
+
+
+class InventorySnapshot(object):
+    """
+    The resources of an account collected by :meth:`InventoryCrawler.snapshot`.
+    services: dict, serviceName -> service attributes.
+    functions: dict, (serviceName, functionName) -> function attributes.
+    triggers: dict, (serviceName, functionName, triggerName) -> trigger attributes.
+    aliases: dict, (serviceName, aliasName) -> alias attributes.
+    errors: list of (kind, serviceName, functionName, exception) of the pages which could not be listed.
+    """
+
+    __slots__ = ('services', 'functions', 'triggers', 'aliases', 'errors')
+
+    def __init__(self):
+        self.services = {}
+        self.functions = {}
+        self.triggers = {}
+        self.aliases = {}
+        self.errors = []
+
+    def add(self, record):
+        if record.kind == 'service':
+            self.services[record.serviceName] = record.data
+        elif record.kind == 'function':
+            self.functions[(record.serviceName, record.functionName)] = record.data
+        elif record.kind == 'trigger':
+            self.triggers[(record.serviceName, record.functionName, record.data.get('triggerName'))] = record.data
+        elif record.kind == 'alias':
+            self.aliases[(record.serviceName, record.data.get('aliasName'))] = record.data
+        elif record.kind == 'error':
+            self.errors.append(record.data)
+
+    def counts(self):
+        """
+        :return: dict, the number of resources of every kind.
+        """
+        return {
+            'services': len(self.services),
+            'functions': len(self.functions),
+            'triggers': len(self.triggers),
+            'aliases': len(self.aliases),
+            'errors': len(self.errors),
+        }
+
+    def functions_of(self, serviceName):
+        """
+        :return: list of the function names of the service.
+        """
+        return [f for s, f in self.functions if s == serviceName]
+
+
+class InventoryCrawler(object):
+    """
+    Crawl the services of the account and their functions, triggers and aliases concurrently.
+    Every page of every list_* API is a separate task of a bounded thread pool, so the functions
+    of a service are listed while the next page of services is being fetched, and the resources
+    are streamed as soon as their page arrives.
+    The crawler shares the connection pool of the client, so the poolMaxsize of the client should
+    not be smaller than workers.
+
+    :param client: (required, fc2.Client) the client used to call the list_* APIs.
+    :param workers: (optional, integer) max number of concurrent list requests, default 16.
+    :param rate: (optional, number) max number of list requests per second, default None (no limit).
+    :param pageSize: (optional, integer) the number of resources fetched per request, default 100.
+    :param triggers: (optional, bool) list the triggers of every function, default True.
+    :param aliases: (optional, bool) list the aliases of every service, default True.
+    :param prefix: (optional, string) only crawl the services with the given prefix.
+    """
+
+    def __init__(self, client, workers=16, rate=None, pageSize=100, triggers=True, aliases=True, prefix=None):
+        if workers < 1:
+            raise ValueError('workers must be a positive integer')
+        self.client = client
+        self.workers = workers
+        self.page_size = pageSize
+        self.triggers = triggers
+        self.aliases = aliases
+        self.prefix = prefix
+        self.limiter = TokenBucket(rate) if rate else None
+
+    def _list(self, unit):
+        """ Fetch one page, return (records, units to crawl next). """
+        if self.limiter is not None:
+            self.limiter.acquire()
+        client = self.client
+        records = []
+        units = []
+        if unit.kind == 'services':
+            r = client.list_services(limit=self.page_size, nextToken=unit.nextToken, prefix=self.prefix)
+            for service in r.data.get('services') or []:
+                name = service['serviceName']
+                records.append(InventoryRecord('service', name, None, service))
+                units.append(_Unit('functions', name, None, None))
+                if self.aliases:
+                    units.append(_Unit('aliases', name, None, None))
+        elif unit.kind == 'functions':
+            r = client.list_functions(unit.serviceName, limit=self.page_size, nextToken=unit.nextToken)
+            for function in r.data.get('functions') or []:
+                name = function['functionName']
+                records.append(InventoryRecord('function', unit.serviceName, name, function))
+                if self.triggers:
+                    units.append(_Unit('triggers', unit.serviceName, name, None))
+        elif unit.kind == 'triggers':
+            r = client.list_triggers(unit.serviceName, unit.functionName, limit=self.page_size,
+                                     nextToken=unit.nextToken)
+            for trigger in r.data.get('triggers') or []:
+                records.append(InventoryRecord('trigger', unit.serviceName, unit.functionName, trigger))
+        else:
+            r = client.list_aliases(unit.serviceName, limit=self.page_size, nextToken=unit.nextToken)
+            for alias in r.data.get('aliases') or []:
+                records.append(InventoryRecord('alias', unit.serviceName, None, alias))
+
+        nextToken = r.data.get('nextToken')
+        if nextToken:
+            # the next page is queued before the children of the current one.
+            units.insert(0, unit._replace(nextToken=nextToken))
+        return records, units
+
+    def _safe_list(self, unit):
+        try:
+            return self._list(unit)
+        except (fc_exceptions.FcError, requests.exceptions.RequestException) as e:
+            logger.error('Failed to list the %s of %s: %s', unit.kind, unit.serviceName or 'the account', e)
+            error = (unit.kind, unit.serviceName, unit.functionName, e)
+            return [InventoryRecord('error', unit.serviceName, unit.functionName, error)], []
+
+    def crawl(self):
+        """
+        Crawl the account.
+        :return: generator of InventoryRecord, in the order the pages complete. A page which fails
+                 (FcError or network error) is reported as an 'error' record and does not abort
+                 the crawl.
+        """
+        pending = collections.deque([_Unit('services', None, None, None)])
+        running = set()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    running.add(executor.submit(self._safe_list, pending.popleft()))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    records, units = future.result()
+                    pending.extend(units)
+                    for record in records:
+                        yield record
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def snapshot(self, callback=None):
+        """
+        Crawl the account and collect the resources.
+        :param callback: (optional, callable) called with every InventoryRecord as it arrives.
+        :return: InventorySnapshot
+        """
+        snapshot = InventorySnapshot()
+        for record in self.crawl():
+            if callback is not None:
+                callback(record)
+            snapshot.add(record)
+        return snapshot
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import math
+import threading
+
+from . import fc_exceptions
+from .hooks import RequestHooks
+from .ratelimit import DATA_PLANE_OPERATIONS
+
+# the quantiles exported by prometheus_text().
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class LatencyHistogram(object):
+    """
+    HDR-style histogram of latencies with a bounded relative error and a memory use independent of
+    the number of values.
+
+    The values are recorded in microseconds into log-linear buckets: below 2 ** precision every
+    microsecond has its bucket, above that every power of two range is split into 2 ** (precision - 1)
+    buckets, so a percentile is off by less than 1 / 2 ** (precision - 1) of its value, 0.8% with the
+    default precision of 8. One hour fits in about 3200 buckets.
+
+    :param precision: (optional, integer) the number of significant bits of the recorded values, default 8.
+    """
+
+    def __init__(self, precision=8):
+        if not 2 <= precision <= 16:
+            raise ValueError('precision must be between 2 and 16')
+        self.precision = precision
+        self._half = 1 << (precision - 1)
+        self._counts = []
+        self._count = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+        self._lock = threading.Lock()
+
+    def _index(self, value):
+        shift = value.bit_length() - self.precision
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+
+    def _bounds(self, index):
+        """ :return: the [lower, upper) microseconds range of a bucket. """
+        if index < 2 * self._half:
+            return index, index + 1
+        shift = index // self._half - 1
+        mantissa = index - shift * self._half
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def record(self, seconds):
+        """ Record a latency in second. """
+        index = self._index(max(0, int(seconds * 1000000)))
+        with self._lock:
+            counts = self._counts
+            if index >= len(counts):
+                counts.extend([0] * (index + 1 - len(counts)))
+            counts[index] += 1
+            self._count += 1
+            self._sum += seconds
+            if self._min is None or seconds < self._min:
+                self._min = seconds
+            if self._max is None or seconds > self._max:
+                self._max = seconds
+
+    @property
+    def count(self):
+        return self._count
+
+    def percentiles(self, percentiles):
+        """
+        :param percentiles: iterable of numbers between 0 and 100.
+        :return: list, the latencies in second at the percentiles (nearest rank), None when empty.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            low, high = self._min, self._max
+        if total == 0:
+            return [None for _ in percentiles]
+        results = []
+        for percentile in percentiles:
+            rank = max(1, int(math.ceil(total * percentile / 100.0)))
+            if rank >= total:
+                results.append(high)
+                continue
+            seen = 0
+            for index, count in enumerate(counts):
+                seen += count
+                if seen >= rank:
+                    lower, upper = self._bounds(index)
+                    # the middle of the bucket, within the exact range of the recorded values.
+                    value = (lower + upper) / 2.0 / 1000000
+                    results.append(min(max(value, low), high))
+                    break
+        return results
+
+    def percentile(self, percentile):
+        return self.percentiles([percentile])[0]
+
+    def snapshot(self):
+        """
+        :return: dict, the latencies in second
+        {
+            'count': 100,
+            'sum': 1.5,
+            'min': 0.01,
+            'max': 0.05,
+            'p50': 0.015,
+            'p90': 0.02,
+            'p99': 0.04,
+            'p999': 0.05
+        }
+        """
+        p50, p90, p99, p999 = self.percentiles([50, 90, 99, 99.9])
+        with self._lock:
+            return {'count': self._count, 'sum': self._sum, 'min': self._min, 'max': self._max,
+                    'p50': p50, 'p90': p90, 'p99': p99, 'p999': p999}
+
+
+def _error_code(event):
+    error = event.error
+    if isinstance(error, fc_exceptions.FcError):
+        if error.err_code:
+            return error.err_code
+        # a function error is returned with a successful http status and no ErrorCode.
+        return 'FunctionError' if error.status_code < 400 else 'HTTP{0}'.format(error.status_code)
+    return type(error).__name__
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join('{0}="{1}"'.format(k, _escape('' if v is None else v))
+                          for k, v in sorted(labels.items())) + '}'
+
+
+class MetricsRegistry(RequestHooks):
+    """
+    In-process metrics of the API calls of the clients it is given to with
+    ``fc2.Client(metrics=...)``, it can be shared by several clients:
+
+        - the number of completed calls per operation (the client method name),
+        - the number of failed calls per operation and ErrorCode, the exception class name for the
+          network errors and 'FunctionError' for the unhandled errors of the functions. The calls
+          rejected by the client ('ClientRateLimitExceeded', 'CircuitOpen') are errors as well,
+          but are only counted as calls when one of their attempts was sent,
+        - the number of retries per operation,
+        - the number of calls in flight per operation,
+        - a LatencyHistogram of the calls per operation, and per function for the invocations
+          (invoke_function and do_http_request) keyed by (serviceName, qualifier, functionName).
+
+    The latency of a call covers all its attempts and the delays between them. The histograms are
+    cumulative since the registry was created or reset.
+
+    :param precision: (optional, integer) the precision of the histograms, see LatencyHistogram.
+    """
+
+    def __init__(self, precision=8):
+        self.precision = precision
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = collections.Counter()
+            self._errors = collections.Counter()
+            self._retries = collections.Counter()
+            self._inflight = collections.Counter()
+            self._latency = {}
+            self._function_latency = {}
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = histograms.setdefault(key, LatencyHistogram(self.precision))
+        return histogram
+
+    def _complete(self, event):
+        operation = event.operation
+        with self._lock:
+            self._requests[operation] += 1
+            # the gauge the call entered, which reset() may have replaced since.
+            inflight = event.context.pop(self, None)
+            if inflight is not None:
+                inflight[operation] -= 1
+        latency = event.timings.get('total', 0.0)
+        self._histogram(self._latency, operation).record(latency)
+        if operation in DATA_PLANE_OPERATIONS:
+            key = (event.service_name, event.qualifier, event.function_name)
+            self._histogram(self._function_latency, key).record(latency)
+
+    # hooks
+
+    def before_send(self, event):
+        # a call enters the gauge once, whatever its number of attempts and hedged requests.
+        with self._lock:
+            if self not in event.context:
+                event.context[self] = self._inflight
+                self._inflight[event.operation] += 1
+
+    def on_retry(self, event):
+        with self._lock:
+            self._retries[event.operation] += 1
+
+    def after_response(self, event):
+        self._complete(event)
+
+    def on_error(self, event):
+        with self._lock:
+            self._errors[(event.operation, _error_code(event))] += 1
+        # the calls which received a final response were completed by after_response, the calls
+        # rejected before their first attempt were never in flight.
+        if self in event.context:
+            self._complete(event)
+
+    # export
+
+    def snapshot(self):
+        """
+        :return: dict
+        {
+            'requests': {'invoke_function': 100},
+            'errors': {'invoke_function': {'ResourceThrottled': 2}},
+            'retries': {'invoke_function': 2},
+            'inflight': {'invoke_function': 0},
+            'latency': {'invoke_function': LatencyHistogram.snapshot()},
+            'functionLatency': {(serviceName, qualifier, functionName): LatencyHistogram.snapshot()}
+        }
+        """
+        with self._lock:
+            errors = {}
+            for (operation, code), count in self._errors.items():
+                errors.setdefault(operation, {})[code] = count
+            data = {'requests': dict(self._requests), 'errors': errors, 'retries': dict(self._retries),
+                    'inflight': dict((k, v) for k, v in self._inflight.items() if v or k in self._requests)}
+            latency = list(self._latency.items())
+            function_latency = list(self._function_latency.items())
+        data['latency'] = dict((key, histogram.snapshot()) for key, histogram in latency)
+        data['functionLatency'] = dict((key, histogram.snapshot()) for key, histogram in function_latency)
+        return data
+
+    def prometheus_text(self, prefix='fc2_client'):
+        """
+        The metrics in the Prometheus text exposition format, the latencies are exported as summaries
+        with the QUANTILES quantiles.
+        :param prefix: (optional, string) the prefix of the metric names, default 'fc2_client'.
+        :return: string
+        """
+        with self._lock:
+            requests = sorted(self._requests.items())
+            errors = sorted(self._errors.items())
+            retries = sorted(self._retries.items())
+            inflight = sorted(self._inflight.items())
+            latency = sorted(self._latency.items())
+            function_latency = sorted(self._function_latency.items(), key=lambda item: tuple(
+                '' if k is None else k for k in item[0]))
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append('# HELP {0}_{1} {2}'.format(prefix, name, help_text))
+            lines.append('# TYPE {0}_{1} {2}'.format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                lines.append('{0}_{1}{2}{3} {4}'.format(prefix, name, suffix, labels, repr(float(value))))
+
+        def summary(histograms, label_names):
+            samples = []
+            for key, histogram in histograms:
+                labels = dict(zip(label_names, key if isinstance(key, tuple) else (key,)))
+                snapshot = histogram.snapshot()
+                values = histogram.percentiles([q * 100 for q in QUANTILES])
+                for quantile, value in zip(QUANTILES, values):
+                    samples.append(('', _labels(quantile=quantile, **labels), value or 0.0))
+                samples.append(('_sum', _labels(**labels), snapshot['sum']))
+                samples.append(('_count', _labels(**labels), snapshot['count']))
+            return samples
+
+        metric('requests_total', 'counter', 'Completed API calls.',
+               [('', _labels(operation=op), n) for op, n in requests])
+        metric('errors_total', 'counter', 'Failed API calls by error code.',
+               [('', _labels(operation=op, error_code=code), n) for (op, code), n in errors])
+        metric('retries_total', 'counter', 'Retried attempts of the API calls.',
+               [('', _labels(operation=op), n) for op, n in retries])
+        metric('inflight_requests', 'gauge', 'API calls in flight.',
+               [('', _labels(operation=op), n) for op, n in inflight])
+        metric('request_duration_seconds', 'summary', 'Latency of the API calls, retries included.',
+               summary(latency, ('operation',)))
+        metric('function_duration_seconds', 'summary', 'Latency of the invocations per function.',
+               summary(function_latency, ('service', 'qualifier', 'function')))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+
+from . import fc_exceptions
+
+# the operations sent to the invocation endpoints, every other operation is a control plane API.
+DATA_PLANE_OPERATIONS = frozenset(['invoke_function', 'do_http_request'])
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket rate limiter.
+    Tokens are added continuously at `rate` per second up to `capacity`, each request takes one
+    (or more) token, so the long-term request rate is bounded by `rate` while bursts of up to
+    `capacity` requests are allowed.
+    :param rate: (required, number) the number of tokens added per second.
+    :param capacity: (optional, number) the max number of tokens in the bucket, default max(1, rate).
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError('rate must be a positive number')
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        if self.capacity <= 0:
+            raise ValueError('capacity must be a positive number')
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def delay(self, tokens=1):
+        """
+        :return: the time in second until `tokens` tokens are available, 0 when they already are.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens from the bucket without waiting.
+        :return: bool, True when the tokens were taken.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def release(self, tokens=1):
+        """
+        Put back tokens taken for a request which was not sent, up to the capacity of the bucket.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Take tokens from the bucket, waiting until they are available.
+        :param tokens: (optional, number) the number of tokens to take, default 1.
+        :param timeout: (optional, number) max time to wait in second, default None (no limit).
+        :return: bool, False when the tokens could not be taken within timeout.
+        """
+        if tokens > self.capacity:
+            raise ValueError('cannot acquire more tokens than the capacity of the bucket')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                delay = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                delay = min(delay, deadline - now)
+            time.sleep(delay)
+
+
+class RateLimitExceededError(fc_exceptions.FcError):
+    """
+    Raised instead of sending a request when the rate limiter of the client has no token for it.
+    """
+
+    def __init__(self, operation):
+        message = 'Client rate limit exceeded for {0}'.format(operation)
+        super(RateLimitExceededError, self).__init__(message, 429, 'ClientRateLimitExceeded', '')
+        self.operation = operation
+
+
+class RateLimiter(object):
+    """
+    Client-side rate limits of the requests, per API category and per operation, shared by all the
+    threads (and clients) using the limiter. Pass it to ``fc2.Client(rateLimiter=...)``: every request,
+    retries included, takes a token of its operation and one of its category before being sent.
+
+    The limits are requests per second, or TokenBucket instances to control the bursts or share a
+    bucket between limiters.
+
+    :param controlPlane: (optional, number or TokenBucket) limit of the control plane APIs, every
+        operation but invoke_function and do_http_request, default None (no limit).
+    :param dataPlane: (optional, number or TokenBucket) limit of the invocations, default None (no limit).
+    :param operations: (optional, dict) limit per operation, the name of the client method,
+        like {'tag_resource': 5}, on top of the limit of its category.
+    :param blocking: (optional, bool) wait for a token, default True. Otherwise RateLimitExceededError
+        is raised at once when there is no token.
+    :param timeout: (optional, number) max time to wait for a token in second when blocking, default None
+        (no limit), RateLimitExceededError is raised after it.
+    """
+
+    def __init__(self, controlPlane=None, dataPlane=None, operations=None, blocking=True, timeout=None):
+        self.control_plane = self._bucket(controlPlane)
+        self.data_plane = self._bucket(dataPlane)
+        self.operations = dict((k, self._bucket(v)) for k, v in (operations or {}).items())
+        self.blocking = blocking
+        self.timeout = timeout
+
+    @staticmethod
+    def _bucket(limit):
+        if limit is None or isinstance(limit, TokenBucket):
+            return limit
+        return TokenBucket(limit)
+
+    def buckets(self, operation):
+        """
+        :return: list of the TokenBucket limiting the operation.
+        """
+        category = self.data_plane if operation in DATA_PLANE_OPERATIONS else self.control_plane
+        return [b for b in (self.operations.get(operation), category) if b is not None]
+
+    def try_acquire(self, operation):
+        """
+        Take the tokens of a request without waiting.
+        :return: bool, True when the request can be sent.
+        """
+        taken = []
+        for bucket in self.buckets(operation):
+            if not bucket.try_acquire():
+                self._release(taken)
+                return False
+            taken.append(bucket)
+        return True
+
+    def acquire(self, operation):
+        """
+        Take the tokens of a request, waiting for them according to blocking and timeout.
+        :raise: RateLimitExceededError when the tokens could not be taken.
+        """
+        taken = []
+        for bucket in self.buckets(operation):
+            if self.blocking:
+                acquired = bucket.acquire(timeout=self.timeout)
+            else:
+                acquired = bucket.try_acquire()
+            if not acquired:
+                self._release(taken)
+                raise RateLimitExceededError(operation)
+            taken.append(bucket)
+
+    @staticmethod
+    def _release(buckets):
+        # a request is either sent with all its tokens or takes none of them.
+        for bucket in buckets:
+            bucket.release()
+
+    async def acquire_async(self, operation):
+        """
+        Asynchronous version of acquire().
+        """
+        taken = []
+        try:
+            for bucket in self.buckets(operation):
+                await self._acquire_bucket_async(bucket, operation)
+                taken.append(bucket)
+        except BaseException:
+            # rejected, or cancelled while waiting.
+            self._release(taken)
+            raise
+
+    async def _acquire_bucket_async(self, bucket, operation):
+        if not self.blocking:
+            if not bucket.try_acquire():
+                raise RateLimitExceededError(operation)
+            return
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not bucket.try_acquire():
+            delay = bucket.delay()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RateLimitExceededError(operation)
+                delay = min(delay, remaining)
+            await asyncio.sleep(delay)
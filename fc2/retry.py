@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import email.utils
+import random
+import time
+
+import requests
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import fc_exceptions
+from .ratelimit import TokenBucket
+
+# methods which have the same effect when sent several times.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+
+class RetryBudget(TokenBucket):
+    """
+    Bound the retries of all the clients sharing the budget, so an outage does not multiply
+    the load on the service by the number of attempts.
+    Every request adds `ratio` token to the budget and every retry takes one, on top of a floor of
+    `rate` retries per second, so at most about ratio * requests + rate retries are sent.
+    :param ratio: (optional, number) the retries allowed per request, default 0.1.
+    :param rate: (optional, number) the retries per second always allowed, default 1.
+    :param capacity: (optional, number) the max number of retries saved in the budget, default 100.
+    """
+
+    def __init__(self, ratio=0.1, rate=1, capacity=100):
+        super(RetryBudget, self).__init__(rate, capacity)
+        self.ratio = ratio
+
+    def deposit(self):
+        """ Record a request. """
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+
+def _retry_after(headers):
+    """ The Retry-After header in second, either delay-seconds or an http date. """
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+
+
+def _error_kind(error):
+    """
+    :return: 'connect' when the connection could not be established, so the request was not sent,
+             'transport' for the other network errors, None for the errors which are not retried.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return 'connect'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        # a refused connection or a failed name resolution, wrapped in the MaxRetryError of urllib3.
+        reason = error.args[0] if error.args else None
+        if isinstance(getattr(reason, 'reason', reason), urllib3_exceptions.ConnectTimeoutError):
+            return 'connect'
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return 'transport'
+    if aiohttp is not None:
+        if isinstance(error, aiohttp.ClientConnectorError):
+            return 'connect'
+        if isinstance(error, aiohttp.ClientError):
+            return 'transport'
+    if isinstance(error, asyncio.TimeoutError):
+        return 'transport'
+    return None
+
+
+def _error_code(response):
+    try:
+        return response.json().get('ErrorCode', '')
+    except (ValueError, AttributeError):
+        return response.headers.get('ErrorCode', '')
+
+
+class RetryPolicy(object):
+    """
+    Retry policy of a client, used instead of the fixed urllib3 retries when given to
+    ``fc2.Client(retryPolicy=...)``.
+
+    A failed attempt is retried when:
+        - it was throttled (http 429 or a throttling error code), the request was rejected before
+          being executed so it is retried whatever the operation;
+        - the connection could not be established, for the same reason;
+        - the response status is in retryableStatus, or the connection failed after the request was
+          sent, and the operation is idempotent: GET/HEAD/PUT/DELETE, or in idempotentOperations,
+          or retryNonIdempotent is True.
+    and the operation has attempts left and the retry budget is not exhausted.
+    The delay before a retry is drawn uniformly between 0 and min(maxDelay, baseDelay * 2 ** retry)
+    (full jitter), or follows the Retry-After header of the response.
+
+    :param maxAttempts: (optional, integer) max number of attempts of an operation, default 3.
+    :param operationAttempts: (optional, dict) max number of attempts per operation, the name of
+        the client method, like {'invoke_function': 1}.
+    :param baseDelay: (optional, number) base of the exponential backoff in second, default 0.1.
+    :param maxDelay: (optional, number) max delay between two attempts in second, default 20.
+    :param budget: (optional, RetryBudget) budget shared by all the clients using the policy,
+        default RetryBudget(), None disables the budget.
+    :param retryNonIdempotent: (optional, bool) retry the POST operations as well, default False.
+    :param idempotentOperations: (optional, iterable) operations known to be safe to retry,
+        like 'invoke_function' for a function without side effects.
+    :param retryableStatus: (optional, iterable) http status codes to retry, default (500, 502, 503, 504).
+    :param throttlingCodes: (optional, iterable) error codes of throttled requests,
+        default fc_exceptions.THROTTLING_ERROR_CODES.
+    """
+
+    def __init__(self, maxAttempts=3, operationAttempts=None, baseDelay=0.1, maxDelay=20, budget=RetryBudget,
+                 retryNonIdempotent=False, idempotentOperations=(), retryableStatus=(500, 502, 503, 504),
+                 throttlingCodes=None):
+        if maxAttempts < 1:
+            raise ValueError('maxAttempts must be a positive integer')
+        self.max_attempts = maxAttempts
+        self.operation_attempts = dict(operationAttempts or {})
+        self.base_delay = baseDelay
+        self.max_delay = maxDelay
+        self.budget = RetryBudget() if budget is RetryBudget else budget
+        self.retry_non_idempotent = retryNonIdempotent
+        self.idempotent_operations = frozenset(idempotentOperations)
+        self.retryable_status = frozenset(retryableStatus)
+        self.throttling_codes = frozenset(
+            fc_exceptions.THROTTLING_ERROR_CODES if throttlingCodes is None else throttlingCodes)
+
+    def attempts(self, operation):
+        return self.operation_attempts.get(operation, self.max_attempts)
+
+    def is_idempotent(self, operation, method):
+        return self.retry_non_idempotent or method.upper() in IDEMPOTENT_METHODS \
+            or operation in self.idempotent_operations
+
+    def on_request(self):
+        """ Called once per operation, before its first attempt. """
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def backoff(self, attempt):
+        """ The full-jitter delay before the attempt following `attempt` (1-based). """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def retry_delay(self, operation, method, attempt, response=None, error=None):
+        """
+        Decide whether a failed attempt is retried.
+        :param operation: the name of the operation, the client method.
+        :param method: the http method.
+        :param attempt: the number of the attempt which just completed, starting at 1.
+        :param response: the response of the attempt, when one was received.
+        :param error: the exception raised by the attempt otherwise, requests or aiohttp network errors.
+        :return: the delay before the next attempt in second, None when the attempt is not retried.
+        """
+        if attempt >= self.attempts(operation):
+            return None
+        retry_after = None
+        if response is not None:
+            status = response.status_code
+            if status < 400:
+                return None
+            throttled = fc_exceptions.is_throttling_error(status, _error_code(response), self.throttling_codes)
+            if not throttled and (status not in self.retryable_status or not self.is_idempotent(operation, method)):
+                return None
+            retry_after = _retry_after(response.headers)
+        else:
+            kind = _error_kind(error)
+            if kind is None or (kind == 'transport' and not self.is_idempotent(operation, method)):
+                return None
+
+        if self.budget is not None and not self.budget.try_acquire():
+            return None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self.backoff(attempt)
@@ -1,46 +1,430 @@
 # -*- coding: utf-8 -*-
 
+import base64
+import collections
+import io
+import json
 import os
+import shutil
+import stat
+import struct
+import uuid
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    import crcmod
+except ImportError:
+    crcmod = None
 
-def zip_dir(inputDir, output):
+
+_CRC64_POLY = 0xC96C5795D7870F42
+_CRC64_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def _make_crc64_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ _CRC64_POLY if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC64_TABLE = _make_crc64_table()
+
+
+def _crc64_py(data, crc=0):
+    table = _CRC64_TABLE
+    crc ^= _CRC64_MASK
+    for b in bytearray(data):
+        crc = table[(crc ^ b) & 0xff] ^ (crc >> 8)
+    return crc ^ _CRC64_MASK
+
+
+if crcmod is not None:
+    _crc64 = crcmod.mkCrcFun(0x142F0E1EBA9EA3693, initCrc=0, xorOut=_CRC64_MASK, rev=True)
+else:
+    _crc64 = _crc64_py
+
+
+def crc64(data, crc=0):
     """
-    Zip up a directory and preserve symlinks and empty directories
-    Derived from: https://gist.github.com/kgn/610907
-    : param inputDir: the input directory that need be archived.
-    : param output: the output file-like object to store the archived data.
+    CRC-64/ECMA-182 (the variant used by FC codeChecksum and OSS) of data.
+    Install crcmod for a C implementation, the pure python fallback is much slower.
+    : param data: bytes-like object.
+    : param crc: the crc64 of the preceding data, to compute the checksum incrementally.
+    : return: the checksum as an integer.
     """
-    zipOut = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+    return _crc64(data, crc)
+
+
+def crc64_file(fileobj, blockSize=1024 * 1024):
+    """
+    Compute the crc64 of a binary file object from its current position to its end,
+    then restore the position.
+    : return: the checksum as a decimal string, the format of codeChecksum.
+    """
+    start = fileobj.tell()
+    crc = 0
+    try:
+        for block in iter(lambda: fileobj.read(blockSize), b''):
+            crc = _crc64(block, crc)
+    finally:
+        fileobj.seek(start)
+    return str(crc)
+
 
+def _list_entries(inputDir, sort=False):
+    """
+    Walk inputDir and yield the entries to archive as (kind, fullPath, archiveName) tuples,
+    kind is one of 'dir' (an empty directory), 'link' or 'file'.
+    When sort is True the items of every directory are visited in name order instead of
+    the order of os.listdir, which depends on the file system.
+    """
     rootLen = len(inputDir)
 
-    def _archive_dir(parentDirectory):
+    def _walk(parentDirectory):
         contents = os.listdir(parentDirectory)
+        if sort:
+            contents.sort()
         # store empty directories
         if not contents:
-            # http://www.velocityreviews.com/forums/t318840-add-empty-directory-using-zipfile.html
             archiveRoot = parentDirectory[rootLen:].replace('\\', '/').lstrip('/')
-            zipInfo = zipfile.ZipInfo(archiveRoot + '/')
-            zipOut.writestr(zipInfo, '')
+            yield 'dir', parentDirectory, archiveRoot + '/'
         for item in contents:
             fullPath = os.path.join(parentDirectory, item)
             if os.path.isdir(fullPath) and not os.path.islink(fullPath):
-                _archive_dir(fullPath)
+                for entry in _walk(fullPath):
+                    yield entry
             else:
                 archiveRoot = fullPath[rootLen:].replace('\\', '/').lstrip('/')
                 if os.path.islink(fullPath):
-                    # http://www.mail-archive.com/python-list@python.org/msg34223.html
-                    zipInfo = zipfile.ZipInfo(archiveRoot)
-                    zipInfo.create_system = 3
-                    # long type of hex val of '0xA1ED0000L',
-                    # say, symlink attr magic...
-                    zipInfo.external_attr = 2716663808
-                    zipOut.writestr(zipInfo, os.readlink(fullPath))
+                    yield 'link', fullPath, archiveRoot
                 else:
-                    #print('faint {0} {1} {2}'.format(rootLen, fullPath, archiveRoot))
-                    zipOut.write(fullPath, archiveRoot, zipfile.ZIP_DEFLATED)
+                    yield 'file', fullPath, archiveRoot
+
+    return _walk(inputDir)
+
+
+# the earliest timestamp a zip entry can hold, used by the deterministic mode.
+_DETERMINISTIC_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def _file_info(fullPath, archiveName, deterministic=False):
+    """
+    ZipInfo of a regular file. In deterministic mode the timestamp is fixed and the
+    permissions are normalized to 0644, or 0755 when the file is executable by anyone,
+    so the entry only depends on the content of the file.
+    """
+    if not deterministic:
+        return zipfile.ZipInfo.from_file(fullPath, archiveName)
+    # not ZipInfo.from_file, which rejects the mtimes before 1980 of reproducible build trees.
+    st = os.stat(fullPath)
+    zipInfo = zipfile.ZipInfo(archiveName, _DETERMINISTIC_DATE_TIME)
+    zipInfo.create_system = 3
+    zipInfo.external_attr = (stat.S_IFREG | (0o755 if st.st_mode & 0o111 else 0o644)) << 16
+    zipInfo.file_size = st.st_size
+    return zipInfo
+
+
+def _write_entry(zipOut, kind, fullPath, archiveName, deterministic=False):
+    if kind == 'dir':
+        # http://www.velocityreviews.com/forums/t318840-add-empty-directory-using-zipfile.html
+        zipInfo = zipfile.ZipInfo(archiveName)
+        if deterministic:
+            zipInfo.create_system = 3
+        zipOut.writestr(zipInfo, '')
+    elif kind == 'link':
+        # http://www.mail-archive.com/python-list@python.org/msg34223.html
+        zipInfo = zipfile.ZipInfo(archiveName)
+        zipInfo.create_system = 3
+        # long type of hex val of '0xA1ED0000L',
+        # say, symlink attr magic...
+        zipInfo.external_attr = 2716663808
+        zipOut.writestr(zipInfo, os.readlink(fullPath))
+    elif deterministic:
+        zipInfo = _file_info(fullPath, archiveName, deterministic)
+        zipInfo.compress_type = zipfile.ZIP_DEFLATED
+        with open(fullPath, 'rb') as src, zipOut.open(zipInfo, 'w') as dest:
+            shutil.copyfileobj(src, dest, 1024 * 1024)
+    else:
+        zipOut.write(fullPath, archiveName, zipfile.ZIP_DEFLATED)
+
+
+def _deflate_file(fullPath, blockSize=1024 * 1024):
+    """
+    Compress a file the way zipfile does for ZIP_DEFLATED entries.
+    :return: (compressed data, crc32, uncompressed size)
+    """
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    parts = []
+    crc = 0
+    size = 0
+    with open(fullPath, 'rb') as f:
+        while True:
+            block = f.read(blockSize)
+            if not block:
+                break
+            size += len(block)
+            crc = zlib.crc32(block, crc)
+            parts.append(compressor.compress(block))
+    parts.append(compressor.flush())
+    return b''.join(parts), crc & 0xffffffff, size
+
+
+# the signature of the data descriptors following the entries written to a non-seekable output.
+_DATA_DESCRIPTOR_SIGNATURE = 0x08074b50
+
+# the ZipFile internals _write_deflated appends an entry through, as ZipFile.open(..., 'w') does
+# on Python 3.6 to 3.13.
+_ZIPFILE_INTERNALS = ('fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify', '_writing', '_seekable',
+                      '_allowZip64')
+
+
+def _write_deflated(zipOut, zipInfo, data, crc, size):
+    """
+    Append an entry whose content has already been deflated by _deflate_file, with the bytes
+    ZipFile.open(zipInfo, 'w') writes, a data descriptor included on a non-seekable output.
+    zipfile has no public API for raw deflated data: when its internals are not the expected
+    ones, the data is inflated again and written through ZipFile.open.
+    """
+    zipInfo.compress_type = zipfile.ZIP_DEFLATED
+    zipInfo.file_size = size
+    if not all(hasattr(zipOut, name) for name in _ZIPFILE_INTERNALS):
+        with zipOut.open(zipInfo, 'w') as dest:
+            dest.write(zlib.decompress(data, -15))
+        return
+    if zipOut._writing:
+        raise ValueError("Can't write to the ZIP file while there is another write handle open on it.")
+    zip64 = size * 1.05 > zipfile.ZIP64_LIMIT
+    if zip64 and not zipOut._allowZip64:
+        raise zipfile.LargeZipFile('Filesize would require ZIP64 extensions')
+    zipInfo.compress_size = len(data)
+    zipInfo.CRC = crc
+    zipInfo.flag_bits = 0x00 if zipOut._seekable else 0x08
+    if not zipInfo.external_attr:
+        zipInfo.external_attr = 0o600 << 16
+    if zipOut._seekable:
+        zipOut.fp.seek(zipOut.start_dir)
+    zipInfo.header_offset = zipOut.fp.tell()
+    zipOut._didModify = True
+    zipOut.fp.write(zipInfo.FileHeader(zip64))
+    zipOut.fp.write(data)
+    if not zipOut._seekable:
+        zipOut.fp.write(struct.pack('<LLQQ' if zip64 else '<LLLL', _DATA_DESCRIPTOR_SIGNATURE, crc, len(data), size))
+    zipOut.start_dir = zipOut.fp.tell()
+    zipOut.filelist.append(zipInfo)
+    zipOut.NameToInfo[zipInfo.filename] = zipInfo
 
-    _archive_dir(inputDir)
+
+def zip_dir(inputDir, output, workers=1, deterministic=False):
+    """
+    Zip up a directory and preserve symlinks and empty directories
+    Derived from: https://gist.github.com/kgn/610907
+    : param inputDir: the input directory that need be archived.
+    : param output: the output file-like object to store the archived data.
+    : param workers: number of threads compressing the files, default 1 (serial).
+      zlib releases the GIL while compressing, so workers > 1 spreads the compression
+      over several cores. The entries are written in the same order and with the same
+      content as the serial mode.
+    : param deterministic: produce the same archive bytes for the same tree on any machine,
+      default False. The entries are sorted by name, the timestamps are fixed to 1980-01-01,
+      the permissions are normalized to 0644/0755 and the files are compressed at the default
+      zlib level, so identical trees always have identical checksums.
+    """
+    zipOut = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    entries = _list_entries(inputDir, sort=deterministic)
+    if workers is None or workers <= 1:
+        for entry in entries:
+            _write_entry(zipOut, *entry, deterministic=deterministic)
+    else:
+        _zip_entries_parallel(zipOut, entries, workers, deterministic)
 
     zipOut.close()
+
+
+def _zip_entries_parallel(zipOut, entries, workers, deterministic=False):
+    window = collections.deque()
+
+    def _drain(limit):
+        while len(window) > limit:
+            kind, fullPath, archiveName, future = window.popleft()
+            if future is None:
+                _write_entry(zipOut, kind, fullPath, archiveName, deterministic)
+            else:
+                data, crc, size = future.result()
+                zipInfo = _file_info(fullPath, archiveName, deterministic)
+                _write_deflated(zipOut, zipInfo, data, crc, size)
+
+    # bound the compressed data held in memory while keeping the entries in order.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for kind, fullPath, archiveName in entries:
+            future = executor.submit(_deflate_file, fullPath) if kind == 'file' else None
+            window.append((kind, fullPath, archiveName, future))
+            _drain(workers * 4)
+        _drain(0)
+
+
+class ZipFileJsonStream(io.RawIOBase):
+    """
+    A read-only file-like request body holding ``json.dumps(payload)``, where
+    payload['code']['zipFile'] is an open binary file object that is sent base64-encoded.
+    The base64 text is produced chunk by chunk while the body is read, so memory use
+    does not depend on the size of the code package, and the total length is known upfront.
+    The stream owns the zip file object and closes it when closed.
+    : param payload: the request payload dict.
+    : param chunkSize: size of the zip file chunks encoded at a time, rounded to a multiple of 3.
+    """
+
+    def __init__(self, payload, zipFile=None, chunkSize=3 * 64 * 1024):
+        super(ZipFileJsonStream, self).__init__()
+        code = dict(payload['code'])
+        self._zipFile = code['zipFile'] if zipFile is None else zipFile
+        # render the json around a unique placeholder, then cut it out.
+        placeholder = '__fc_zip_file_{0}__'.format(uuid.uuid4().hex)
+        code['zipFile'] = placeholder
+        payload = dict(payload, code=code)
+        self._prefix, self._suffix = \
+            json.dumps(payload).encode('utf-8').split(placeholder.encode('utf-8'), 1)
+        self._chunkSize = max(3, chunkSize - chunkSize % 3)
+
+        self._start = self._zipFile.tell()
+        self._zipFile.seek(0, os.SEEK_END)
+        zipSize = self._zipFile.tell() - self._start
+        self._length = len(self._prefix) + 4 * ((zipSize + 2) // 3) + len(self._suffix)
+        self._rewind()
+
+    def _rewind(self):
+        self._zipFile.seek(self._start)
+        self._buffer = self._prefix
+        self._offset = 0
+        self._position = 0
+        self._stage = 0
+
+    def _fill(self):
+        """ Load the next piece of the body into the buffer, return False at the end. """
+        while self._stage < 2:
+            chunk = self._zipFile.read(self._chunkSize)
+            if chunk:
+                self._stage = 1
+                self._buffer = base64.b64encode(chunk)
+                self._offset = 0
+                return True
+            self._stage = 2
+            self._buffer = self._suffix
+            self._offset = 0
+            return True
+        return False
+
+    def __len__(self):
+        return self._length
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        view = memoryview(b).cast('B')
+        n = 0
+        while n < len(view):
+            if self._offset >= len(self._buffer) and not self._fill():
+                break
+            size = min(len(self._buffer) - self._offset, len(view) - n)
+            view[n:n + size] = self._buffer[self._offset:self._offset + size]
+            self._offset += size
+            n += size
+        self._position += n
+        return n
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # only rewinding is supported, which is what http clients need to retry a request.
+        if offset != 0 or whence != os.SEEK_SET:
+            raise io.UnsupportedOperation('ZipFileJsonStream can only be rewound')
+        self._rewind()
+        return 0
+
+    def close(self):
+        if not self.closed:
+            self._zipFile.close()
+        super(ZipFileJsonStream, self).close()
+
+
+class SizedIterator(object):
+    """
+    An iterable of bytes chunks whose total length is known, used as the payload of
+    :meth:`fc2.Client.invoke_function` to stream it with a content-length instead of the
+    chunked transfer encoding.
+    : param iterable: the chunks of the payload.
+    : param length: the total length of the chunks in bytes.
+    """
+
+    def __init__(self, iterable, length):
+        self._iterable = iterable
+        self._length = length
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def __len__(self):
+        return self._length
+
+
+def _stream_length(f):
+    """ The number of bytes left in a file-like object, None when it cannot be known. """
+    try:
+        return os.fstat(f.fileno()).st_size - f.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    try:
+        if f.seekable():
+            position = f.tell()
+            end = f.seek(0, os.SEEK_END)
+            f.seek(position)
+            return end - position
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    return None
+
+
+def prepare_payload(payload):
+    """
+    Prepare an invocation payload to be sent without copying it.
+    bytes-like objects (bytearray, memoryview, mmap.mmap...) are sent whole from a flat byte view of
+    their buffer, file-like objects are read by chunks from their current position, other iterables of
+    bytes are sent chunk by chunk.
+    :return: (body, length), length is None when the size of the payload is unknown, the body is then
+             sent with the chunked transfer encoding.
+    """
+    if payload is None:
+        return None, 0
+    if isinstance(payload, bytes):
+        return payload, len(payload)
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+        return payload, len(payload)
+    try:
+        view = memoryview(payload)
+    except TypeError:
+        pass
+    else:
+        if not view.contiguous:
+            raise ValueError('the payload must be a contiguous buffer')
+        if view.ndim != 1 or view.format != 'B':
+            # the length of the view must be its size in bytes.
+            view = view.cast('B')
+        return view, view.nbytes
+    if hasattr(payload, 'read'):
+        return payload, _stream_length(payload)
+    if isinstance(payload, SizedIterator):
+        return payload, len(payload)
+    try:
+        return iter(payload), None
+    except TypeError:
+        raise TypeError('bytes, bytes-like object, file-like object or iterable of bytes required for payload, '
+                        'got {0}'.format(type(payload).__name__))
@@ -30,6 +30,10 @@ setup(
     install_requires=['requests>=2.20.0',
                       'websocket-client>=1.4.1'
                       ],
+    extras_require={
+        'async': ['aiohttp>=3.6.0'],
+        'crc': ['crcmod>=1.7'],
+    },
     include_package_data=True,
     url='https://www.aliyun.com/product/fc',
     classifiers=[
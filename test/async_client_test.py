@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import json
+import threading
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from stub_server import StubHandler, StubServer, run_async
+
+_JSON = {'Content-Type': 'application/json'}
+
+
+class _Handler(StubHandler):
+    def do_GET(self):
+        self.server.authorizations.append(self.headers['authorization'])
+        if self.path.startswith('/2016-08-15/services/missing'):
+            body = json.dumps({'ErrorCode': 'ServiceNotFound', 'ErrorMessage': 'not found'})
+            self.reply(404, body.encode('utf-8'), dict(_JSON, **{'X-Fc-Request-Id': 'rid'}))
+            return
+        self.reply(200, json.dumps({'path': self.path}).encode('utf-8'), _JSON)
+
+    def do_POST(self):
+        self.reply(200, self.read_body(), _JSON)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, authorizations=[])
+        self.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _run(self, coro_fn):
+        async def main():
+            async with fc2.AsyncClient(endpoint=self.endpoint, accessKeyID='id',
+                                       accessKeySecret='secret') as client:
+                return await coro_fn(client)
+        return run_async(main())
+
+    def test_get(self):
+        r = self._run(lambda c: c.list_functions('svc', limit=10, qualifier='prod'))
+        self.assertEqual(r.data['path'], '/2016-08-15/services/svc.prod/functions?limit=10')
+        self.assertTrue(self.server.authorizations[0].startswith('FC id:'))
+
+    def test_invoke(self):
+        r = self._run(lambda c: c.invoke_function('svc', 'func', payload=b'hello'))
+        self.assertEqual(r.data, b'hello')
+
+    def test_invoke_many(self):
+        async def invoke_many(client):
+            results = []
+            async for r in client.invoke_many('svc', 'func', [b'a', b'b', b'c'], concurrency=2, ordered=True):
+                results.append(r)
+            return results
+        results = self._run(invoke_many)
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        self.assertEqual([r.response.data for r in results], [b'a', b'b', b'c'])
+
+    def test_create_function_code_dir(self):
+        # the code directory is zipped off the event loop.
+        threads = []
+        zip_dir = fc2.util.zip_dir
+
+        def record(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return zip_dir(*args, **kwargs)
+
+        with mock.patch('fc2.util.zip_dir', side_effect=record):
+            r = self._run(lambda c: c.create_function('svc', 'func', 'python3', 'main.handler',
+                                                      codeDir='test/hello_world'))
+        self.assertEqual(r.data['functionName'], 'func')
+        self.assertTrue(r.data['code']['zipFile'])
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_error(self):
+        with self.assertRaises(fc2.FcError) as ctx:
+            self._run(lambda c: c.get_service('missing'))
+        self.assertEqual(ctx.exception.status_code, 404)
+        self.assertEqual(ctx.exception.err_code, 'ServiceNotFound')
+        self.assertEqual(ctx.exception.request_id, 'rid')
+
+    def test_sync_with(self):
+        client = fc2.AsyncClient(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret')
+        with self.assertRaises(TypeError) as ctx:
+            with client:
+                pass
+        self.assertIn('async with', str(ctx.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
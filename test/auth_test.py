@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import base64
 import fc2
+import hashlib
+import hmac
 import unittest
 
 
@@ -31,5 +34,25 @@ class TestAuth(unittest.TestCase):
             sign_resource = fc2.auth.Auth._get_sign_resource('/path/action with-escaped~chars_here.ext', None)
             self.assertEqual(sign_resource, '/path/action with-escaped~chars_here.ext')
 
+    def test_sign_request(self):
+        auth = fc2.auth.Auth('id', 'secret')
+        headers = {'date': 'Thu, 01 Jan 2015 00:00:00 GMT', 'content-type': 'application/json',
+                   'X-Fc-Trace-Id': 'trace', 'x-fc-account-id': '123', 'host': 'example.com'}
+        string_to_sign = 'GET\n\napplication/json\nThu, 01 Jan 2015 00:00:00 GMT\n' \
+                         'x-fc-account-id:123\nx-fc-trace-id:trace\n/2016-08-15/services'
+        expected = 'FC id:' + base64.b64encode(
+            hmac.new(b'secret', string_to_sign.encode('utf-8'), hashlib.sha256).digest()).decode('utf-8')
+        self.assertEqual(auth.sign_request('GET', '/2016-08-15/services', headers), expected)
+        # the keyed hmac is reused, and rebuilt when the secret changes.
+        self.assertEqual(auth.sign_request('GET', '/2016-08-15/services', headers), expected)
+        auth.secret = 'other'
+        self.assertNotEqual(auth.sign_request('GET', '/2016-08-15/services', headers), expected)
+
+    def test_build_canonical_headers(self):
+        self.assertEqual(fc2.auth.Auth._build_canonical_headers({'host': 'h', 'date': 'd'}), '')
+        self.assertEqual(fc2.auth.Auth._build_canonical_headers({'X-FC-B': '2', 'x-fc-a': '1', 'xfc': '3'}),
+                         'x-fc-a:1\nx-fc-b:2\n')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import json
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fc2 import circuit_breaker
+from stub_server import StubHandler, StubServer
+
+
+class _Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch('time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transitions = []
+        self.breaker = fc2.CircuitBreaker(('svc', None, 'func'), window=10, minCalls=4, failureRateThreshold=0.5,
+                                          openDuration=30, halfOpenCalls=2,
+                                          onStateChange=lambda key, old, new: self.transitions.append(new))
+
+    def _call(self, failed, duration=0.01):
+        self.breaker.acquire()
+        self.breaker.record(failed, duration)
+
+    def test_open_and_recover(self):
+        for failed in [False, True, False]:
+            self._call(failed)
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self._call(True)
+        self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+        with self.assertRaises(fc2.CircuitOpenError) as ctx:
+            self.breaker.acquire()
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertAlmostEqual(ctx.exception.retry_in, 30)
+
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+        self.breaker.acquire()
+        self.breaker.acquire()
+        with self.assertRaises(fc2.CircuitOpenError):
+            self.breaker.acquire()
+        self.breaker.record(False, 0.01)
+        self.breaker.record(False, 0.01)
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self.assertEqual(self.transitions, ['open', 'half_open', 'closed'])
+        self.assertEqual(self.breaker.snapshot()['calls'], 0)
+
+    def test_trial_failure(self):
+        for _ in range(4):
+            self._call(True)
+        self.clock.now += 30
+        self._call(True)
+        self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+        self.assertEqual(self.breaker.snapshot()['openedAt'], self.clock.now)
+
+    def test_release(self):
+        for _ in range(4):
+            self._call(True)
+        self.clock.now += 30
+        self.breaker.acquire()
+        self.breaker.acquire()
+        self.breaker.release()
+        self.breaker.acquire()
+
+    def test_sliding_window(self):
+        for _ in range(3):
+            self._call(True)
+        self.clock.now += 11
+        self._call(True)
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self.assertEqual(self.breaker.snapshot()['failures'], 1)
+
+    def test_slow_calls(self):
+        breaker = fc2.CircuitBreaker(minCalls=2, slowCallDuration=1, slowCallRateThreshold=1)
+        breaker.record(False, 2)
+        breaker.record(False, 3)
+        self.assertEqual(breaker.state, circuit_breaker.OPEN)
+
+    def test_is_failure(self):
+        self.assertTrue(circuit_breaker.is_failure(fc2.FcError('', 500)))
+        self.assertTrue(circuit_breaker.is_failure(fc2.FcError('', 429)))
+        self.assertTrue(circuit_breaker.is_failure(fc2.FcError('', 200, 'UnhandledInvocationError')))
+        self.assertFalse(circuit_breaker.is_failure(fc2.FcError('', 404, 'FunctionNotFound')))
+        self.assertTrue(circuit_breaker.is_failure(IOError()))
+
+
+class _Handler(StubHandler):
+    def do_POST(self):
+        self.read_body()
+        self.server.calls += 1
+        failing = '/functions/bad/' in self.path
+        body = json.dumps({'ErrorCode': 'ServiceUnavailable'} if failing else {}).encode('utf-8')
+        self.reply(503 if failing else 200, body)
+
+
+class TestClientCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, calls=0)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_fail_fast(self):
+        breakers = fc2.CircuitBreakerRegistry(minCalls=3, openDuration=60)
+        client = fc2.Client(endpoint=self.server.endpoint,
+                            accessKeyID='id', accessKeySecret='secret', circuitBreakers=breakers)
+        for _ in range(3):
+            with self.assertRaises(fc2.FcError):
+                client.invoke_function('svc', 'bad', payload=b'x', qualifier='prod')
+        with self.assertRaises(fc2.CircuitOpenError):
+            client.invoke_function('svc', 'bad', payload=b'x', qualifier='prod')
+        self.assertEqual(self.server.calls, 3)
+
+        # the other functions are not affected.
+        client.invoke_function('svc', 'good', payload=b'x', qualifier='prod')
+        states = breakers.states()
+        self.assertEqual(states[('svc', 'prod', 'bad')]['state'], 'open')
+        self.assertEqual(states[('svc', 'prod', 'good')]['state'], 'closed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from fc2 import util
+
+
+class TestCodePackageCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.code_dir = os.path.join(self.root, 'code')
+        shutil.copytree('test/hello_world', self.code_dir)
+        os.makedirs(os.path.join(self.code_dir, 'empty'))
+        self.cache = fc2.CodePackageCache(cacheDir=os.path.join(self.root, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _zip_dir(self):
+        output = io.BytesIO()
+        util.zip_dir(self.code_dir, output)
+        return output.getvalue()
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_hit_and_rebuild(self):
+        first = self.cache.get_package(self.code_dir)
+        self.assertEqual(self._read(first), self._zip_dir())
+        self.assertEqual(self.cache.get_package(self.code_dir), first)
+
+        with open(os.path.join(self.code_dir, 'main.py'), 'a') as f:
+            f.write('\n# changed\n')
+        second = self.cache.get_package(self.code_dir)
+        self.assertNotEqual(second, first)
+        self.assertEqual(self._read(second), self._zip_dir())
+
+        info = self.cache.info()
+        self.assertEqual(info['packages'], 2)
+        self.assertGreater(info['entries'], 0)
+
+    def test_deterministic(self):
+        cache = fc2.CodePackageCache(cacheDir=os.path.join(self.root, 'cache'), deterministic=True)
+        first = cache.get_package(self.code_dir)
+        output = io.BytesIO()
+        util.zip_dir(self.code_dir, output, deterministic=True)
+        self.assertEqual(self._read(first), output.getvalue())
+        self.assertNotEqual(first, self.cache.get_package(self.code_dir))
+
+        # touching the files does not change a deterministic package.
+        os.utime(os.path.join(self.code_dir, 'main.py'), (0, 1234567890))
+        self.assertEqual(cache.get_package(self.code_dir), first)
+
+        # the mtimes before 1980 of reproducible build trees cannot be stored in a zip entry.
+        os.utime(os.path.join(self.code_dir, 'main.py'), (1, 1))
+        cache = fc2.CodePackageCache(cacheDir=os.path.join(self.root, 'other'), deterministic=True)
+        self.assertEqual(self._read(cache.get_package(self.code_dir)), self._read(first))
+
+    def test_eviction_and_clear(self):
+        first = self.cache.get_package(self.code_dir)
+        self.cache.max_size = os.path.getsize(first) * 3 // 2
+        with open(os.path.join(self.code_dir, 'main.py'), 'a') as f:
+            f.write('\n# changed\n')
+        second = self.cache.get_package(self.code_dir)
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+        self.assertLessEqual(self.cache.info()['size'], self.cache.max_size)
+
+        self.cache.clear()
+        self.assertEqual(self.cache.info()['size'], 0)
+
+    def test_open_package(self):
+        expected = self._zip_dir()
+        with self.cache.open_package(self.code_dir) as package:
+            # evicted by the package of the changed directory before the first one is read.
+            self.cache.max_size = os.path.getsize(package.name) * 3 // 2
+            with open(os.path.join(self.code_dir, 'main.py'), 'a') as f:
+                f.write('\n# changed\n')
+            self.cache.get_package(self.code_dir)
+            self.assertFalse(os.path.exists(package.name))
+            self.assertEqual(package.read(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import fc2
+import json
+import threading
+import time
+import unittest
+
+from stub_server import StubHandler, StubServer, run_async
+
+
+def _throttled():
+    return fc2.FcError('throttled', 429, 'ResourceThrottled')
+
+
+class TestAdaptiveConcurrencyLimit(unittest.TestCase):
+    def test_aimd(self):
+        limit = fc2.AdaptiveConcurrencyLimit(initialLimit=4, minLimit=1, backoffRatio=0.5, latencyTolerance=None)
+        starts = [limit.acquire() for _ in range(4)]
+        self.assertIsNone(limit.try_acquire())
+        # a burst of throttling errors only backs off once.
+        limit.release(starts[0], _throttled())
+        limit.release(starts[1], _throttled())
+        self.assertEqual(limit.limit, 2)
+        limit.release(starts[2], fc2.FcError('not found', 404, 'FunctionNotFound'))
+        limit.release(starts[3], ignore=True)
+        self.assertEqual(limit.inflight, 0)
+        limit.release(limit.acquire(), _throttled())
+        self.assertEqual(limit.limit, 1)
+
+        # the limit grows back while it is busy.
+        for _ in range(10):
+            limit.release(limit.acquire())
+        self.assertGreater(limit.limit, 1)
+
+    def test_idle(self):
+        limit = fc2.AdaptiveConcurrencyLimit(initialLimit=4, latencyTolerance=None)
+        for _ in range(100):
+            limit.release(limit.acquire())
+        self.assertEqual(limit.limit, 4)
+
+    def test_latency(self):
+        limit = fc2.AdaptiveConcurrencyLimit(initialLimit=10, backoffRatio=0.5, minSamples=5)
+        for _ in range(5):
+            limit.release(limit.acquire() - 0.01)
+        for _ in range(5):
+            limit.release(limit.acquire() - 1)
+        self.assertEqual(limit.limit, 5)
+        self.assertGreater(limit.snapshot()['latency'], 0.1)
+
+    def test_blocking(self):
+        limit = fc2.AdaptiveConcurrencyLimit(initialLimit=1, latencyTolerance=None)
+        start = limit.acquire()
+        acquired = threading.Event()
+
+        def worker():
+            limit.release(limit.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limit.release(start)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+    def test_async(self):
+        limit = fc2.AdaptiveConcurrencyLimit(initialLimit=1, latencyTolerance=None)
+
+        async def main():
+            start = await limit.acquire_async()
+            waiter = asyncio.ensure_future(limit.acquire_async())
+            cancelled = asyncio.ensure_future(limit.acquire_async())
+            await asyncio.sleep(0.01)
+            self.assertFalse(waiter.done())
+            cancelled.cancel()
+            threading.Thread(target=limit.release, args=(start,)).start()
+            limit.release(await asyncio.wait_for(waiter, 5))
+
+        run_async(main())
+        self.assertEqual(limit.inflight, 0)
+
+
+class _Handler(StubHandler):
+    def do_POST(self):
+        self.read_body()
+        with self.server.lock:
+            self.server.inflight += 1
+            throttled = self.server.inflight > self.server.max_concurrency
+        time.sleep(0.01)
+        with self.server.lock:
+            self.server.inflight -= 1
+        if throttled:
+            status, body = 429, json.dumps({'ErrorCode': 'ResourceThrottled'}).encode('utf-8')
+        else:
+            status, body = 200, b'ok'
+        self.reply(status, body)
+
+
+class TestClientConcurrencyLimiter(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, inflight=0, max_concurrency=3)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_backoff(self):
+        limiter = fc2.AdaptiveConcurrencyLimiter(initialLimit=10, latencyTolerance=None)
+        client = fc2.Client(endpoint=self.server.endpoint,
+                            accessKeyID='id', accessKeySecret='secret', concurrencyLimiter=limiter)
+        results = list(client.invoke_many('svc', 'func', [b'x'] * 60, concurrency=10))
+        throttled = [r for r in results if r.error is not None]
+        self.assertTrue(throttled)
+        self.assertEqual(throttled[0].error.status_code, 429)
+        state = limiter.states()[('svc', None, 'func')]
+        self.assertLess(state['limit'], 10)
+        self.assertEqual(state['inflight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class _Fetcher(object):
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            n = self.calls
+        return {
+            'AccessKeyId': 'id{0}'.format(n),
+            'AccessKeySecret': 'secret{0}'.format(n),
+            'SecurityToken': 'token{0}'.format(n),
+            'Expiration': time.time() + self.lifetime,
+        }
+
+
+def _wait(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestCredentialsProviders(unittest.TestCase):
+    def test_static(self):
+        provider = fc2.StaticCredentialsProvider(' id ', 'secret', None)
+        self.assertEqual(provider.get_credentials(), fc2.Credentials('id', 'secret', '', None))
+
+    def test_environment(self):
+        env = {'ALIBABA_CLOUD_ACCESS_KEY_ID': 'id', 'ALIBABA_CLOUD_ACCESS_KEY_SECRET': 'secret',
+               'ALIBABA_CLOUD_SECURITY_TOKEN': 'token'}
+        with mock.patch.dict(os.environ, env):
+            provider = fc2.EnvironmentCredentialsProvider()
+        self.assertEqual(provider.get_credentials(), fc2.Credentials('id', 'secret', 'token', None))
+        with mock.patch.dict(os.environ, {}, clear=True):
+            with self.assertRaises(ValueError):
+                fc2.EnvironmentCredentialsProvider()
+
+    def test_background_refresh(self):
+        fetcher = _Fetcher(lifetime=0.4)
+        provider = fc2.RefreshableCredentialsProvider(fetcher, refreshBefore=0.3)
+        try:
+            first = provider.get_credentials()
+            self.assertEqual(first.access_key_id, 'id1')
+            # refreshed at half of the lifetime, before the credentials expire.
+            self.assertTrue(_wait(lambda: provider.get_credentials() is not first))
+            self.assertGreater(first.expiration, time.time())
+            second = provider.get_credentials()
+            self.assertEqual((second.access_key_id, second.access_key_secret, second.security_token),
+                             ('id2', 'secret2', 'token2'))
+        finally:
+            provider.close()
+
+    def test_expired(self):
+        fetcher = _Fetcher(lifetime=3600)
+        provider = fc2.RefreshableCredentialsProvider(fetcher)
+        provider.close()
+        provider._credentials = provider._credentials._replace(expiration=time.time() - 1)
+        self.assertEqual(provider.get_credentials().access_key_id, 'id2')
+        self.assertEqual(provider.get_credentials().access_key_id, 'id2')
+
+    def test_iso_expiration(self):
+        provider = fc2.RefreshableCredentialsProvider(
+            lambda: {'AccessKeyId': 'id', 'AccessKeySecret': 'secret', 'Expiration': '2100-01-01T00:00:00Z'})
+        provider.close()
+        self.assertEqual(provider.get_credentials().expiration, 4102444800)
+
+    def test_file(self):
+        root = tempfile.mkdtemp()
+        path = os.path.join(root, 'credentials.json')
+        try:
+            with open(path, 'w') as f:
+                json.dump({'AccessKeyId': 'id1', 'AccessKeySecret': 'secret1', 'SecurityToken': 'token1'}, f)
+            provider = fc2.FileCredentialsProvider(path, pollInterval=0.05)
+            try:
+                self.assertEqual(provider.get_credentials().access_key_id, 'id1')
+                with open(path + '.tmp', 'w') as f:
+                    json.dump({'AccessKeyId': 'id2', 'AccessKeySecret': 'secret2'}, f)
+                os.replace(path + '.tmp', path)
+                self.assertTrue(_wait(lambda: provider.get_credentials().access_key_id == 'id2'))
+                self.assertEqual(provider.get_credentials().security_token, '')
+            finally:
+                provider.close()
+        finally:
+            shutil.rmtree(root)
+
+
+class TestClientCredentials(unittest.TestCase):
+    def test_signed_with_provider(self):
+        fetcher = _Fetcher(lifetime=3600)
+        provider = fc2.RefreshableCredentialsProvider(fetcher)
+        provider.close()
+        client = fc2.Client(endpoint='http://127.0.0.1:9000', credentialsProvider=provider)
+
+        headers = client._build_common_headers('GET', '/path')
+        self.assertEqual(headers['x-fc-security-token'], 'token1')
+        self.assertTrue(headers['authorization'].startswith('FC id1:'))
+        expected = fc2.auth.Auth('id1', 'secret1', 'token1').sign_request('GET', '/path', headers)
+        self.assertEqual(headers['authorization'], expected)
+
+        provider.refresh()
+        headers = client._build_common_headers('GET', '/path')
+        self.assertEqual(headers['x-fc-security-token'], 'token2')
+        expected = fc2.auth.Auth('id2', 'secret2', 'token2').sign_request('GET', '/path', headers)
+        self.assertEqual(headers['authorization'], expected)
+
+    def test_missing_credentials(self):
+        with self.assertRaises(ValueError):
+            fc2.Client(endpoint='http://127.0.0.1:9000')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import concurrent.futures
+import fc2
+import io
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+
+from fc2 import util
+from fc2.emulator import Emulator, Fault
+from stub_server import run_async
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _zip(content):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as z:
+        z.writestr('main.py', content)
+    return output.getvalue()
+
+
+class TestEmulator(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator().start()
+        self.client = self.emulator.client()
+
+    def tearDown(self):
+        self.client.close()
+        self.emulator.stop()
+
+    def _create_function(self, service='svc', function='fn'):
+        self.client.create_service(service)
+        package = _zip('def handler(event, context): return event')
+        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as f:
+            f.write(package)
+        self.addCleanup(os.remove, f.name)
+        self.client.create_function(service, function, 'python3', 'main.handler', codeZipFile=f.name)
+        return package
+
+    def test_services(self):
+        r = self.client.create_service('svc', description='first')
+        self.assertEqual(r.data['serviceName'], 'svc')
+        self.assertTrue(r.headers['etag'])
+        self.assertTrue('serviceId' in r.data)
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.create_service('svc')
+        self.assertEqual((cm.exception.status_code, cm.exception.err_code), (409, 'ServiceAlreadyExists'))
+
+        r = self.client.update_service('svc', description='second', headers={'if-match': r.headers['etag']})
+        self.assertEqual(r.data['description'], 'second')
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.update_service('svc', description='third', headers={'if-match': 'stale'})
+        self.assertEqual(cm.exception.status_code, 412)
+        self.assertEqual(self.client.get_service('svc').data['description'], 'second')
+
+        self.client.delete_service('svc')
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.get_service('svc')
+        self.assertEqual((cm.exception.status_code, cm.exception.err_code), (404, 'ServiceNotFound'))
+
+    def test_pagination_and_tags(self):
+        for i in range(25):
+            self.client.create_service('svc-{0:02d}'.format(i))
+        self.client.create_service('other')
+        names = [s['serviceName'] for s in self.client.iter_services(pageSize=10, prefix='svc-')]
+        self.assertEqual(names, ['svc-{0:02d}'.format(i) for i in range(25)])
+        r = self.client.list_services(limit=5, startKey='svc-20')
+        self.assertEqual(len(r.data['services']), 5)
+        self.assertFalse(r.data.get('nextToken'))
+
+        arn = 'acs:fc:cn-hangzhou:1234567890:services/svc-03'
+        self.client.tag_resource(arn, {'team': 'a'})
+        self.assertEqual(self.client.get_resource_tags(arn).data['tags'], {'team': 'a'})
+        r = self.client.list_services(tags={'team': 'a'})
+        self.assertEqual([s['serviceName'] for s in r.data['services']], ['svc-03'])
+        self.client.untag_resource(arn, ['team'])
+        self.assertEqual(self.client.get_resource_tags(arn).data['tags'], {})
+
+    def test_functions_and_triggers(self):
+        package = self._create_function()
+        r = self.client.get_function('svc', 'fn')
+        self.assertEqual(r.data['codeSize'], len(package))
+        self.assertEqual(r.data['codeChecksum'], str(util.crc64(package)))
+        self.assertEqual(self.client.get_function_code('svc', 'fn').data['checksum'], str(util.crc64(package)))
+
+        self.client.update_function('svc', 'fn', handler='main.other', memorySize=512)
+        r = self.client.get_function('svc', 'fn')
+        self.assertEqual((r.data['handler'], r.data['memorySize']), ('main.other', 512))
+
+        self.client.create_trigger('svc', 'fn', 'timer', 'timer', {'cronExpression': '@every 1m'}, '', '')
+        self.assertEqual([t['triggerName'] for t in self.client.list_triggers('svc', 'fn').data['triggers']],
+                         ['timer'])
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.delete_function('svc', 'fn')
+        self.assertEqual(cm.exception.err_code, 'FunctionNotEmpty')
+        self.client.delete_trigger('svc', 'fn', 'timer')
+        self.client.delete_function('svc', 'fn')
+        self.assertEqual(self.client.list_functions('svc').data['functions'], [])
+
+    def test_versions_and_aliases(self):
+        self._create_function()
+        self.client.update_function('svc', 'fn', description='v1')
+        v1 = self.client.publish_version('svc').data['versionId']
+        self.client.update_function('svc', 'fn', description='v2')
+        v2 = self.client.publish_version('svc').data['versionId']
+        self.assertEqual([v['versionId'] for v in self.client.list_versions('svc').data['versions']], [v2, v1])
+
+        self.client.create_alias('svc', 'prod', v1)
+        self.assertEqual(self.client.get_function('svc', 'fn', qualifier='prod').data['description'], 'v1')
+        self.assertEqual(self.client.get_function('svc', 'fn', qualifier=v2).data['description'], 'v2')
+        self.assertEqual(self.client.get_function('svc', 'fn').data['description'], 'v2')
+        r = self.client.invoke_function('svc', 'fn', payload=b'x', qualifier='prod')
+        self.assertEqual(r.headers['x-fc-invocation-service-version'], v1)
+
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.delete_version('svc', v1)
+        self.assertEqual(cm.exception.err_code, 'VersionInUse')
+        self.client.update_alias('svc', 'prod', v2)
+        self.client.delete_version('svc', v1)
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.create_alias('svc', 'old', v1)
+        self.assertEqual(cm.exception.err_code, 'VersionNotFound')
+
+    def test_function_configs(self):
+        self._create_function()
+        v1 = self.client.publish_version('svc').data['versionId']
+        self.client.create_alias('svc', 'prod', v1)
+
+        self.client.put_on_demand_config('svc', 'prod', 'fn', 10)
+        self.assertEqual(self.client.get_on_demand_config('svc', 'prod', 'fn').data['maximumInstanceCount'], 10)
+        self.assertEqual(len(self.client.list_on_demand_config().data['configs']), 1)
+        self.client.delete_on_demand_config('svc', 'prod', 'fn')
+        self.assertEqual(self.client.list_on_demand_config().data['configs'], [])
+
+        self.client.put_provision_config('svc', 'prod', 'fn', 3)
+        self.assertEqual(self.client.get_provision_config('svc', 'prod', 'fn').data['target'], 3)
+        self.assertEqual(len(self.client.list_provision_configs('svc', 'prod').data['provisionConfigs']), 1)
+
+        self.client.put_function_async_invoke_config('svc', 'prod', 'fn', {'maxAsyncRetryAttempts': 1})
+        r = self.client.get_function_async_invoke_config('svc', 'prod', 'fn')
+        self.assertEqual((r.data['qualifier'], r.data['maxAsyncRetryAttempts']), ('prod', 1))
+        self.assertEqual(len(self.client.list_function_async_invoke_configs('svc', 'fn').data['configs']), 1)
+        self.client.delete_function_async_invoke_config('svc', 'prod', 'fn')
+
+        self.client.create_custom_domain('example.com', protocol='HTTP')
+        self.assertEqual(self.client.get_custom_domain('example.com').data['protocol'], 'HTTP')
+        self.assertEqual(len(self.client.list_custom_domains().data['customDomains']), 1)
+        self.client.delete_custom_domain('example.com')
+
+    def test_invoke(self):
+        self._create_function()
+        self.assertEqual(self.client.invoke_function('svc', 'fn', payload=b'hello').data, b'hello')
+        self.assertEqual(self.client.invoke_function('svc', 'fn', payload=iter([b'he', b'llo'])).data, b'hello')
+        r = self.client.invoke_function('svc', 'fn', payload=b'x', headers={'x-fc-invocation-type': 'Async'})
+        self.assertEqual(r.data, b'')
+
+        self.emulator.set_handler('svc', 'fn', lambda payload, context: context['functionName'] + ':' +
+                                  payload.decode('utf-8').upper())
+        self.assertEqual(self.client.invoke_function('svc', 'fn', payload='abc').data, b'fn:ABC')
+        r = self.client.do_http_request('POST', 'svc', 'fn', '/path', params={'a': 'b c'}, body=b'abc')
+        self.assertEqual((r.status_code, r.content), (200, b'fn:ABC'))
+
+        def fail(payload, context):
+            raise ValueError('boom')
+        self.emulator.set_handler('svc', 'fn', fail)
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.invoke_function('svc', 'fn', payload=b'x')
+        self.assertIn('boom', str(cm.exception))
+
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.invoke_function('svc', 'missing')
+        self.assertEqual(cm.exception.err_code, 'FunctionNotFound')
+        self.assertEqual(self.emulator.request_counts()['invoke_function'], 6)
+
+    def test_signature(self):
+        self.client.create_service('svc')
+        client = self.emulator.client(accessKeySecret='wrong')
+        with self.assertRaises(fc2.FcError) as cm:
+            client.get_service('svc')
+        self.assertEqual((cm.exception.status_code, cm.exception.err_code), (403, 'SignatureNotMatch'))
+        client = self.emulator.client(accessKeyID='unknown')
+        with self.assertRaises(fc2.FcError) as cm:
+            client.get_service('svc')
+        self.assertEqual(cm.exception.err_code, 'InvalidAccessKeyID')
+        self.assertEqual(self.emulator.request_counts()['rejected'], 2)
+
+        # the queries of the http trigger requests are signed as well.
+        self._create_function('svc2')
+        client = self.emulator.client(accessKeySecret='wrong')
+        r = client.do_http_request('GET', 'svc2', 'fn', '/', params={'a': 'b'})
+        self.assertEqual((r.status_code, r.json()['ErrorCode']), (403, 'SignatureNotMatch'))
+
+    def test_fault_injection(self):
+        self._create_function()
+        self.emulator.set_fault('svc', 'fn', Fault(errorRate=1, errorStatus=503, errorCode='ServiceUnavailable'))
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.invoke_function('svc', 'fn')
+        self.assertEqual((cm.exception.status_code, cm.exception.err_code), (503, 'ServiceUnavailable'))
+
+        self.emulator.set_fault('svc', 'fn', Fault(functionErrorRate=1))
+        with self.assertRaises(fc2.FcError) as cm:
+            self.client.invoke_function('svc', 'fn')
+        self.assertIn('Injected function error', str(cm.exception))
+
+        self.emulator.set_fault('svc', 'fn', Fault(latency=0.2, maxConcurrency=1))
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            futures = [executor.submit(self.client.invoke_function, 'svc', 'fn', b'x') for _ in range(2)]
+            errors = [f.exception() for f in futures]
+        throttled = [e for e in errors if e is not None]
+        self.assertEqual(len(throttled), 1)
+        self.assertEqual((throttled[0].status_code, throttled[0].err_code), (429, 'ResourceThrottled'))
+
+        self.emulator.set_fault('svc', 'fn', None)
+        start = time.time()
+        self.client.invoke_function('svc', 'fn')
+        self.assertLess(time.time() - start, 0.2)
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async_client(self):
+        self._create_function()
+        credentials = next(iter(self.emulator.credentials.items()))
+
+        async def run():
+            async with fc2.AsyncClient(endpoint=self.emulator.endpoint, accessKeyID=credentials[0],
+                                       accessKeySecret=credentials[1]) as client:
+                outputs = await asyncio.gather(*[client.invoke_function('svc', 'fn', payload=str(i))
+                                                 for i in range(20)])
+                return [r.data for r in outputs]
+
+        self.assertEqual(run_async(run()), [str(i).encode('utf-8') for i in range(20)])
+
+
+if __name__ == '__main__':
+    unittest.main()
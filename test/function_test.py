@@ -170,6 +170,12 @@ class TestFunction(unittest.TestCase):
         self.assertEqual(func['description'], desc)
         self.assertEqual(func['environmentVariables'], {'newTestKey':'newTestValue'})
         self.assertEqual(func['description'], desc)
+        # the same package is not uploaded again, the other attributes are still updated.
+        with open('test/hello_world/hello_world.zip', 'rb') as f:
+            self.assertEqual(fc2.util.crc64_file(f), func['codeChecksum'])
+        func = self.client.update_function(self.serviceName, functionName, codeZipFile='test/hello_world/hello_world.zip',
+                                           description='skip unchanged code', skipUnchangedCode=True)
+        self.assertEqual(func.data['description'], 'skip unchanged code')
         func = self.client.update_function(self.serviceName, functionName, codeDir='test/hello_world', description=desc, environmentVariables={})
         self.assertEqual(func.data['environmentVariables'], {})
         # expect the delete service failed because of invalid etag.
@@ -357,6 +363,28 @@ class TestFunction(unittest.TestCase):
 
         self.client.delete_function(self.serviceName, custom_go_error)
 
+    def test_invoke_many(self):
+        helloWorld = 'test_invoke_many_' + ''.join(random.choice(string.ascii_lowercase) for _ in range(8))
+        logging.info('create function: {0}'.format(helloWorld))
+        self.client.create_function(
+            self.serviceName, helloWorld,
+            handler='main.my_handler', runtime='python2.7', codeZipFile='test/hello_world/hello_world.zip')
+
+        results = list(self.client.invoke_many(self.serviceName, helloWorld, [b''] * 10, concurrency=4, ordered=True))
+        self.assertEqual([r.index for r in results], list(range(10)))
+        for r in results:
+            self.assertTrue(r.ok)
+            self.assertEqual(r.response.data.decode('utf-8'), 'hello world')
+            self.assertGreater(r.latency, 0)
+
+        results = list(self.client.invoke_many(self.serviceName, 'undefine_function', [b''] * 3, concurrency=2))
+        self.assertEqual(sorted(r.index for r in results), [0, 1, 2])
+        for r in results:
+            self.assertFalse(r.ok)
+            self.assertEqual(r.error.status_code, 404)
+
+        self.client.delete_function(self.serviceName, helloWorld)
+
     def test_sts(self):
         helloWorld= 'test_invoke_hello_world_' + ''.join(random.choice(string.ascii_lowercase) for _ in range(8))
         logging.info('create function: {0}'.format(helloWorld))
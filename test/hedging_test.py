@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import select
+import socket
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from fc2 import hedging
+from stub_server import StubHandler, StubServer, run_async
+
+
+class TestHedgingPolicy(unittest.TestCase):
+    def test_delay(self):
+        policy = fc2.HedgingPolicy(delay=0.5, percentile=90, minSamples=10, sampleSize=10, minDelay=0.01)
+        key = ('svc', None, 'func')
+        self.assertEqual(policy.delay_for(key), 0.5)
+        for i in range(10):
+            policy.record(key, (i + 1) / 100.0)
+        self.assertAlmostEqual(policy.delay_for(key), 0.09)
+        for i in range(10):
+            policy.record(key, 0.001)
+        self.assertAlmostEqual(policy.delay_for(key), 0.01)
+        self.assertIsNone(fc2.HedgingPolicy().delay_for(key))
+        self.assertEqual(fc2.HedgingPolicy(delay=0.5, maxDelay=0.2).delay_for(key), 0.2)
+        self.assertEqual(fc2.HedgingPolicy(delay=0.2, percentile=None).delay_for(key), 0.2)
+
+    def test_budget(self):
+        policy = fc2.HedgingPolicy(delay=0.1, budget=fc2.RetryBudget(ratio=0.5, rate=0.001, capacity=1))
+        self.assertTrue(policy.try_hedge())
+        self.assertFalse(policy.try_hedge())
+        policy.on_request()
+        policy.on_request()
+        self.assertTrue(policy.try_hedge())
+        self.assertTrue(fc2.HedgingPolicy(delay=0.1, budget=None).try_hedge())
+
+    def test_can_hedge(self):
+        self.assertTrue(hedging.can_hedge({}, b'x'))
+        self.assertTrue(hedging.can_hedge({'x-fc-invocation-type': 'Sync'}, None))
+        self.assertFalse(hedging.can_hedge({'X-Fc-Invocation-Type': 'Async'}, b'x'))
+        with open(__file__, 'rb') as f:
+            self.assertFalse(hedging.can_hedge({}, f))
+
+
+class _Handler(StubHandler):
+    def do_POST(self):
+        data = self.read_body()
+        with self.server.lock:
+            self.server.calls += 1
+            slow = self.server.calls == 1
+        time.sleep(self.server.latency)
+        if slow:
+            # the first request hits a cold start.
+            time.sleep(self.server.cold_start)
+        self.reply(200, b'slow' if slow else data)
+
+
+class _LatencyHandler(StubHandler):
+    """ Answer the requests after the latencies of server.latencies, in order. """
+
+    def do_POST(self):
+        self.read_body()
+        with self.server.lock:
+            latency = self.server.latencies.pop(0)
+        time.sleep(latency)
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        if readable and not self.connection.recv(1, socket.MSG_PEEK):
+            # the client closed the connection of the request.
+            with self.server.lock:
+                self.server.aborted.append(latency)
+            return
+        self.reply(200, str(latency).encode('utf-8'))
+
+
+class TestHedgedInvoke(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, calls=0, cold_start=1, latency=0)
+        self.endpoint = self.server.endpoint
+        self.policy = fc2.HedgingPolicy(delay=0.05, percentile=None)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_hedge(self):
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret',
+                            hedgingPolicy=self.policy)
+        start = time.time()
+        r = client.invoke_function('svc', 'func', payload=b'hello', hedge=True)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(r.data, b'hello')
+        self.assertEqual(self.server.calls, 2)
+        client.close()
+
+    def test_primary_wins(self):
+        # the hedge still in flight is aborted.
+        server = StubServer(_LatencyHandler, latencies=[0.2, 0.5], aborted=[])
+        client = fc2.Client(endpoint=server.endpoint, accessKeyID='id', accessKeySecret='secret',
+                            hedgingPolicy=self.policy)
+        try:
+            start = time.time()
+            r = client.invoke_function('svc', 'func', payload=b'hello', hedge=True)
+            self.assertLess(time.time() - start, 0.4)
+            self.assertEqual(r.data, b'0.2')
+            time.sleep(0.5)
+            self.assertEqual(server.aborted, [0.5])
+        finally:
+            client.close()
+            server.stop()
+
+    def test_hedge_retry_policy(self):
+        # the primary request aborted by the hedge is not retried.
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret',
+                            hedgingPolicy=self.policy, retryPolicy=fc2.RetryPolicy(
+                                baseDelay=0.5, idempotentOperations=['invoke_function']))
+        start = time.time()
+        r = client.invoke_function('svc', 'func', payload=b'hello', hedge=True)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(r.data, b'hello')
+        time.sleep(0.2)
+        self.assertEqual(self.server.calls, 2)
+        client.close()
+
+    def test_concurrent_hedged_invocations(self):
+        # the primary requests are sent on the calling threads, not on the hedge executor.
+        self.server.cold_start = 0
+        self.server.latency = 0.3
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret', poolMaxsize=1,
+                            hedgingPolicy=fc2.HedgingPolicy(delay=5, percentile=None))
+        start = time.time()
+        with ThreadPoolExecutor(48) as executor:
+            responses = list(executor.map(
+                lambda _: client.invoke_function('svc', 'func', payload=b'x', hedge=True), range(48)))
+        self.assertLess(time.time() - start, 0.55)
+        self.assertEqual(self.server.calls, 48)
+        self.assertEqual(sorted(set(r.data for r in responses)), [b'slow', b'x'])
+        client.close()
+
+    def test_no_hedge(self):
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret')
+        self.server.cold_start = 0.1
+        r = client.invoke_function('svc', 'func', payload=b'hello', headers={'x-fc-invocation-type': 'Async'},
+                                   hedge=self.policy)
+        self.assertEqual(r.data, b'slow')
+        self.assertEqual(self.server.calls, 1)
+        with self.assertRaises(ValueError):
+            client.invoke_function('svc', 'func', payload=b'hello', hedge=True)
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async_hedge(self):
+        async def main():
+            async with fc2.AsyncClient(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret',
+                                       hedgingPolicy=self.policy) as client:
+                return await client.invoke_function('svc', 'func', payload=b'hello', hedge=True)
+
+        start = time.time()
+        r = run_async(main())
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(r.data, b'hello')
+        self.assertEqual(self.server.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import itertools
+import socket
+import unittest
+
+from fc2.emulator import Emulator, Fault
+from stub_server import run_async
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class _Recorder(fc2.RequestHooks):
+    def __init__(self):
+        self.calls = []
+
+    def _record(self, name, event):
+        self.calls.append((name, event.operation, event.attempt, event.status, dict(event.timings), event.error))
+
+    def before_sign(self, event):
+        event.headers['x-fc-trace-id'] = 'trace'
+        self._record('before_sign', event)
+
+    def before_send(self, event):
+        self._record('before_send', event)
+
+    def on_retry(self, event):
+        self._record('on_retry', event)
+
+    def after_response(self, event):
+        self.last = event
+        self._record('after_response', event)
+
+    def on_error(self, event):
+        self._record('on_error', event)
+
+    def names(self):
+        return [call[0] for call in self.calls]
+
+
+def _refused_endpoint():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:{0}'.format(port)
+
+
+class _Failing(fc2.RequestHooks):
+    def after_response(self, event):
+        raise RuntimeError('broken hook')
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator().start()
+        self.recorder = _Recorder()
+        self.client = self.emulator.client(hooks=[self.recorder, _Failing()])
+
+    def tearDown(self):
+        self.client.close()
+        self.emulator.stop()
+
+    def test_call(self):
+        self.client.create_service('svc')
+        self.assertEqual(self.recorder.names(), ['before_sign', 'before_send', 'after_response'])
+        name, operation, attempt, status, timings, error = self.recorder.calls[-1]
+        self.assertEqual((operation, attempt, status, error), ('create_service', 1, 200, None))
+        self.assertEqual(set(timings), {'sign', 'connect', 'ttfb', 'download', 'decode', 'total'})
+        self.assertGreater(timings['connect'], 0)
+        self.assertGreater(timings['total'], timings['ttfb'])
+        self.assertGreater(timings['decode'], 0)
+        self.assertTrue(self.recorder.last.request_id)
+
+        # the connection is reused, the header added by before_sign is signed.
+        self.recorder.calls = []
+        self.assertEqual(self.client.get_service('svc').data['serviceName'], 'svc')
+        self.assertEqual(self.recorder.calls[-1][1], 'get_service')
+        self.assertEqual(self.recorder.calls[-1][4]['connect'], 0)
+        self.assertEqual(self.recorder.last.headers['x-fc-trace-id'], 'trace')
+
+    def test_invoke(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        self.client.publish_version('svc')
+        self.recorder.calls = []
+        self.assertEqual(self.client.invoke_function('svc', 'fn', payload=b'x', qualifier='1').data, b'x')
+        event = self.recorder.last
+        self.assertEqual((event.operation, event.service_name, event.qualifier, event.function_name),
+                         ('invoke_function', 'svc', '1', 'fn'))
+        self.assertEqual(self.recorder.calls[-1][4]['decode'], 0)
+
+        self.emulator.set_fault('svc', 'fn', Fault(functionErrorRate=1))
+        with self.assertRaises(fc2.FcError):
+            self.client.invoke_function('svc', 'fn')
+        self.assertEqual(self.recorder.names()[-2:], ['after_response', 'on_error'])
+
+    def test_errors_and_retries(self):
+        with self.assertRaises(fc2.FcError):
+            self.client.get_service('missing')
+        self.assertEqual(self.recorder.names(), ['before_sign', 'before_send', 'after_response', 'on_error'])
+        self.assertEqual(self.recorder.calls[-1][3], 404)
+        self.assertEqual(self.recorder.calls[-1][5].err_code, 'ServiceNotFound')
+
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        self.emulator.set_fault('svc', 'fn', Fault(errorRate=1, errorStatus=503, errorCode='ServiceUnavailable'))
+        client = self.emulator.client(hooks=self.recorder, retryPolicy=fc2.RetryPolicy(
+            baseDelay=0.001, idempotentOperations=['invoke_function']))
+        self.recorder.calls = []
+        with self.assertRaises(fc2.FcError):
+            client.invoke_function('svc', 'fn')
+        client.close()
+        self.assertEqual(self.recorder.names(), ['before_sign', 'before_send', 'on_retry', 'before_send', 'on_retry',
+                                                 'before_send', 'after_response', 'on_error'])
+        self.assertEqual([call[2] for call in self.recorder.calls if call[0] == 'before_send'], [1, 2, 3])
+
+    def test_hedged_invoke(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        # the first request of every call is slow, its hedge is not.
+        latencies = itertools.cycle([0.3, 0])
+        self.emulator.set_fault('svc', 'fn', Fault(latency=lambda: next(latencies)))
+        client = self.emulator.client(hooks=self.recorder, hedgingPolicy=fc2.HedgingPolicy(delay=0.05))
+        self.recorder.calls = []
+        for _ in range(3):
+            self.assertEqual(client.invoke_function('svc', 'fn', payload=b'x', hedge=True).data, b'x')
+        client.close()
+        names = self.recorder.names()
+        self.assertEqual((names.count('before_sign'), names.count('before_send'), names.count('after_response')),
+                         (3, 6, 3))
+        self.assertEqual([call[2] for call in self.recorder.calls if call[0] == 'before_send'], [1] * 6)
+        event = self.recorder.last
+        self.assertEqual((event.operation, event.status, event.hedge, event.parent),
+                         ('invoke_function', 200, True, None))
+        self.assertLess(event.timings['total'], 0.3)
+
+    def test_do_http_request(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        self.recorder.calls = []
+        r = self.client.do_http_request('POST', 'svc', 'fn', '/path', body=b'x')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.recorder.names(), ['before_sign', 'before_send', 'after_response'])
+        self.assertEqual(self.recorder.calls[-1][1:4], ('do_http_request', 1, 200))
+
+        self.recorder.calls = []
+        client = fc2.Client(endpoint=_refused_endpoint(), accessKeyID='emulator', accessKeySecret='emulator',
+                            hooks=self.recorder, retryPolicy=fc2.RetryPolicy(maxAttempts=1))
+        with self.assertRaises(Exception):
+            client.do_http_request('POST', 'svc', 'fn', '/path', body=b'x')
+        client.close()
+        self.assertEqual(self.recorder.names(), ['before_sign', 'before_send', 'on_error'])
+        self.assertIsNotNone(self.recorder.calls[-1][5])
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async_do_http_request(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        self.recorder.calls = []
+
+        async def run():
+            async with fc2.AsyncClient(endpoint=self.emulator.endpoint, accessKeyID='emulator',
+                                       accessKeySecret='emulator', hooks=self.recorder) as client:
+                return await client.do_http_request('POST', 'svc', 'fn', '/path', body=b'x')
+
+        self.assertEqual(run_async(run()).status_code, 200)
+        self.assertEqual(self.recorder.names(), ['before_sign', 'before_send', 'after_response'])
+        self.assertEqual(self.recorder.calls[-1][1:4], ('do_http_request', 1, 200))
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async_client(self):
+        async def run():
+            async with fc2.AsyncClient(endpoint=self.emulator.endpoint, accessKeyID='emulator',
+                                       accessKeySecret='emulator', hooks=self.recorder) as client:
+                await client.create_service('svc')
+                with self.assertRaises(fc2.FcError):
+                    await client.get_service('missing')
+
+        run_async(run())
+        self.assertEqual(self.recorder.names(), ['before_sign', 'before_send', 'after_response'] +
+                         ['before_sign', 'before_send', 'after_response', 'on_error'])
+        name, operation, attempt, status, timings, error = self.recorder.calls[2]
+        self.assertEqual((operation, status), ('create_service', 200))
+        self.assertGreater(timings['connect'], 0)
+        self.assertGreater(timings['ttfb'], 0)
+        self.assertEqual(self.recorder.calls[-1][1], 'get_service')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import json
+import time
+import unittest
+
+from urllib.parse import parse_qs, urlparse
+
+from stub_server import StubHandler, StubServer
+
+_SERVICES = 12
+_FUNCTIONS = 5
+
+
+class _Handler(StubHandler):
+    def _page(self, key, items, query):
+        start = int(query.get('nextToken', 0))
+        limit = int(query.get('limit', 100))
+        data = {key: items[start:start + limit]}
+        if start + limit < len(items):
+            data['nextToken'] = str(start + limit)
+        return data
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+        parts = url.path.split('/')[2:]
+        with self.server.lock:
+            self.server.count += 1
+        status = 200
+        if parts == ['services']:
+            data = self._page('services', [{'serviceName': 's{0}'.format(i)} for i in range(_SERVICES)], query)
+        elif parts[2:] == ['functions'] and parts[1] == 's3':
+            status, data = 404, {'ErrorCode': 'ServiceNotFound', 'ErrorMessage': 'not found'}
+        elif parts[2:] == ['functions']:
+            data = self._page('functions', [{'functionName': 'f{0}'.format(i)} for i in range(_FUNCTIONS)], query)
+        elif parts[2:] == ['aliases']:
+            data = self._page('aliases', [{'aliasName': 'prod'}], query)
+        else:
+            data = self._page('triggers', [{'triggerName': 't'}], query)
+        self.reply(status, json.dumps(data).encode('utf-8'), {'Content-Type': 'application/json'})
+
+
+class TestInventoryCrawler(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, count=0)
+        self.client = fc2.Client(endpoint=self.server.endpoint, accessKeyID='id', accessKeySecret='secret')
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_snapshot(self):
+        records = []
+        crawler = fc2.InventoryCrawler(self.client, workers=4, pageSize=2)
+        snapshot = crawler.snapshot(callback=records.append)
+        self.assertEqual(snapshot.counts(), {
+            'services': _SERVICES,
+            'functions': (_SERVICES - 1) * _FUNCTIONS,
+            'triggers': (_SERVICES - 1) * _FUNCTIONS,
+            'aliases': _SERVICES,
+            'errors': 1,
+        })
+        self.assertEqual(len(records), sum(snapshot.counts().values()))
+        self.assertEqual(sorted(snapshot.functions_of('s0')), ['f{0}'.format(i) for i in range(_FUNCTIONS)])
+        self.assertIn(('s1', 'f4', 't'), snapshot.triggers)
+        kind, service, _, error = snapshot.errors[0]
+        self.assertEqual((kind, service), ('functions', 's3'))
+        self.assertEqual(error.status_code, 404)
+
+    def test_rate(self):
+        crawler = fc2.InventoryCrawler(self.client, workers=4, rate=10, triggers=False, aliases=False)
+        start = time.time()
+        snapshot = crawler.snapshot()
+        # 1 page of services + 12 pages of functions, the requests after a burst of 10 are spaced by 0.1s.
+        self.assertEqual(self.server.count, 1 + _SERVICES)
+        self.assertEqual(snapshot.counts()['functions'], (_SERVICES - 1) * _FUNCTIONS)
+        self.assertGreaterEqual(time.time() - start, 0.25)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_acquire(self):
+        bucket = fc2.TokenBucket(rate=100, capacity=2)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        start = time.time()
+        self.assertTrue(bucket.acquire(2))
+        self.assertGreaterEqual(time.time() - start, 0.015)
+        self.assertFalse(bucket.acquire(2, timeout=0))
+        with self.assertRaises(ValueError):
+            bucket.acquire(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
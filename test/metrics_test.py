@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import itertools
+import random
+import socket
+import unittest
+
+from fc2.emulator import Emulator, Fault
+
+
+def _refused_endpoint():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:{0}'.format(port)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = fc2.LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), None)
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(-4, 1.5) for _ in range(10000))
+        for value in values:
+            histogram.record(value)
+        self.assertEqual(histogram.count, 10000)
+        for percentile in (1, 50, 90, 99, 99.9):
+            expected = values[int(len(values) * percentile / 100.0) - 1]
+            self.assertAlmostEqual(histogram.percentile(percentile) / expected, 1, delta=0.01)
+        snapshot = histogram.snapshot()
+        self.assertEqual((snapshot['min'], snapshot['max']), (values[0], values[-1]))
+        self.assertEqual(histogram.percentile(100), values[-1])
+        self.assertAlmostEqual(snapshot['sum'], sum(values))
+
+    def test_small_values(self):
+        histogram = fc2.LatencyHistogram(precision=4)
+        for value in (0, 0.000001, 0.000005, 0.000005):
+            histogram.record(value)
+        self.assertEqual(histogram.percentiles([25, 50, 100]), [0.0000005, 0.0000015, 0.000005])
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator().start()
+        self.metrics = fc2.MetricsRegistry()
+        self.client = self.emulator.client(metrics=self.metrics, retryPolicy=fc2.RetryPolicy(
+            baseDelay=0.001, idempotentOperations=['invoke_function']))
+
+    def tearDown(self):
+        self.client.close()
+        self.emulator.stop()
+
+    def test_metrics(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        for _ in range(3):
+            self.client.invoke_function('svc', 'fn', payload=b'x')
+        self.client.invoke_function('svc', 'fn', payload=b'x', qualifier='LATEST')
+        with self.assertRaises(fc2.FcError):
+            self.client.get_service('missing')
+        self.emulator.set_fault('svc', 'fn', Fault(errorRate=1, errorStatus=503, errorCode='ServiceUnavailable'))
+        with self.assertRaises(fc2.FcError):
+            self.client.invoke_function('svc', 'fn')
+        self.emulator.set_fault('svc', 'fn', Fault(functionErrorRate=1))
+        with self.assertRaises(fc2.FcError):
+            self.client.invoke_function('svc', 'fn')
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['requests'], {'create_service': 1, 'create_function': 1, 'invoke_function': 6,
+                                                'get_service': 1})
+        self.assertEqual(snapshot['errors'], {'get_service': {'ServiceNotFound': 1},
+                                              'invoke_function': {'ServiceUnavailable': 1, 'FunctionError': 1}})
+        self.assertEqual(snapshot['retries'], {'invoke_function': 2})
+        self.assertEqual(set(snapshot['inflight'].values()), {0})
+        latency = snapshot['latency']['invoke_function']
+        self.assertEqual(latency['count'], 6)
+        self.assertTrue(0 < latency['min'] <= latency['p50'] <= latency['p99'] <= latency['max'])
+        self.assertEqual(snapshot['functionLatency'][('svc', None, 'fn')]['count'], 5)
+        self.assertEqual(snapshot['functionLatency'][('svc', 'LATEST', 'fn')]['count'], 1)
+
+        text = self.metrics.prometheus_text()
+        self.assertIn('# TYPE fc2_client_requests_total counter\n', text)
+        self.assertIn('fc2_client_requests_total{operation="invoke_function"} 6.0\n', text)
+        self.assertIn('fc2_client_errors_total{error_code="ServiceNotFound",operation="get_service"} 1.0\n', text)
+        self.assertIn('fc2_client_retries_total{operation="invoke_function"} 2.0\n', text)
+        self.assertIn('fc2_client_inflight_requests{operation="invoke_function"} 0.0\n', text)
+        self.assertIn('fc2_client_request_duration_seconds_count{operation="invoke_function"} 6.0\n', text)
+        self.assertIn('fc2_client_request_duration_seconds{operation="invoke_function",quantile="0.99"} ', text)
+        self.assertIn('fc2_client_function_duration_seconds_count{function="fn",qualifier="",service="svc"} 5.0\n',
+                      text)
+
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot()['requests'], {})
+
+    def test_rejected_calls(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        self.emulator.set_fault('svc', 'fn', Fault(errorRate=1, errorStatus=503, errorCode='ServiceUnavailable'))
+        self.metrics.reset()
+        # the retry of the call is rejected by the rate limiter.
+        client = self.emulator.client(
+            metrics=self.metrics, rateLimiter=fc2.RateLimiter(dataPlane=fc2.TokenBucket(0.001, 1), blocking=False),
+            retryPolicy=fc2.RetryPolicy(baseDelay=0.001, idempotentOperations=['invoke_function']))
+        with self.assertRaises(fc2.FcError):
+            client.invoke_function('svc', 'fn')
+        client.close()
+        self.assertEqual(self.metrics.snapshot()['inflight'], {'invoke_function': 0})
+
+        # the second call is rejected by the circuit opened by the first one.
+        client = self.emulator.client(metrics=self.metrics, retryPolicy=fc2.RetryPolicy(maxAttempts=1),
+                                      circuitBreakers=fc2.CircuitBreakerRegistry(minCalls=1))
+        for _ in range(2):
+            with self.assertRaises(fc2.FcError):
+                client.invoke_function('svc', 'fn')
+        client.close()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['requests'], {'invoke_function': 2})
+        self.assertEqual(snapshot['inflight'], {'invoke_function': 0})
+        self.assertEqual(snapshot['errors'], {'invoke_function': {
+            'ClientRateLimitExceeded': 1, 'ServiceUnavailable': 1, 'CircuitOpen': 1}})
+        self.assertEqual(snapshot['latency']['invoke_function']['count'], 2)
+
+    def test_hedged_invoke(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        latencies = itertools.cycle([0.3, 0])
+        self.emulator.set_fault('svc', 'fn', Fault(latency=lambda: next(latencies)))
+        self.metrics.reset()
+        client = self.emulator.client(metrics=self.metrics, hedgingPolicy=fc2.HedgingPolicy(delay=0.05))
+        for _ in range(3):
+            client.invoke_function('svc', 'fn', payload=b'x', hedge=True)
+        client.close()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['requests'], {'invoke_function': 3})
+        self.assertEqual(snapshot['inflight'], {'invoke_function': 0})
+        self.assertLess(snapshot['latency']['invoke_function']['max'], 0.3)
+
+    def test_do_http_request(self):
+        self.client.create_service('svc')
+        self.client.create_function('svc', 'fn', 'python3', 'main.handler', codeDir='test/hello_world')
+        self.metrics.reset()
+        for _ in range(3):
+            self.client.do_http_request('GET', 'svc', 'fn', '/')
+        client = fc2.Client(endpoint=_refused_endpoint(), accessKeyID='emulator', accessKeySecret='emulator',
+                            metrics=self.metrics, retryPolicy=fc2.RetryPolicy(maxAttempts=1))
+        with self.assertRaises(Exception):
+            client.do_http_request('GET', 'svc', 'fn', '/')
+        client.close()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['requests'], {'do_http_request': 4})
+        self.assertEqual(snapshot['inflight'], {'do_http_request': 0})
+        self.assertEqual(sum(snapshot['errors']['do_http_request'].values()), 1)
+        self.assertEqual(snapshot['latency']['do_http_request']['count'], 4)
+        self.assertEqual(snapshot['functionLatency'][('svc', None, 'fn')]['count'], 4)
+
+    def test_network_error(self):
+        client = fc2.Client(endpoint=_refused_endpoint(), accessKeyID='emulator',
+                            accessKeySecret='emulator', metrics=self.metrics,
+                            retryPolicy=fc2.RetryPolicy(maxAttempts=2, baseDelay=0.001))
+        with self.assertRaises(Exception):
+            client.get_service('svc')
+        client.close()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['requests'], {'get_service': 1})
+        self.assertEqual(snapshot['inflight'], {'get_service': 0})
+        self.assertEqual(snapshot['retries'], {'get_service': 1})
+        self.assertEqual(list(snapshot['errors']['get_service'].values()), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import json
+import threading
+import unittest
+
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from stub_server import StubHandler, StubServer, run_async
+
+
+class _Handler(StubHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+        self.server.requests.append((url.path, query))
+        start = int(query.get('nextToken', 0))
+        limit = int(query.get('limit', 100))
+        names = ['s{0}'.format(i) for i in range(start, min(start + limit, self.server.total))]
+        data = {'services': [{'serviceName': n} for n in names]}
+        if start + limit < self.server.total:
+            data['nextToken'] = str(start + limit)
+        self.reply(200, json.dumps(data).encode('utf-8'), {'Content-Type': 'application/json'})
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, requests=[], total=25)
+        self.endpoint = self.server.endpoint
+        self.client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret')
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def _names(self, services):
+        return [s['serviceName'] for s in services]
+
+    def test_iter(self):
+        services = self.client.iter_services(pageSize=10, prefix='s')
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(self._names(services), ['s{0}'.format(i) for i in range(25)])
+        self.assertEqual([q.get('nextToken') for _, q in self.server.requests], [None, '10', '20'])
+        self.assertTrue(all(q['limit'] == '10' and q['prefix'] == 's' for _, q in self.server.requests))
+
+    def test_lazy(self):
+        services = self.client.iter_services(pageSize=10)
+        self.assertEqual(next(services)['serviceName'], 's0')
+        self.assertEqual(len(self.server.requests), 1)
+        services.close()
+
+    def test_read_ahead(self):
+        services = self.client.iter_services(pageSize=10, readAhead=True)
+        self.assertEqual(next(services)['serviceName'], 's0')
+        # the second page is requested before the first one is consumed.
+        for _ in range(100):
+            if len(self.server.requests) == 2:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self._names(services), ['s{0}'.format(i) for i in range(1, 25)])
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_empty(self):
+        self.server.total = 0
+        self.assertEqual(list(self.client.iter_services(readAhead=True)), [])
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async(self):
+        async def main():
+            async with fc2.AsyncClient(endpoint=self.endpoint, accessKeyID='id',
+                                       accessKeySecret='secret') as client:
+                return [s async for s in client.iter_services(pageSize=7, readAhead=True)]
+        self.assertEqual(self._names(run_async(main())), ['s{0}'.format(i) for i in range(25)])
+        self.assertEqual(len(self.server.requests), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
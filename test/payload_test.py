@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import array
+import fc2
+import io
+import mmap
+import tempfile
+import unittest
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from fc2 import util
+from stub_server import StubHandler, StubServer, run_async
+
+
+class TestPreparePayload(unittest.TestCase):
+    def test_bytes_like(self):
+        self.assertEqual(util.prepare_payload(None), (None, 0))
+        self.assertEqual(util.prepare_payload(b'abc'), (b'abc', 3))
+        self.assertEqual(util.prepare_payload(u'hé'), (b'h\xc3\xa9', 3))
+        data = bytearray(b'hello')
+        body, length = util.prepare_payload(data)
+        self.assertIsInstance(body, memoryview)
+        self.assertEqual(length, 5)
+        data[0:1] = b'j'
+        self.assertEqual(body.tobytes(), b'jello')
+        body, length = util.prepare_payload(array.array('i', [1, 2, 3]))
+        self.assertEqual((len(body), length), (12, 12))
+        with self.assertRaises(ValueError):
+            util.prepare_payload(memoryview(b'abcdef')[::2])
+        with self.assertRaises(TypeError):
+            util.prepare_payload(42)
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'x' * 100)
+            f.flush()
+            m = mmap.mmap(f.fileno(), 0)
+            body, length = util.prepare_payload(m)
+            self.assertEqual(length, 100)
+            self.assertEqual(body[:3].tobytes(), b'xxx')
+            body.release()
+            m.close()
+
+    def test_streams(self):
+        f = io.BytesIO(b'abcdef')
+        f.read(2)
+        self.assertEqual(util.prepare_payload(f), (f, 4))
+        self.assertEqual(f.tell(), 2)
+        chunks = [b'ab', b'c']
+        body, length = util.prepare_payload(iter(chunks))
+        self.assertIsNone(length)
+        self.assertEqual(list(body), chunks)
+        sized = util.SizedIterator(chunks, 3)
+        self.assertEqual(util.prepare_payload(sized), (sized, 3))
+
+
+class _Handler(StubHandler):
+    def _read_chunked(self):
+        data = b''
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            chunk = self.rfile.read(size + 2)[:size]
+            if size == 0:
+                return data
+            data += chunk
+
+    def do_POST(self):
+        if self.headers.get('transfer-encoding') == 'chunked':
+            data = self._read_chunked()
+        else:
+            data = self.read_body()
+        self.server.requests.append((self.headers.get('content-length'), self.headers.get('transfer-encoding')))
+        self.reply(200, data)
+
+
+class TestInvokePayload(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, requests=[])
+        self.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _payloads(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'mapped')
+            f.flush()
+            m = mmap.mmap(f.fileno(), 0)
+        return [
+            (bytearray(b'hello'), b'hello', ('5', None)),
+            (memoryview(b'0123456789')[2:5], b'234', ('3', None)),
+            (array.array('h', [1]), b'\x01\x00', ('2', None)),
+            (m, b'mapped', ('6', None)),
+            (io.BytesIO(b'file'), b'file', ('4', None)),
+            (util.SizedIterator([b'ab', b'cd'], 4), b'abcd', ('4', None)),
+            ((c for c in [b'chu', b'nked']), b'chunked', (None, 'chunked')),
+        ]
+
+    def test_sync(self):
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret')
+        for payload, expected, headers in self._payloads():
+            r = client.invoke_function('svc', 'func', payload=payload)
+            self.assertEqual(r.data, expected)
+            self.assertEqual(self.server.requests.pop(), headers)
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async(self):
+        async def main():
+            async with fc2.AsyncClient(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret') as client:
+                for payload, expected, headers in self._payloads():
+                    r = await client.invoke_function('svc', 'func', payload=payload)
+                    self.assertEqual(r.data, expected)
+                    self.assertEqual(self.server.requests.pop(), headers)
+
+        run_async(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
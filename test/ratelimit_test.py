@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import json
+import time
+import unittest
+
+from stub_server import StubHandler, StubServer, run_async
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_categories(self):
+        limiter = fc2.RateLimiter(controlPlane=fc2.TokenBucket(0.001, 2), dataPlane=None,
+                                  operations={'tag_resource': fc2.TokenBucket(0.001, 1)})
+        self.assertEqual(limiter.buckets('invoke_function'), [])
+        self.assertEqual(len(limiter.buckets('tag_resource')), 2)
+        self.assertTrue(limiter.try_acquire('invoke_function'))
+        self.assertTrue(limiter.try_acquire('tag_resource'))
+        self.assertFalse(limiter.try_acquire('tag_resource'))
+        self.assertTrue(limiter.try_acquire('list_services'))
+        self.assertFalse(limiter.try_acquire('list_services'))
+
+    def test_non_blocking(self):
+        limiter = fc2.RateLimiter(dataPlane=fc2.TokenBucket(0.001, 1), blocking=False)
+        limiter.acquire('invoke_function')
+        with self.assertRaises(fc2.RateLimitExceededError) as ctx:
+            limiter.acquire('do_http_request')
+        self.assertEqual(ctx.exception.operation, 'do_http_request')
+        limiter.acquire('list_services')
+
+    def test_rollback(self):
+        operation = fc2.TokenBucket(0.001, 100)
+        limiter = fc2.RateLimiter(controlPlane=fc2.TokenBucket(0.001, 1), operations={'get_service': operation},
+                                  blocking=False)
+        self.assertEqual([limiter.try_acquire('get_service') for _ in range(3)], [True, False, False])
+        with self.assertRaises(fc2.RateLimitExceededError):
+            limiter.acquire('get_service')
+        with self.assertRaises(fc2.RateLimitExceededError):
+            run_async(limiter.acquire_async('get_service'))
+        # only the request which was let through took a token of its operation.
+        self.assertEqual(operation.delay(99), 0)
+        self.assertGreater(operation.delay(100), 0)
+
+    def test_timeout(self):
+        limiter = fc2.RateLimiter(controlPlane=fc2.TokenBucket(0.001, 1), timeout=0.05)
+        limiter.acquire('list_services')
+        start = time.monotonic()
+        with self.assertRaises(fc2.RateLimitExceededError):
+            limiter.acquire('list_services')
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_async(self):
+        limiter = fc2.RateLimiter(dataPlane=fc2.TokenBucket(20, 1))
+
+        async def main():
+            for _ in range(4):
+                await limiter.acquire_async('invoke_function')
+
+        start = time.monotonic()
+        run_async(main())
+        self.assertGreaterEqual(time.monotonic() - start, 0.14)
+
+
+class _Handler(StubHandler):
+    def do_GET(self):
+        self.server.calls += 1
+        self.reply(200, json.dumps({'services': []}).encode('utf-8'))
+
+
+class TestClientRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, calls=0)
+        self.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_blocking(self):
+        limiter = fc2.RateLimiter(controlPlane=fc2.TokenBucket(20, 1))
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret',
+                            rateLimiter=limiter, retryPolicy=fc2.RetryPolicy())
+        start = time.monotonic()
+        for _ in range(4):
+            client.list_services()
+        self.assertGreaterEqual(time.monotonic() - start, 0.14)
+        self.assertEqual(self.server.calls, 4)
+
+    def test_non_blocking(self):
+        limiter = fc2.RateLimiter(controlPlane=fc2.TokenBucket(0.001, 1), blocking=False)
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret',
+                            rateLimiter=limiter)
+        client.list_services()
+        with self.assertRaises(fc2.RateLimitExceededError):
+            client.list_services()
+        self.assertEqual(self.server.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
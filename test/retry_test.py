@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import json
+import requests
+import socket
+import time
+import unittest
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from fc2 import retry
+from stub_server import StubHandler, StubServer, run_async
+
+
+class _Handler(StubHandler):
+    def _handle(self):
+        data = self.read_body()
+        with self.server.lock:
+            self.server.attempts.append((self.command, data))
+            failure = self.server.failures.pop(0) if self.server.failures else None
+        if failure is None:
+            status, body, headers = 200, json.dumps({'ok': True}).encode('utf-8'), {}
+        else:
+            status, code, headers = failure
+            body = json.dumps({'ErrorCode': code, 'ErrorMessage': 'error'}).encode('utf-8')
+        self.reply(status, body, dict(headers, **{'Content-Type': 'application/json'}))
+
+    do_GET = do_POST = do_PUT = _handle
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, attempts=[], failures=[])
+        self.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _client(self, **kwargs):
+        policy = fc2.RetryPolicy(baseDelay=0.01, **kwargs)
+        return fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret', retryPolicy=policy)
+
+    def test_idempotent_retried(self):
+        self.server.failures = [(500, 'InternalServerError', {}), (502, 'BadGateway', {})]
+        client = self._client()
+        self.assertEqual(client.get_service('svc').data, {'ok': True})
+        self.assertEqual(len(self.server.attempts), 3)
+
+    def test_attempts_exhausted(self):
+        self.server.failures = [(500, 'InternalServerError', {})] * 3
+        client = self._client(operationAttempts={'get_service': 2})
+        with self.assertRaises(fc2.FcError) as ctx:
+            client.get_service('svc')
+        self.assertEqual(ctx.exception.status_code, 500)
+        self.assertEqual(len(self.server.attempts), 2)
+
+    def test_non_idempotent_not_retried(self):
+        self.server.failures = [(500, 'InternalServerError', {})]
+        client = self._client()
+        with self.assertRaises(fc2.FcError):
+            client.invoke_function('svc', 'func', payload=b'hello')
+        self.assertEqual(len(self.server.attempts), 1)
+
+        self.server.failures = [(500, 'InternalServerError', {})]
+        self.server.attempts = []
+        client = self._client(idempotentOperations=['invoke_function'])
+        self.assertEqual(client.invoke_function('svc', 'func', payload=b'hello').data, b'{"ok": true}')
+        self.assertEqual(self.server.attempts, [('POST', b'hello')] * 2)
+
+    def test_throttling_retried(self):
+        self.server.failures = [(429, 'ResourceThrottled', {'Retry-After': '0.2'}),
+                                (503, 'ResourceExhausted', {})]
+        client = self._client()
+        start = time.time()
+        client.invoke_function('svc', 'func', payload=b'hello')
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        self.assertEqual(len(self.server.attempts), 3)
+
+    def test_budget(self):
+        budget = fc2.RetryBudget(ratio=0, rate=0.001, capacity=1)
+        self.server.failures = [(500, 'InternalServerError', {})] * 4
+        client = self._client(budget=budget, maxAttempts=5)
+        with self.assertRaises(fc2.FcError):
+            client.get_service('svc')
+        # a single retry was left in the budget.
+        self.assertEqual(len(self.server.attempts), 2)
+
+    def test_connection_refused(self):
+        # the request was not sent, it is retried whatever the operation.
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        metrics = fc2.MetricsRegistry()
+        client = fc2.Client(endpoint='http://127.0.0.1:{0}'.format(port), accessKeyID='id',
+                            accessKeySecret='secret', metrics=metrics, retryPolicy=fc2.RetryPolicy(baseDelay=0.01))
+        with self.assertRaises(requests.exceptions.ConnectionError) as ctx:
+            client.invoke_function('svc', 'func', payload=b'hello')
+        self.assertEqual(retry._error_kind(ctx.exception), 'connect')
+        self.assertEqual(metrics.snapshot()['retries'], {'invoke_function': 2})
+
+    def test_backoff(self):
+        policy = fc2.RetryPolicy(baseDelay=1, maxDelay=3)
+        for attempt in range(1, 10):
+            delay = policy.backoff(attempt)
+            self.assertTrue(0 <= delay <= min(3, 2 ** (attempt - 1)))
+
+    def test_throttling_error(self):
+        self.assertTrue(fc2.fc_exceptions.is_throttling_error(429))
+        self.assertTrue(fc2.fc_exceptions.is_throttling_error(503, 'ResourceExhausted'))
+        self.assertFalse(fc2.fc_exceptions.is_throttling_error(503, 'ServiceUnavailable'))
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async(self):
+        self.server.failures = [(500, 'InternalServerError', {}), (429, 'ResourceThrottled', {})]
+
+        async def main():
+            async with fc2.AsyncClient(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret',
+                                       retryPolicy=fc2.RetryPolicy(baseDelay=0.01)) as client:
+                return await client.get_service('svc')
+        self.assertEqual(run_async(main()).data, {'ok': True})
+        self.assertEqual(len(self.server.attempts), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
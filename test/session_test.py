@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import email.utils
+import fc2
+import json
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from stub_server import StubHandler, StubServer
+
+
+class _Handler(StubHandler):
+    def do_GET(self):
+        self.server.peers.add(self.client_address)
+        time.sleep(self.server.delays.pop(0) if self.server.delays else 0)
+        self.reply(200, json.dumps({'availableAZs': []}).encode('utf-8'), {'Content-Type': 'application/json'})
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler, peers=set(), delays=[])
+        self.client = fc2.Client(
+            endpoint=self.server.endpoint,
+            accessKeyID='id',
+            accessKeySecret='secret',
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_connection_reused(self):
+        for _ in range(5):
+            self.client.get_account_settings()
+        self.assertEqual(len(self.server.peers), 1)
+
+    def test_close(self):
+        self.client.get_account_settings()
+        self.client.close()
+        self.assertIsNone(self.client._session)
+        self.client.get_account_settings()
+        self.assertEqual(len(self.server.peers), 2)
+
+    def test_idle_timeout(self):
+        self.client.idle_timeout = 0
+        self.client.get_account_settings()
+        self.client._session_last_used -= 1
+        self.client.get_account_settings()
+        self.assertEqual(len(self.server.peers), 2)
+
+    def test_idle_timeout_long_request(self):
+        self.client.idle_timeout = 0.2
+        self.server.delays = [0.5]
+        slow = threading.Thread(target=self.client.get_account_settings)
+        slow.start()
+        time.sleep(0.3)
+        session = self.client._session
+        # the session is not recycled under the request in flight,
+        self.client.get_account_settings()
+        self.assertIs(self.client._session, session)
+        slow.join()
+        # nor right after it completed.
+        self.client.get_account_settings()
+        self.assertIs(self.client._session, session)
+        self.assertEqual(self.client._session_inflight, 0)
+
+
+class TestCommonHeaders(unittest.TestCase):
+    def test_headers(self):
+        client = fc2.Client(endpoint='http://127.0.0.1:9000', accessKeyID='id', accessKeySecret='secret',
+                            securityToken='token')
+        headers = client._build_common_headers('GET', '/path', {'content-type': 'text/plain'})
+        self.assertEqual(headers['host'], '127.0.0.1:9000')
+        self.assertEqual(headers['content-type'], 'text/plain')
+        self.assertEqual(headers['x-fc-security-token'], 'token')
+        self.assertEqual(headers['date'], email.utils.formatdate(
+            email.utils.mktime_tz(email.utils.parsedate_tz(headers['date'])), usegmt=True))
+        self.assertEqual(headers['authorization'], client.auth.sign_request('GET', '/path', headers))
+        # the template is not modified by the requests.
+        self.assertEqual(client._header_template['content-type'], 'application/json')
+        self.assertNotIn('date', client._header_template)
+
+        client.auth.security_token = ''
+        self.assertNotIn('x-fc-security-token', client._build_common_headers('GET', '/path'))
+
+    def test_date_cache(self):
+        with mock.patch('time.time', return_value=0):
+            first = fc2.client._http_date()
+            self.assertEqual(first, 'Thu, 01 Jan 1970 00:00:00 GMT')
+        with mock.patch('time.time', return_value=0.9):
+            self.assertIs(fc2.client._http_date(), first)
+        with mock.patch('time.time', return_value=1.5):
+            self.assertEqual(fc2.client._http_date(), 'Thu, 01 Jan 1970 00:00:01 GMT')
+
+
+if __name__ == '__main__':
+    unittest.main()
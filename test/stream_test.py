@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import fc2
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from stub_server import StubHandler, StubServer, run_async
+
+_OUTPUT = os.urandom(3 * 1024 * 1024 + 7)
+
+
+class _Handler(StubHandler):
+    def do_POST(self):
+        self.read_body()
+        if '/functions/broken/' in self.path:
+            self.reply(200, json.dumps({'errorMessage': 'boom'}).encode('utf-8'),
+                       {'x-fc-error-type': 'UnhandledInvocationError'})
+        else:
+            self.reply(200, _OUTPUT)
+
+
+class TestStreamingResponse(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(_Handler)
+        self.endpoint = self.server.endpoint
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        self.server.stop()
+
+    def test_sync(self):
+        client = fc2.Client(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret')
+        with client.invoke_function('svc', 'func', payload=b'x', stream=True) as r:
+            self.assertEqual(r.headers['Content-Length'], str(len(_OUTPUT)))
+            head = r.read(10)
+            self.assertEqual(head + r.read(), _OUTPUT)
+
+        r = client.invoke_function('svc', 'func', payload=b'x', stream=True)
+        self.assertEqual(b''.join(r.iter_chunks(1000)), _OUTPUT)
+
+        path = os.path.join(self.tmp, 'output')
+        r = client.invoke_function('svc', 'func', payload=b'x', stream=True)
+        self.assertEqual(r.write_to(path), len(_OUTPUT))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), _OUTPUT)
+        buf = io.BytesIO()
+        client.invoke_function('svc', 'func', payload=b'x', stream=True).write_to(buf)
+        self.assertEqual(buf.getvalue(), _OUTPUT)
+
+        with self.assertRaises(fc2.FcError) as ctx:
+            client.invoke_function('svc', 'broken', payload=b'x', stream=True)
+        self.assertIn('boom', str(ctx.exception))
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async(self):
+        path = os.path.join(self.tmp, 'output')
+
+        async def main():
+            async with fc2.AsyncClient(endpoint=self.endpoint, accessKeyID='id', accessKeySecret='secret') as client:
+                async with await client.invoke_function('svc', 'func', payload=b'x', stream=True) as r:
+                    head = await r.read(10)
+                    self.assertEqual(head + await r.read(), _OUTPUT)
+
+                r = await client.invoke_function('svc', 'func', payload=b'x', stream=True)
+                chunks = []
+                async for chunk in r:
+                    chunks.append(chunk)
+                self.assertEqual(b''.join(chunks), _OUTPUT)
+
+                r = await client.invoke_function('svc', 'func', payload=b'x', stream=True)
+                self.assertEqual(await r.write_to(path), len(_OUTPUT))
+
+                with self.assertRaises(fc2.FcError):
+                    await client.invoke_function('svc', 'broken', payload=b'x', stream=True)
+
+        run_async(main())
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), _OUTPUT)
+
+
+if __name__ == '__main__':
+    unittest.main()
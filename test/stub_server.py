@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+The stub HTTP server of the tests which need a behaviour the emulator (fc2.emulator) does not have,
+and run_async() for the asynchronous tests.
+"""
+
+import asyncio
+import socketserver
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get('content-length') or 0))
+
+    def reply(self, status, body=b'', headers={}):
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    Serve a StubHandler on a free local port from a background thread until stop().
+    The keyword arguments are set as attributes of the server, which the handler reads
+    through self.server, along with a lock.
+    """
+
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, handler, **attributes):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.lock = threading.Lock()
+        for k, v in attributes.items():
+            setattr(self, k, v)
+        self.endpoint = 'http://127.0.0.1:{0}'.format(self.server_port)
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def run_async(coroutine):
+    """
+    Run a coroutine on a new event loop, as asyncio.run() which Python 3.6 does not have.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
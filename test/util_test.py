@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from fc2 import util
+
+
+class _Unseekable(io.RawIOBase):
+    """ A write-only output like a pipe or a socket. """
+
+    def __init__(self):
+        super(_Unseekable, self).__init__()
+        self._buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        return self._buffer.write(b)
+
+    def getvalue(self):
+        return self._buffer.getvalue()
+
+
+class TestZipDir(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'empty'))
+        os.makedirs(os.path.join(self.root, 'lib', 'pkg'))
+        for i in range(20):
+            with open(os.path.join(self.root, 'lib', 'pkg', 'mod{0}.py'.format(i)), 'wb') as f:
+                f.write(os.urandom(100) * (i + 1))
+        with open(os.path.join(self.root, 'main.py'), 'w') as f:
+            f.write('def handler(event, context):\n    return event\n')
+        os.symlink('main.py', os.path.join(self.root, 'link.py'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parallel(self):
+        serial = io.BytesIO()
+        util.zip_dir(self.root, serial)
+        parallel = io.BytesIO()
+        util.zip_dir(self.root, parallel, workers=4)
+        self.assertEqual(serial.getvalue(), parallel.getvalue())
+
+        z = zipfile.ZipFile(parallel)
+        self.assertIsNone(z.testzip())
+        self.assertIn('empty/', z.namelist())
+        link = z.getinfo('link.py')
+        self.assertEqual(link.external_attr, 2716663808)
+        self.assertEqual(z.read('link.py'), b'main.py')
+        self.assertEqual(z.read('main.py'), b'def handler(event, context):\n    return event\n')
+
+    def test_parallel_non_seekable(self):
+        for deterministic in [False, True]:
+            serial = _Unseekable()
+            util.zip_dir(self.root, serial, deterministic=deterministic)
+            parallel = _Unseekable()
+            util.zip_dir(self.root, parallel, workers=4, deterministic=deterministic)
+            self.assertEqual(serial.getvalue(), parallel.getvalue())
+            self.assertIsNone(zipfile.ZipFile(io.BytesIO(parallel.getvalue())).testzip())
+
+    def test_parallel_public_api(self):
+        # the fallback used when the zipfile internals change.
+        internals = util._ZIPFILE_INTERNALS
+        try:
+            for output in [io.BytesIO, _Unseekable]:
+                util._ZIPFILE_INTERNALS = internals
+                expected = output()
+                util.zip_dir(self.root, expected, deterministic=True)
+                util._ZIPFILE_INTERNALS = internals + ('_missing',)
+                parallel = output()
+                util.zip_dir(self.root, parallel, workers=4, deterministic=True)
+                self.assertEqual(parallel.getvalue(), expected.getvalue())
+        finally:
+            util._ZIPFILE_INTERNALS = internals
+
+    def test_deterministic(self):
+        first = io.BytesIO()
+        util.zip_dir(self.root, first, deterministic=True)
+
+        # a copy of the tree with other mtimes, permissions and directory order.
+        other = tempfile.mkdtemp()
+        try:
+            copy = os.path.join(other, 'code')
+            shutil.copytree(self.root, copy, symlinks=True)
+            os.utime(os.path.join(copy, 'main.py'), (0, 1234567890))
+            os.chmod(os.path.join(copy, 'main.py'), 0o600)
+            os.rename(os.path.join(copy, 'lib'), os.path.join(copy, 'tmp'))
+            os.rename(os.path.join(copy, 'tmp'), os.path.join(copy, 'lib'))
+            for workers in [1, 4]:
+                second = io.BytesIO()
+                util.zip_dir(copy, second, workers=workers, deterministic=True)
+                self.assertEqual(first.getvalue(), second.getvalue())
+
+            os.chmod(os.path.join(copy, 'main.py'), 0o700)
+            third = io.BytesIO()
+            util.zip_dir(copy, third, deterministic=True)
+            self.assertNotEqual(first.getvalue(), third.getvalue())
+            self.assertEqual(zipfile.ZipFile(third).getinfo('main.py').external_attr >> 16, 0o100755)
+        finally:
+            shutil.rmtree(other)
+
+        # reproducible build trees have mtimes before 1980, which zip entries cannot hold.
+        for name in ['main.py', os.path.join('lib', 'pkg', 'mod0.py')]:
+            os.utime(os.path.join(self.root, name), (1, 1))
+        for workers in [1, 4]:
+            old = io.BytesIO()
+            util.zip_dir(self.root, old, workers=workers, deterministic=True)
+            self.assertEqual(first.getvalue(), old.getvalue())
+
+        z = zipfile.ZipFile(first)
+        self.assertIsNone(z.testzip())
+        names = z.namelist()
+        self.assertEqual(names, ['empty/'] + sorted(n for n in names if n.startswith('lib/')) + ['link.py', 'main.py'])
+        info = z.getinfo('main.py')
+        self.assertEqual(info.date_time, (1980, 1, 1, 0, 0, 0))
+        self.assertEqual(info.external_attr >> 16, 0o100644)
+
+
+class TestCrc64(unittest.TestCase):
+    def test_crc64(self):
+        # check value of CRC-64/XZ (ECMA-182)
+        self.assertEqual(util.crc64(b'123456789'), 0x995DC9BBDF1939FA)
+        self.assertEqual(util._crc64_py(b'123456789'), 0x995DC9BBDF1939FA)
+        self.assertEqual(util.crc64(b'6789', util.crc64(b'12345')), 0x995DC9BBDF1939FA)
+
+    def test_crc64_file(self):
+        f = io.BytesIO(b'xx123456789')
+        f.seek(2)
+        self.assertEqual(util.crc64_file(f, blockSize=4), str(0x995DC9BBDF1939FA))
+        self.assertEqual(f.tell(), 2)
+
+
+class TestZipFileJsonStream(unittest.TestCase):
+    def test_stream(self):
+        data = os.urandom(100003)
+        for size in [0, 1, 2, 3, 100003]:
+            payload = {'functionName': 'f', 'description': u'测试', 'code': {'zipFile': io.BytesIO(data[:size])}}
+            stream = util.ZipFileJsonStream(payload, chunkSize=1000)
+            body = stream.read()
+            self.assertEqual(len(body), len(stream))
+            d = json.loads(body.decode('utf-8'))
+            self.assertEqual(base64.b64decode(d['code']['zipFile']), data[:size])
+            self.assertEqual(d['description'], u'测试')
+            self.assertEqual(d['functionName'], 'f')
+
+    def test_rewind(self):
+        zipFile = io.BytesIO(os.urandom(5000))
+        stream = util.ZipFileJsonStream({'code': {'zipFile': zipFile}}, chunkSize=300)
+        first = b''.join(iter(lambda: stream.read(777), b''))
+        self.assertEqual(stream.tell(), len(first))
+        stream.seek(0)
+        self.assertEqual(stream.tell(), 0)
+        self.assertEqual(stream.read(), first)
+        with self.assertRaises(io.UnsupportedOperation):
+            stream.seek(10)
+        stream.close()
+        self.assertTrue(zipFile.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()